@@ -1,13 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import http_date as format_http_date
 import os
+import atexit
+import click
+import hashlib
+import json
 import logging
+import socket
 import traceback
-from datetime import datetime
-from file_manager import FileManager
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from file_manager import FileManager, archive_summary, stored_filename_for
+from pagination import keyset_paginate, DEFAULT_PAGE_SIZE
+import migrations
+from db_tuning import apply_sqlite_profile, retry_on_lock
+import search_index
+from response_cache import ResponseCache, cached_page, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+from write_behind import CounterBuffer
+from jobs import JobQueue, DEFAULT_WORKERS, DEFAULT_HEARTBEAT_INTERVAL
+import images
+import previews
+import resumable
+from reconcile import FileReconciler, LEGACY_FOLDERS, DEFAULT_BATCH_SIZE as RECONCILE_BATCH_SIZE
+from storage import DEFAULT_URL_EXPIRES, StorageError
+from downloads import file_etag, send_download, send_stream, OFFLOAD_MODES, DEFAULT_ACCEL_PREFIX
 # Payment handler removed
-from sqlalchemy import text
+from sqlalchemy import bindparam, case, event, false, func, literal, null, select, text, union_all
+from sqlalchemy.orm import contains_eager, joinedload, object_session
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.exc import IntegrityError
 
 # Logging konfigürasyonu
 def setup_logging():
@@ -115,15 +140,55 @@ if database_url:
 loggers = setup_logging()
 
 db = SQLAlchemy(app)
+# Dosya deposu: STORAGE_BACKEND=local (varsayılan, uploads/) veya s3 (MinIO, AWS S3, R2...)
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'local').lower()
+for _setting in ('S3_ENDPOINT_URL', 'S3_BUCKET', 'S3_ACCESS_KEY', 'S3_SECRET_KEY', 'S3_REGION'):
+    app.config[_setting] = os.getenv(_setting)
+app.config['S3_URL_EXPIRES'] = int(os.getenv('S3_URL_EXPIRES', DEFAULT_URL_EXPIRES))  # saniye
+# Not görselleri yüklemede yönü düzeltilip üst verisi atılarak yeniden sıkıştırılır (images.py)
+app.config['IMAGE_OPTIMIZE'] = os.getenv('IMAGE_OPTIMIZE', '1') != '0'
+app.config['IMAGE_MAX_DIMENSION'] = int(os.getenv('IMAGE_MAX_DIMENSION', images.MAX_DIMENSION))  # px
+app.config['IMAGE_JPEG_QUALITY'] = int(os.getenv('IMAGE_JPEG_QUALITY', images.JPEG_QUALITY))
+app.config['IMAGE_KEEP_ORIGINAL'] = os.getenv('IMAGE_KEEP_ORIGINAL', '0') == '1'
 file_manager = FileManager(app)
+# Kullanıcı başına depolama kotası (not + proje dosyaları); 0 sınırsız, User.storage_quota kişiye özel değer
+app.config['STORAGE_QUOTA_MB'] = int(os.getenv('STORAGE_QUOTA_MB', 1024))
+# create_all/drop_all tam metin arama indekslerini de yönetsin
+search_index.register_metadata_hooks(db.metadata)
+
+# İsteğe bağlı SQLite üretim profili (WAL, mmap, busy_timeout) - SQLITE_PROFILE=production
+app.config['SQLITE_PROFILE'] = os.getenv('SQLITE_PROFILE', '')
+if app.config['SQLITE_PROFILE'] == 'production':
+    with app.app_context():
+        apply_sqlite_profile(db.engine)
+
+# Ana sayfa/katalog sayfaları için yanıt önbelleği (RESPONSE_CACHE_TTL=0 kapatır)
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', DEFAULT_TTL))
+# Damga dosyası worker'lar arasında temizliği duyurur
+page_cache = ResponseCache(max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+                           stamp_path=os.path.join(app.instance_path, 'response_cache.stamp'))
+
+def invalidate_page_cache():
+    """İçerik değişti: önbellekteki sayfaları temizle"""
+    page_cache.invalidate()
+
+# İndirmeleri ters vekile devretme: DOWNLOAD_OFFLOAD=x-accel (nginx) veya x-sendfile (Apache)
+app.config['DOWNLOAD_OFFLOAD'] = os.getenv('DOWNLOAD_OFFLOAD', '').lower()
+app.config['DOWNLOAD_ACCEL_PREFIX'] = os.getenv('DOWNLOAD_ACCEL_PREFIX', DEFAULT_ACCEL_PREFIX)
+if app.config['DOWNLOAD_OFFLOAD'] and app.config['DOWNLOAD_OFFLOAD'] not in OFFLOAD_MODES:
+    logging.getLogger('app').warning(f"Unknown DOWNLOAD_OFFLOAD value: {app.config['DOWNLOAD_OFFLOAD']}, serving files from the app")
+
+@retry_on_lock(db.session)
+def add_and_commit(*objects):
+    """Yeni kayıtları ekleyip commit et; SQLite kilitliyse geri alıp yeniden dener"""
+    db.session.add_all(objects)
+    db.session.commit()
 # Payment handler removed
 
 # Ensure DB tables on first request (for gunicorn on Render)
 def init_db_on_start():
     try:
-        db.create_all()
-        ensure_user_columns()
-        ensure_question_columns()
+        run_schema_migrations()
     except Exception as e:
         logging.getLogger('error').error(f"DB init error: {e}")
 
@@ -145,59 +210,45 @@ class User(db.Model):
     department = db.Column(db.String(120))
     interests = db.Column(db.Text)
     profile_bg = db.Column(db.String(255), default='splash_cockpit.jpg')
-
-def ensure_user_columns():
-    """SQLite için hafif şema yükseltici: eksik User kolonlarını ekler."""
-    try:
-        result = db.session.execute(text("PRAGMA table_info('user')")).all()
-        existing_columns = {row[1] for row in result}
-        alter_statements = []
-        if 'birth_date' not in existing_columns:
-            alter_statements.append("ALTER TABLE user ADD COLUMN birth_date DATE")
-        if 'school' not in existing_columns:
-            alter_statements.append("ALTER TABLE user ADD COLUMN school VARCHAR(120)")
-        if 'department' not in existing_columns:
-            alter_statements.append("ALTER TABLE user ADD COLUMN department VARCHAR(120)")
-        if 'interests' not in existing_columns:
-            alter_statements.append("ALTER TABLE user ADD COLUMN interests TEXT")
-        if 'profile_bg' not in existing_columns:
-            alter_statements.append("ALTER TABLE user ADD COLUMN profile_bg VARCHAR(255) DEFAULT 'splash_cockpit.jpg'")
-        for stmt in alter_statements:
-            db.session.execute(text(stmt))
-        if alter_statements:
-            db.session.commit()
-    except Exception as e:
-        # Logla ama uygulamayı durdurma; ilk çalıştırmada tablo yoksa create_all sonrası tekrar denenecek
-        logging.getLogger('error').error(f"ensure_user_columns error: {e}")
-
-def ensure_question_columns():
-    """SQLite için hafif şema yükseltici: Question tablo sütunlarını ekler."""
-    try:
-        result = db.session.execute(text("PRAGMA table_info('question')")).all()
-        existing_columns = {row[1] for row in result}
-        alter_statements = []
-        if 'file_path' not in existing_columns:
-            alter_statements.append("ALTER TABLE question ADD COLUMN file_path VARCHAR(200)")
-        if 'file_name' not in existing_columns:
-            alter_statements.append("ALTER TABLE question ADD COLUMN file_name VARCHAR(200)")
-        if 'file_size' not in existing_columns:
-            alter_statements.append("ALTER TABLE question ADD COLUMN file_size INTEGER")
-        if 'file_type' not in existing_columns:
-            alter_statements.append("ALTER TABLE question ADD COLUMN file_type VARCHAR(50)")
-        if 'file_url' not in existing_columns:
-            alter_statements.append("ALTER TABLE question ADD COLUMN file_url VARCHAR(200)")
-        for stmt in alter_statements:
-            db.session.execute(text(stmt))
-        if alter_statements:
-            db.session.commit()
-    except Exception as e:
-        logging.getLogger('error').error(f"ensure_question_columns error: {e}")
+    # Depolama: notlarının (saklanan orijinaller dahil) ve projelerinin dosya boyutu toplamı
+    # (olay dinleyicileriyle güncellenir)
+    storage_used = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    storage_quota = db.Column(db.BigInteger)  # byte; NULL ise STORAGE_QUOTA_MB, 0 sınırsız
+
+    def storage_limit(self):
+        """Byte cinsinden kota; sınır yoksa None"""
+        quota = self.storage_quota
+        if quota is None:
+            quota = app.config['STORAGE_QUOTA_MB'] * 1024 * 1024
+        return quota or None
+
+class SchemaVersion(db.Model):
+    """migrations.py tarafından uygulanan şema sürümleri.
+
+    Metadata'ya dahil edilir ki drop_all/create_all ile tablolar sıfırlandığında
+    sürüm kaydı da sıfırlansın ve sonraki açılışta şema yeniden kurulsun.
+    """
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False)
+
+def run_schema_migrations():
+    """Şemayı migrations.py içindeki sürümlü migration'larla güncelle.
+
+    Şema güncelse yalnızca schema_version tablosu okunur; create_all ve
+    kolon introspection'ı atlanır.
+    """
+    applied = migrations.upgrade(db.engine, db.create_all)
+    if applied:
+        loggers['app'].info(f"Schema migrations applied: {applied} - Version: {migrations.latest_version()}")
+    return applied
 
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     code = db.Column(db.String(20), unique=True, nullable=False)  # Ders kodu zorunlu
-    grade = db.Column(db.Integer, nullable=False)  # 1-4 sınıf, 0=seçmeli
+    grade = db.Column(db.Integer, nullable=False, index=True)  # 1-4 sınıf, 0=seçmeli
     semester = db.Column(db.String(20), nullable=False)  # Güz/Bahar/Seçmeli
     description = db.Column(db.Text)
     credits = db.Column(db.Integer, default=3)
@@ -206,49 +257,119 @@ class Course(db.Model):
         return f'<Course {self.code}: {self.name}>'
 
 class Note(db.Model):
+    __table_args__ = (
+        db.Index('ix_note_course_id_created_at', 'course_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
     course = db.relationship('Course', backref=db.backref('notes', lazy=True))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     file_path = db.Column(db.String(200))
+    stored_filename = db.Column(db.String(200), unique=True, index=True)  # İndirme URL'sindeki ad (file_path'ten)
     file_name = db.Column(db.String(200))  # Orijinal dosya adı
-    file_size = db.Column(db.Integer)  # Dosya boyutu (bytes)
+    # Eski değer kullanıcının depolama sayacı için her zaman yüklenir
+    file_size = db.column_property(db.Column(db.Integer), active_history=True)  # Dosya boyutu (bytes)
     file_type = db.Column(db.String(50))  # Dosya türü
     file_url = db.Column(db.String(200))  # URL için dosya adı
-    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # İçerik adresli dosya (FileBlob); eski değer referans sayımı için her zaman yüklenir
+    blob_sha256 = db.column_property(db.Column(db.String(64), index=True), active_history=True)
+    # Yeniden sıkıştırılan görselin orijinali (IMAGE_KEEP_ORIGINAL açıkken)
+    original_blob_sha256 = db.column_property(db.Column(db.String(64), index=True), active_history=True)
+    original_file_size = db.column_property(db.Column(db.Integer), active_history=True)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('uploaded_notes', lazy=True))
+    search_key = db.Column(db.Text)  # Normalize arama anahtarı (search_index)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'content': self.content,
+            'course_id': self.course_id,
+            'course_name': self.course.name if self.course else None,
+            'uploaded_by': self.uploaded_by,
+            'username': self.user.username if self.user else None,
+            'file_name': self.file_name,
+            'file_size': self.file_size,
+            'file_type': self.file_type,
+            'file_url': self.file_url,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
 
 class Question(db.Model):
+    __table_args__ = (
+        db.Index('ix_question_course_id_year', 'course_id', 'year'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     question_text = db.Column(db.Text, nullable=False)
     answer = db.Column(db.Text, nullable=False)
-    year = db.Column(db.Integer, nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False, index=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False, index=True)
     course = db.relationship('Course', backref=db.backref('questions', lazy=True))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     # Dosya alanları (sınav belgesi)
     file_path = db.Column(db.String(200))
+    stored_filename = db.Column(db.String(200), unique=True, index=True)  # İndirme URL'sindeki ad (file_path'ten)
     file_name = db.Column(db.String(200))
     file_size = db.Column(db.Integer)
     file_type = db.Column(db.String(50))
     file_url = db.Column(db.String(200))
+    # İçerik adresli dosya (FileBlob); eski değer referans sayımı için her zaman yüklenir
+    blob_sha256 = db.column_property(db.Column(db.String(64), index=True), active_history=True)
+    search_key = db.Column(db.Text)  # Normalize arama anahtarı (search_index)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'question_text': self.question_text,
+            'year': self.year,
+            'course_id': self.course_id,
+            'course_name': self.course.name if self.course else None,
+            'file_name': self.file_name,
+            'file_size': self.file_size,
+            'file_type': self.file_type,
+            'file_url': self.file_url,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
 
 class Project(db.Model):
+    __table_args__ = (
+        db.Index('ix_project_grade_created_at', 'grade', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    grade = db.Column(db.Integer, nullable=False)
+    grade = db.Column(db.Integer, nullable=False, index=True)
     file_path = db.Column(db.String(200))
+    stored_filename = db.Column(db.String(200), unique=True, index=True)  # İndirme URL'sindeki ad (file_path'ten)
     file_name = db.Column(db.String(200))  # Orijinal dosya adı
-    file_size = db.Column(db.Integer)  # Dosya boyutu (bytes)
+    # Eski değer kullanıcının depolama sayacı için her zaman yüklenir
+    file_size = db.column_property(db.Column(db.Integer), active_history=True)  # Dosya boyutu (bytes)
     file_type = db.Column(db.String(50))  # Dosya türü
     file_url = db.Column(db.String(200))  # URL için dosya adı
     archive_info = db.Column(db.Text)  # Arşiv dosyası bilgileri (JSON)
-    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # İçerik adresli dosya (FileBlob); eski değer referans sayımı için her zaman yüklenir
+    blob_sha256 = db.column_property(db.Column(db.String(64), index=True), active_history=True)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('uploaded_projects', lazy=True))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    search_key = db.Column(db.Text)  # Normalize arama anahtarı (search_index)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'grade': self.grade,
+            'uploaded_by': self.uploaded_by,
+            'file_name': self.file_name,
+            'file_size': self.file_size,
+            'file_type': self.file_type,
+            'file_url': self.file_url,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
 
 class Mentorship(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -258,6 +379,16 @@ class Mentorship(db.Model):
     contact = db.Column(db.String(100), nullable=False)
     image_url = db.Column(db.String(200))
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mentor_name': self.mentor_name,
+            'subject': self.subject,
+            'description': self.description,
+            'contact': self.contact,
+            'image_url': self.image_url
+        }
+
 class CourseReview(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     course_name = db.Column(db.String(100), nullable=False)
@@ -269,11 +400,689 @@ class CourseReview(db.Model):
     author_name = db.Column(db.String(100), nullable=False)
     likes = db.Column(db.Integer, default=0)
     comments_count = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'course_name': self.course_name,
+            'course_type': self.course_type,
+            'grade': self.grade,
+            'rating': self.rating,
+            'review_text': self.review_text,
+            'difficulty_level': self.difficulty_level,
+            'author_name': self.author_name,
+            'likes': self.likes,
+            'comments_count': self.comments_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
     
     def __repr__(self):
         return f'<CourseReview {self.course_name} by {self.author_name}>'
 
+class ReviewComment(db.Model):
+    """Ders yorumlarına yazılan yorumlar (sayısı CourseReview.comments_count'ta tutulur)"""
+    id = db.Column(db.Integer, primary_key=True)
+    review_id = db.Column(db.Integer, db.ForeignKey('course_review.id'), nullable=False)
+    review = db.relationship('CourseReview', backref=db.backref('comments', lazy='dynamic', cascade='all, delete-orphan'))
+    comment_text = db.Column(db.Text, nullable=False)
+    author_name = db.Column(db.String(100), nullable=False, default='Anonim')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Bir yorumun alt yorumları eskiden yeniye sayfalanır
+    __table_args__ = (
+        db.Index('ix_review_comment_review_id_created_at', 'review_id', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'review_id': self.review_id,
+            'text': self.comment_text,
+            'author': self.author_name,
+            'date': self.created_at.strftime('%d.%m.%Y') if self.created_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class SiteStats(db.Model):
+    """Ana sayfa sayaçları (tek satır).
+
+    Tabloları her istekte saymak yerine User/Note/Question/Project ekleme ve
+    silme işlemlerinde aynı transaction içinde atomik olarak güncellenir.
+    """
+    __tablename__ = 'site_stats'
+    ROW_ID = 1
+    # tablo adı -> sayaç kolonu
+    COUNTED_TABLES = {'user': 'users', 'note': 'notes', 'question': 'questions', 'project': 'projects'}
+
+    id = db.Column(db.Integer, primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    notes = db.Column(db.Integer, nullable=False, default=0)
+    questions = db.Column(db.Integer, nullable=False, default=0)
+    projects = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def current(cls):
+        """Sayaç satırını birincil anahtarla oku; yoksa bir kez sayarak oluştur.
+
+        Satırı ilk istekler aynı anda oluşturmaya çalışabilir; ekleme
+        ON CONFLICT DO NOTHING ile yapılır, geç kalan istek var olanı okur.
+        """
+        stats = db.session.get(cls, cls.ROW_ID)
+        if stats is None:
+            user = db.engine.dialect.identifier_preparer.quote(User.__tablename__)
+            db.session.execute(text(
+                f"INSERT INTO site_stats (id, users, notes, questions, projects, updated_at) "
+                f"SELECT :id, (SELECT count(*) FROM {user}), (SELECT count(*) FROM note), "
+                f"(SELECT count(*) FROM question), (SELECT count(*) FROM project), :now "
+                f"WHERE true ON CONFLICT (id) DO NOTHING"  # WHERE: SQLite'ta SELECT ile ON CONFLICT ayrımı için
+            ), {'id': cls.ROW_ID, 'now': datetime.utcnow()})
+            db.session.commit()
+            stats = db.session.get(cls, cls.ROW_ID)
+        return stats
+
+    @classmethod
+    def recount(cls):
+        """Sayaçları tablolardan yeniden hesapla (toplu silme sonrası düzeltme için)"""
+        stats = db.session.get(cls, cls.ROW_ID) or cls(id=cls.ROW_ID)
+        stats.users = User.query.count()
+        stats.notes = Note.query.count()
+        stats.questions = Question.query.count()
+        stats.projects = Project.query.count()
+        db.session.add(stats)
+        db.session.commit()
+        return stats
+
+    def to_dict(self):
+        return {'users': self.users, 'notes': self.notes, 'questions': self.questions, 'projects': self.projects}
+
+def _site_stats_listener(delta):
+    """Ekleme/silme sonrası ilgili sayacı SQL tarafında artır/azalt"""
+    stats_table = SiteStats.__table__
+
+    def listener(mapper, connection, target):
+        column = SiteStats.COUNTED_TABLES[mapper.local_table.name]
+        connection.execute(
+            stats_table.update()
+            .where(stats_table.c.id == SiteStats.ROW_ID)
+            .values({column: stats_table.c[column] + delta, 'updated_at': datetime.utcnow()})
+        )
+    return listener
+
+for _counted in (User, Note, Question, Project):
+    event.listen(_counted, 'after_insert', _site_stats_listener(1))
+    event.listen(_counted, 'after_delete', _site_stats_listener(-1))
+
+class FileBlob(db.Model):
+    """İçerik adresli yüklenen dosya.
+
+    Aynı içerik diskte bir kez (SHA-256 adıyla) saklanır; ``ref_count`` onu
+    kullanan Note/Question/Project kayıtlarının sayısıdır. Son referans
+    kalktığında dosya silinir.
+    """
+    __tablename__ = 'file_blob'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Kayıt türü -> blob özeti tutan kolonlar (notlarda yeniden sıkıştırılan görselin saklanan orijinali de)
+BLOB_COLUMNS = {Note: ('blob_sha256', 'original_blob_sha256'), Question: ('blob_sha256',), Project: ('blob_sha256',)}
+
+def _change_blob_refs(connection, target, sha256, delta, size=None):
+    """Blob referans sayısını SQL tarafında değiştir; azalanları commit sonrası temizlik için işaretle.
+
+    Artış tek bir upsert'tir. Sayaç ``delta``'dan başlıyorsa blob ya yeni
+    yazıldı ya da temizlikten hemen önce yeniden kullanıldı; satır kilidi
+    tutulurken dosyanın hâlâ durduğu doğrulanır (bkz. purge_unreferenced_blobs).
+    """
+    if delta > 0:
+        ref_count = connection.execute(text(
+            "INSERT INTO file_blob (sha256, size, ref_count, created_at) VALUES (:sha256, :size, :delta, :now) "
+            "ON CONFLICT (sha256) DO UPDATE SET ref_count = file_blob.ref_count + :delta RETURNING ref_count"
+        ), {'sha256': sha256, 'size': size, 'delta': delta, 'now': datetime.utcnow()}).scalar()
+        if ref_count == delta and not file_manager.storage.exists(file_manager.blob_key(sha256)):
+            raise StorageError(f"Blob {sha256} was removed by a concurrent cleanup; upload the file again")
+    elif delta < 0:
+        blobs = FileBlob.__table__
+        connection.execute(
+            blobs.update().where(blobs.c.sha256 == sha256).values(ref_count=blobs.c.ref_count + delta)
+        )
+        object_session(target).info.setdefault('released_blobs', set()).add(sha256)
+
+def _blob_size(target, column):
+    return target.file_size if column == 'blob_sha256' else target.original_file_size
+
+def _blob_ref_on_insert(mapper, connection, target):
+    for column in BLOB_COLUMNS[type(target)]:
+        sha256 = getattr(target, column)
+        if sha256:
+            _change_blob_refs(connection, target, sha256, 1, _blob_size(target, column))
+
+def _blob_ref_on_update(mapper, connection, target):
+    for column in BLOB_COLUMNS[type(target)]:
+        history = get_history(target, column)
+        if not history.has_changes():
+            continue
+        for sha256 in history.added:
+            if sha256:
+                _change_blob_refs(connection, target, sha256, 1, _blob_size(target, column))
+        for sha256 in history.deleted:
+            if sha256:
+                _change_blob_refs(connection, target, sha256, -1)
+
+def _blob_ref_on_delete(mapper, connection, target):
+    for column in BLOB_COLUMNS[type(target)]:
+        sha256 = getattr(target, column)
+        if sha256:
+            _change_blob_refs(connection, target, sha256, -1)
+
+def _release_legacy_file(target, file_path):
+    """Blob deposundan önceki kaydın klasördeki dosyasını commit sonrası silinmek üzere işaretle"""
+    if file_path:
+        object_session(target).info.setdefault('released_files', set()).add((type(target), file_path))
+
+def _legacy_file_on_update(mapper, connection, target):
+    blob_history = get_history(target, 'blob_sha256')
+    if (blob_history.deleted or blob_history.unchanged or [None])[0]:
+        return  # eski dosya blob deposundaydı; referans sayımı ilgilenir
+    for file_path in get_history(target, 'file_path').deleted:
+        _release_legacy_file(target, file_path)
+
+def _legacy_file_on_delete(mapper, connection, target):
+    if not target.blob_sha256:
+        _release_legacy_file(target, target.file_path)
+
+for _file_owner in (Note, Question, Project):
+    event.listen(_file_owner, 'before_insert', _blob_ref_on_insert)
+    event.listen(_file_owner, 'before_update', _blob_ref_on_update)
+    event.listen(_file_owner, 'after_delete', _blob_ref_on_delete)
+    event.listen(_file_owner, 'before_update', _legacy_file_on_update)
+    event.listen(_file_owner, 'after_delete', _legacy_file_on_delete)
+
+class StorageQuotaExceeded(Exception):
+    """Kayıt, sahibinin depolama kotasını aşıyor (flush sırasında)"""
+
+    def __init__(self, user_id):
+        super().__init__(f"Storage quota exceeded for user {user_id}")
+        self.user_id = user_id
+
+def _change_storage_used(connection, user_id, delta):
+    """Kullanıcının depolama sayacını SQL tarafında artır/azalt.
+
+    Artış kotayla aynı UPDATE içinde karşılaştırılır; eşzamanlı iki yükleme
+    ikisi de storage_remaining'i geçse bile yalnızca sığanı yazılır.
+    """
+    if not user_id or not delta:
+        return
+    users = User.__table__
+    update = users.update().where(users.c.id == user_id).values(storage_used=users.c.storage_used + delta)
+    if delta > 0:
+        limit = func.coalesce(users.c.storage_quota, app.config['STORAGE_QUOTA_MB'] * 1024 * 1024)
+        update = update.where((limit == 0) | (users.c.storage_used + delta <= limit))
+    if connection.execute(update).rowcount == 0 and delta > 0:
+        raise StorageQuotaExceeded(user_id)
+
+# Kotaya sayılan kolonlar; notlarda saklanan görsel orijinali de
+STORAGE_COLUMNS = {Note: ('file_size', 'original_file_size'), Project: ('file_size',)}
+
+def _stored_size(target):
+    return sum(getattr(target, column) or 0 for column in STORAGE_COLUMNS[type(target)])
+
+def _storage_on_insert(mapper, connection, target):
+    _change_storage_used(connection, target.uploaded_by, _stored_size(target))
+
+def _storage_on_update(mapper, connection, target):
+    sizes = [get_history(target, column) for column in STORAGE_COLUMNS[type(target)]]
+    owner = get_history(target, 'uploaded_by')
+    if not owner.has_changes() and not any(size.has_changes() for size in sizes):
+        return
+    old_size = sum((size.deleted or size.unchanged or [None])[0] or 0 for size in sizes)
+    old_owner = (owner.deleted or owner.unchanged or [target.uploaded_by])[0]
+    if old_owner == target.uploaded_by:
+        # Dosya değişimi tek adımda: eski dosyanın yeri kota kontrolünden önce düşülür
+        _change_storage_used(connection, old_owner, _stored_size(target) - old_size)
+    else:
+        _change_storage_used(connection, old_owner, -old_size)
+        _change_storage_used(connection, target.uploaded_by, _stored_size(target))
+
+def _storage_on_delete(mapper, connection, target):
+    _change_storage_used(connection, target.uploaded_by, -_stored_size(target))
+
+# Soruların sahibi yok (uploaded_by); kotaya yalnızca notlar ve projeler sayılır
+for _owned in (Note, Project):
+    event.listen(_owned, 'after_insert', _storage_on_insert)
+    event.listen(_owned, 'after_update', _storage_on_update)
+    event.listen(_owned, 'after_delete', _storage_on_delete)
+
+# Eski dosyalar uploads/<klasör>/<ad> altındadır (notes/projects/questions)
+LEGACY_FOLDER_FOR = {table: folder for folder, table in LEGACY_FOLDERS.items()}
+
+def purge_unreferenced_blobs(sha256s):
+    """Referansı kalmayan blob kayıtlarını ve dosyalarını sil; silinen özetleri döndür"""
+    blobs = FileBlob.__table__
+    purged = []
+    for sha256 in sha256s:
+        # Dosya, koşullu silmenin aldığı satır kilidi bırakılmadan kaldırılır. Aynı içeriği
+        # yükleyen istek sayacı artıramadan bekler; ardından dosyanın yokluğunu görür
+        # (_change_blob_refs). Sayacı önce artırdıysa koşul tutmaz, dosya kalır.
+        with db.engine.begin() as conn:
+            deleted = conn.execute(
+                blobs.delete().where(blobs.c.sha256 == sha256, blobs.c.ref_count <= 0)
+            ).rowcount
+            if deleted:
+                conn.execute(ArchiveEntry.__table__.delete().where(ArchiveEntry.blob_sha256 == sha256))
+                file_manager.delete_blob(sha256)
+                purged.append(sha256)
+    return purged
+
+def purge_released_legacy_files(released):
+    """Artık hiçbir kaydın göstermediği eski dosyaları sil; silinen anahtarları döndür"""
+    removed = []
+    with db.engine.connect() as conn:
+        for model, file_path in released:
+            table, name = model.__table__, stored_filename_for(file_path)
+            # Eski veride aynı dosyayı gösteren birden fazla kayıt olabilir
+            still_used = conn.execute(
+                select(table.c.id).where((table.c.file_path == file_path) | (table.c.stored_filename == name)).limit(1)
+            ).first()
+            key = f'{LEGACY_FOLDER_FOR[table.name]}/{name}'
+            if still_used is None and file_manager.legacy_storage.delete(key):
+                removed.append(key)
+    return removed
+
+@event.listens_for(db.session, 'after_commit')
+def _purge_released_blobs(session):
+    released = session.info.pop('released_blobs', None)
+    if released:
+        try:
+            purge_unreferenced_blobs(released)
+        except Exception as e:
+            logging.getLogger('error').error(f"Blob cleanup failed for {len(released)} blobs: {e}")
+    released_files = session.info.pop('released_files', None)
+    if released_files:
+        try:
+            purge_released_legacy_files(released_files)
+        except Exception as e:
+            logging.getLogger('error').error(f"Legacy file cleanup failed for {len(released_files)} files: {e}")
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_released_files(session):
+    # Geri alınan silme/değişiklikler dosyaları serbest bırakmaz
+    session.info.pop('released_blobs', None)
+    session.info.pop('released_files', None)
+
+def set_stored_filename(mapper, connection, target):
+    """Yeni kayıtta indirme aramasında kullanılan dosya adını doldur"""
+    target.stored_filename = stored_filename_for(target.file_path)
+
+def refresh_stored_filename(mapper, connection, target):
+    """Yalnızca file_path değiştiyse dosya adını yeniden hesapla.
+
+    Migration 10 yinelenen adlı eski kayıtlarda stored_filename'i boş bırakır;
+    başlık gibi başka bir alan düzenlenince ad yeniden atanırsa unique index'e
+    takılır.
+    """
+    if get_history(target, 'file_path').has_changes():
+        target.stored_filename = stored_filename_for(target.file_path)
+
+for _file_owner in (Note, Question, Project):
+    event.listen(_file_owner, 'before_insert', set_stored_filename)
+    event.listen(_file_owner, 'before_update', refresh_stored_filename)
+
+# Aranan alanlar her değiştiğinde normalize arama anahtarını güncelle
+for _searchable in (Note, Question, Project):
+    event.listen(_searchable, 'before_insert', search_index.refresh_search_key)
+    event.listen(_searchable, 'before_update', search_index.refresh_search_key)
+
+class ArchiveEntry(db.Model):
+    """Zip/rar blob'unun merkez dizinindeki bir üye.
+
+    Dizin blob özeti başına bir kez çıkarılır; aynı arşivi yükleyen projeler
+    aynı kayıtları paylaşır. ``parent`` üyenin bulunduğu klasördür ('' kök),
+    klasör listeleme bu kolonda eşitlik aramasıyla yapılır. Arşivde ayrıca
+    yer almayan ara klasörler de ``is_dir`` kaydı olarak eklenir.
+    """
+    __tablename__ = 'archive_entry'
+    id = db.Column(db.Integer, primary_key=True)
+    blob_sha256 = db.Column(db.String(64), nullable=False)
+    path = db.Column(db.String(1024), nullable=False)
+    member = db.Column(db.String(1024))  # arşivdeki özgün ad ('\\' ya da '/' ile başlayabilir); örtük klasörlerde boş
+    parent = db.Column(db.String(1024), nullable=False, default='')
+    is_dir = db.Column(db.Boolean, nullable=False, default=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    compressed_size = db.Column(db.BigInteger, nullable=False, default=0)
+    crc = db.Column(db.BigInteger)  # CRC-32 (işaretsiz)
+    modified_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('blob_sha256', 'path', name='uq_archive_entry_blob_path'),
+        db.Index('ix_archive_entry_blob_parent_path', 'blob_sha256', 'parent', 'path'),
+    )
+
+    @property
+    def name(self):
+        return self.path.rstrip('/').rsplit('/', 1)[-1]
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'name': self.name,
+            'is_dir': self.is_dir,
+            'size': self.size,
+            'compressed_size': self.compressed_size,
+            'crc': f'{self.crc:08x}' if self.crc is not None else None,
+            'modified_at': self.modified_at.isoformat() if self.modified_at else None,
+        }
+
+def _entry_parent(path):
+    """'a/b/c.txt' -> 'a/b/', 'a/b/' -> 'a/', 'c.txt' -> ''"""
+    head = path.rstrip('/').rpartition('/')[0]
+    return head + '/' if head else ''
+
+def index_archive_entries(sha256, entries):
+    """Arşiv üyelerini (ve örtük ara klasörleri) toplu yaz; zaten dizinlenmişse atla"""
+    if db.session.query(ArchiveEntry.id).filter_by(blob_sha256=sha256).first() is not None:
+        return 0
+    rows = {}
+    for entry in entries:
+        path = entry['path'].lstrip('/')
+        if not path or '..' in path.split('/'):
+            continue  # tehlikeli ya da boş yollar listelenmez
+        rows[path] = dict(entry, path=path, blob_sha256=sha256, parent=_entry_parent(path))
+        parent = _entry_parent(path)
+        while parent and parent not in rows:
+            rows[parent] = {'blob_sha256': sha256, 'path': parent, 'member': None, 'parent': _entry_parent(parent),
+                            'is_dir': True, 'size': 0, 'compressed_size': 0, 'crc': None, 'modified_at': None}
+            parent = _entry_parent(parent)
+    if rows:
+        db.session.execute(ArchiveEntry.__table__.insert(), list(rows.values()))
+    return len(rows)
+
+class BackgroundJob(db.Model):
+    """Arka plan iş havuzunda (jobs.JobQueue) çalışan yükleme sonrası iş.
+
+    Durum: queued -> running -> done / failed. ``target_type``/``target_id``
+    arayüzün bir kayıt için bekleyen işi bulmasını sağlar. Çalışan işi
+    sahiplenen süreç (``owner``) ``heartbeat_at``'i düzenli tazeler; nabzı
+    JOB_LEASE süresince gelmeyen iş yeniden kuyruğa alınır.
+    """
+    __tablename__ = 'background_job'
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    PENDING = (QUEUED, RUNNING)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED, index=True)
+    payload = db.Column(db.Text)  # JSON
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
+    target_type = db.Column(db.String(20))
+    target_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    owner = db.Column(db.String(100))  # '<host>:<pid>'
+    heartbeat_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_background_job_target', 'target_type', 'target_id'),
+    )
+
+    @classmethod
+    def pending_for(cls, target_type, target_ids):
+        """{target_id: iş} - kayıtlar için henüz bitmemiş işler"""
+        if not target_ids:
+            return {}
+        jobs = cls.query.filter(
+            cls.target_type == target_type, cls.target_id.in_(target_ids), cls.status.in_(cls.PENDING)
+        ).all()
+        return {job.target_id: job for job in jobs}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class UploadSession(db.Model):
+    """Parça parça yüklenen dosyanın sunucudaki durumu (resumable.py).
+
+    ``upload_offset`` kaydedilmiş bayt sayısıdır; istemci bağlantı koptuğunda
+    buradan devam eder. Baytlar ``uploads/temp/<temp_name>`` dosyasındadır.
+    """
+    __tablename__ = 'upload_session'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    file_type = db.Column(db.String(20), nullable=False)  # notes / projects / questions
+    file_name = db.Column(db.String(255), nullable=False)
+    length = db.Column(db.BigInteger, nullable=False)
+    upload_offset = db.Column(db.BigInteger, nullable=False, default=0)
+    temp_name = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    @property
+    def complete(self):
+        return self.upload_offset == self.length
+
+    @property
+    def temp_path(self):
+        return os.path.join(file_manager.temp_folder, self.temp_name)
+
+    def expires_at(self):
+        return self.updated_at + timedelta(seconds=app.config['UPLOAD_EXPIRES'])
+
+def discard_upload(upload):
+    """Yükleme kaydını ve geçici dosyasını sil (commit çağırana bırakılır)"""
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+    db.session.delete(upload)
+
+def purge_expired_uploads():
+    """UPLOAD_EXPIRES süresince dokunulmayan yüklemeleri sil; silinen sayısını döndür"""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['UPLOAD_EXPIRES'])
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        discard_upload(upload)
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+def storage_remaining(user_id, released=0, upload_id=None):
+    """Kullanıcının kotasında kalan byte; kota yoksa None.
+
+    Süren parça yüklemelerinin bildirilen boyutu ayrılmış sayılır (``upload_id``
+    hariç). ``released`` yeni dosyanın yerine geçeceği eski dosyanın boyutudur.
+    Yalnızca dosyayı depoya yazmadan önceki ön kontrol içindir; kesin kontrol
+    commit sırasında _change_storage_used'dadır.
+    """
+    user = db.session.get(User, user_id)
+    limit = user.storage_limit() if user else None
+    if limit is None:
+        return None
+    reserved = db.session.query(func.coalesce(func.sum(UploadSession.length), 0)).filter(
+        UploadSession.user_id == user_id, UploadSession.id != upload_id
+    ).scalar()
+    return limit - user.storage_used - reserved + released
+
+def commit_file_record(*objects):
+    """Dosyalı kaydı commit et; kota o arada dolduysa geri alıp kota mesajını döndür.
+
+    ``objects`` verilirse yeni kayıt olarak eklenir (add_and_commit). Depoya
+    yazılmış dosya sahipsiz kalır; reconcile-files temizler.
+    """
+    try:
+        if objects:
+            add_and_commit(*objects)
+        else:
+            db.session.commit()
+    except StorageQuotaExceeded as e:
+        db.session.rollback()
+        return file_manager.quota_message(storage_remaining(e.user_id))
+    return None
+
+def take_upload(upload_id, file_type, owner_id=None, released=0):
+    """Tamamlanmış parça yüklemesini FileManager deposuna al; (dosya bilgisi, mesaj) döner.
+
+    Kota kaydın sahibine (``owner_id``, varsayılan oturumdaki kullanıcı) göre kontrol edilir.
+    """
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != session['user_id'] or upload.file_type != file_type:
+        return None, 'Yükleme bulunamadı'
+    if not upload.complete:
+        return None, 'Dosya yüklemesi tamamlanmadı'
+    quota_remaining = storage_remaining(owner_id or session['user_id'], released, upload_id=upload.id)
+    file_info, message = file_manager.save_temp_file(upload.temp_path, upload.file_name, file_type,
+                                                     session['user_id'], quota_remaining)
+    # Geçici dosya depoya taşındı ya da reddedilip silindi; kayıt her iki durumda da biter
+    db.session.delete(upload)
+    db.session.commit()
+    return file_info, message
+
+def _archive_info_job(payload):
+    """Arşivin merkez dizinini tabloya, kısa özetini projeye yaz"""
+    project = db.session.get(Project, payload['project_id'])
+    if project is None or project.blob_sha256 != payload['sha256']:
+        return {'skipped': True}  # proje silindi ya da dosyası değişti
+    with file_manager.open_blob(payload['sha256']) as source:
+        entries = file_manager.list_archive_entries(source, payload['ext'])
+    try:
+        with db.session.begin_nested():
+            index_archive_entries(payload['sha256'], entries)
+    except IntegrityError:
+        pass  # aynı arşivi yükleyen başka bir projenin işi dizini yazdı
+    info = archive_summary(payload['ext'], entries)
+    project.archive_info = json.dumps(info)
+    return {'file_count': info['file_count'], 'total_size': info['total_size']}
+
+def _preview_job(payload):
+    """Varsayılan boyuttaki önizlemeyi üret"""
+    if not file_manager.blob_exists(payload['sha256']):
+        return {'skipped': True}  # son referansı silinmiş
+    with file_manager.blob_file(payload['sha256']) as source:
+        path = file_manager.previews.get_or_create(payload['sha256'], source, payload['ext'])
+    return {'generated': path is not None}
+
+JOB_HANDLERS = {
+    'archive_info': _archive_info_job,
+    'preview': _preview_job,
+}
+
+def job_owner():
+    """Bu sürecin iş sahipliği kimliği (fork sonrası her worker'da farklıdır)"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+@retry_on_lock(db.session)
+def claim_background_job(job_id):
+    """Kuyruktaki işi bu süreç adına sahiplen; başkası aldıysa False"""
+    jobs_table = BackgroundJob.__table__
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        jobs_table.update()
+        .where(jobs_table.c.id == job_id, jobs_table.c.status == BackgroundJob.QUEUED)
+        .values(status=BackgroundJob.RUNNING, started_at=now, heartbeat_at=now, owner=job_owner(),
+                attempts=jobs_table.c.attempts + 1)
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+@retry_on_lock(db.session)
+def finish_background_job(job_id, status, result=None, error=None):
+    job = db.session.get(BackgroundJob, job_id)
+    job.status, job.result, job.error = status, result, error
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+def run_background_job(job_id):
+    """İşi sahiplen, çalıştır ve sonucunu kaydet (havuz iş parçacığında çalışır)"""
+    with app.app_context():
+        if not claim_background_job(job_id):
+            return  # başka bir worker aldı ya da iş zaten bitti
+
+        job = db.session.get(BackgroundJob, job_id)
+        kind = job.kind
+        try:
+            result = JOB_HANDLERS[kind](json.loads(job.payload or '{}'))
+        except Exception as e:
+            db.session.rollback()
+            loggers['error'].error(f"Background job {job_id} ({kind}) failed: {e}")
+            finish_background_job(job_id, BackgroundJob.FAILED, error=str(e))
+            return
+        finish_background_job(job_id, BackgroundJob.DONE, result=json.dumps(result))
+
+def renew_job_leases():
+    """Bu sürecin çalıştırdığı işlerin nabzını tazele (iş havuzunun nabız iş parçacığında)"""
+    jobs_table = BackgroundJob.__table__
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(
+            jobs_table.update()
+            .where(jobs_table.c.owner == job_owner(), jobs_table.c.status == BackgroundJob.RUNNING)
+            .values(heartbeat_at=datetime.utcnow())
+        )
+
+# Arka plan işleri: JOB_WORKERS=0 işleri istek içinde çalıştırır
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', DEFAULT_WORKERS))
+app.config['JOB_HEARTBEAT'] = int(os.getenv('JOB_HEARTBEAT', DEFAULT_HEARTBEAT_INTERVAL))  # saniye
+app.config['JOB_LEASE'] = int(os.getenv('JOB_LEASE', 4 * app.config['JOB_HEARTBEAT']))  # saniye
+job_queue = JobQueue(run_background_job, workers=app.config['JOB_WORKERS'],
+                     heartbeat=renew_job_leases, heartbeat_interval=app.config['JOB_HEARTBEAT'])
+atexit.register(job_queue.shutdown, wait=False)
+
+def enqueue_job(kind, payload, target=None):
+    """İşi kaydet ve havuza ver; kaydın commit edilmiş olması gerekir"""
+    user_id = session.get('user_id') if has_request_context() else None
+    job = BackgroundJob(kind=kind, payload=json.dumps(payload), user_id=user_id)
+    if target is not None:
+        job.target_type, job.target_id = target.__tablename__, target.id
+    add_and_commit(job)
+    job_queue.submit(job.id)
+    return job
+
+def schedule_file_jobs(record, file_info):
+    """Yüklenen dosya için önizleme ve arşiv listesi işlerini kuyruğa al"""
+    sha256 = file_info['sha256']
+    ext = file_info['saved_name'].rsplit('.', 1)[-1].lower()
+    jobs = []
+    # Aynı içerik daha önce yüklendiyse önizlemesi zaten vardır
+    if previews.can_preview(ext) and not file_manager.previews.cached(sha256):
+        jobs.append(enqueue_job('preview', {'sha256': sha256, 'ext': ext}))
+    if isinstance(record, Project) and ext in ('zip', 'rar'):
+        jobs.append(enqueue_job('archive_info', {'project_id': record.id, 'sha256': sha256, 'ext': ext},
+                                target=record))
+    return jobs
+
+def resume_pending_jobs():
+    """Kuyruktaki işleri ve sahibi ölmüş (nabzı JOB_LEASE'i aşmış) yarım işleri yeniden havuza ver.
+
+    Uzun süren fakat nabzı gelen işlere dokunulmaz.
+    """
+    jobs_table = BackgroundJob.__table__
+    expired_before = datetime.utcnow() - timedelta(seconds=app.config['JOB_LEASE'])
+    db.session.execute(
+        jobs_table.update()
+        .where(jobs_table.c.status == BackgroundJob.RUNNING,
+               (jobs_table.c.heartbeat_at < expired_before) | jobs_table.c.heartbeat_at.is_(None))
+        .values(status=BackgroundJob.QUEUED, owner=None)
+    )
+    db.session.commit()
+    job_ids = db.session.execute(
+        select(jobs_table.c.id).where(jobs_table.c.status == BackgroundJob.QUEUED).order_by(jobs_table.c.id)
+    ).scalars().all()
+    for job_id in job_ids:
+        job_queue.submit(job_id)
+    return len(job_ids)
+
 # One-time DB initialization after all models are defined
 _DB_INITIALIZED = False
 
@@ -341,9 +1150,11 @@ def log_response(response):
     # Security headers
     response.headers['X-Frame-Options'] = 'ALLOWALL'
     response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    # İndirmeler gibi önbellek politikasını kendisi belirleyen yanıtlara dokunma
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
     
     # send_file response'ları için size hesaplama
     try:
@@ -363,34 +1174,52 @@ def log_response(response):
     
     return response
 
+# Keyset sayfalama yardımcıları
+def get_page_args():
+    """İstekten cursor ve sayfa boyutunu oku"""
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    return cursor, limit
+
+def wants_json():
+    """Liste sayfasının JSON varyantı istendi mi?"""
+    return request.args.get('format') == 'json'
+
+def page_json(page):
+    """Keyset sayfasını JSON yanıtına çevir"""
+    return jsonify({
+        'items': [item.to_dict() for item in page.items],
+        'next_cursor': page.next_cursor,
+        'has_more': page.has_more
+    })
+
 # Ana sayfa
 @app.route('/')
+@cached_page(page_cache)
 def index():
     # Son eklenen içerikleri göster
     recent_notes = Note.query.order_by(Note.created_at.desc()).limit(5).all()
     recent_questions = Question.query.order_by(Question.created_at.desc()).limit(5).all()
     recent_projects = Project.query.order_by(Project.created_at.desc()).limit(5).all()
     
-    # İstatistikler
-    total_users = User.query.count()
-    total_notes = Note.query.count()
-    total_questions = Question.query.count()
-    total_projects = Project.query.count()
+    # İstatistikler: tablolar sayılmaz, sayaç satırı okunur
+    stats = SiteStats.current()
     
     return render_template('index.html', 
                          recent_notes=recent_notes,
                          recent_questions=recent_questions,
                          recent_projects=recent_projects,
-                         stats={'users': total_users, 'notes': total_notes, 
-                                'questions': total_questions, 'projects': total_projects})
+                         stats=stats.to_dict())
 
 # Hakkımızda sayfası
 @app.route('/about')
+@cached_page(page_cache)
 def about():
     return render_template('about.html')
 
 # AGNO ve ÇAN Hesaplayıcı
 @app.route('/agno')
+@cached_page(page_cache)
 def agno_calculator():
     return render_template('agno.html')
 
@@ -432,8 +1261,8 @@ def register():
                 package_type=selected_package,  # Artık herkes 'temel' paket
                 is_active=True  # Ödeme akışı kaldırıldı, kullanıcı hemen aktif
             )
-            db.session.add(user)
-            db.session.commit()
+            add_and_commit(user)
+            invalidate_page_cache()
             
             # Log successful registration
             loggers['app'].info(f"User registered successfully: {username} (ID: {user.id}) - Package: {selected_package}")
@@ -449,6 +1278,11 @@ def register():
         flash('Kayıt sırasında bir hata oluştu. Lütfen tekrar deneyin.', 'error')
         return render_template('register.html')
 
+@retry_on_lock(db.session)
+def record_login(user):
+    user.last_login = datetime.utcnow()
+    db.session.commit()
+
 # Giriş sayfası
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -468,8 +1302,7 @@ def login():
                 session['username'] = user.username
                 session['is_admin'] = user.is_admin
                 
-                user.last_login = datetime.utcnow()
-                db.session.commit()
+                record_login(user)
                 
                 # Log successful login
                 loggers['app'].info(f"User logged in successfully: {username} (ID: {user.id}) - IP: {request.remote_addr}")
@@ -512,6 +1345,7 @@ def logout():
 
 # Sınıf seçimi sayfası
 @app.route('/grade/<int:grade>')
+@cached_page(page_cache)
 def grade_page(grade):
     courses = Course.query.filter_by(grade=grade).order_by(Course.semester, Course.name).all()
     return render_template('grade.html', grade=grade, courses=courses)
@@ -541,20 +1375,27 @@ def notes():
     # Debug log
     loggers['app'].info(f"Notes page accessed - Total courses: {len(courses)} - Selected course: {selected_course}")
     
+    # Ders ve yükleyen kullanıcı tek sorguda JOIN ile yüklenir (N+1 yok)
+    notes_query = Note.query.options(joinedload(Note.course), joinedload(Note.user))
+    if selected_course:
+        notes_query = notes_query.filter_by(course_id=selected_course)
+    cursor, limit = get_page_args()
+    page = keyset_paginate(notes_query, [Note.created_at, Note.id], cursor, limit)
+    notes_list = page.items
     if selected_course:
-        notes_list = Note.query.filter_by(course_id=selected_course).all()
         loggers['app'].info(f"Filtered notes by course {selected_course}: {len(notes_list)} notes found")
     else:
-        notes_list = Note.query.all()
         loggers['app'].info(f"All notes requested: {len(notes_list)} notes found")
     
     # Her not için ders bilgisini logla
     for note in notes_list:
-        course = Course.query.get(note.course_id) if note.course_id else None
-        course_name = course.name if course else "No Course"
+        course_name = note.course.name if note.course else "No Course"
         loggers['app'].debug(f"Note: {note.title} - Course ID: {note.course_id} - Course Name: {course_name}")
     
-    return render_template('notes.html', notes=notes_list, courses=courses, selected_course=selected_course)
+    if wants_json():
+        return page_json(page)
+    return render_template('notes.html', notes=notes_list, courses=courses, selected_course=selected_course,
+                         next_cursor=page.next_cursor)
 
 # Çıkmış sorular
 @app.route('/questions')
@@ -578,11 +1419,17 @@ def questions():
             flash('Geçersiz sınıf seçimi!', 'error')
             return redirect(url_for('index'))
     
+    cursor, limit = get_page_args()
+    questions_query = Question.query.options(joinedload(Question.course))
     if selected_course:
-        questions_list = Question.query.filter_by(course_id=selected_course).order_by(Question.year.desc()).all()
+        questions_query = questions_query.filter_by(course_id=selected_course)
+        page = keyset_paginate(questions_query, [Question.year, Question.id], cursor, limit)
     else:
-        questions_list = Question.query.order_by(Question.created_at.desc()).all()
-    return render_template('questions.html', questions=questions_list, courses=courses, selected_course=selected_course)
+        page = keyset_paginate(questions_query, [Question.created_at, Question.id], cursor, limit)
+    if wants_json():
+        return page_json(page)
+    return render_template('questions.html', questions=page.items, courses=courses, selected_course=selected_course,
+                         next_cursor=page.next_cursor)
 
 # Soru silme (admin)
 @app.route('/questions/delete/<int:question_id>', methods=['POST'])
@@ -595,17 +1442,10 @@ def delete_question(question_id):
         return redirect(url_for('questions'))
 
     q = Question.query.get_or_404(question_id)
-    # Dosyayı sil
-    if q.file_path:
-        try:
-            file_path = os.path.join('uploads', 'questions', q.file_path.split('/')[-1])
-            if os.path.exists(file_path):
-                file_manager.delete_file(file_path)
-        except Exception:
-            pass
-
+    # Dosya commit sonrası silinir (blob referansı ya da eski dosya)
     db.session.delete(q)
     db.session.commit()
+    invalidate_page_cache()
     flash('Soru başarıyla silindi!', 'success')
     return redirect(url_for('questions'))
 
@@ -652,9 +1492,12 @@ def add_question():
             q.file_size = file_info['file_size']
             q.file_type = file_info['saved_name'].split('.')[-1].upper()
             q.file_url = file_info['file_url']
+            q.blob_sha256 = file_info['sha256']
 
-        db.session.add(q)
-        db.session.commit()
+        add_and_commit(q)
+        invalidate_page_cache()
+        if file_info:
+            schedule_file_jobs(q, file_info)
         flash('Soru başarıyla eklendi!', 'success')
         return redirect(url_for('questions'))
 
@@ -696,7 +1539,8 @@ def add_note():
             if file and file.filename:
                 loggers['file_upload'].info(f"File upload attempt: {file.filename} - Type: notes - User: {session['user_id']} - IP: {request.remote_addr}")
                 
-                file_info, message = file_manager.save_file(file, 'notes', session['user_id'])
+                file_info, message = file_manager.save_file(file, 'notes', session['user_id'],
+                                                            storage_remaining(session['user_id']))
                 if not file_info:
                     loggers['file_upload'].error(f"File upload failed: {file.filename} - Error: {message} - User: {session['user_id']}")
                     flash(message, 'error')
@@ -718,9 +1562,17 @@ def add_note():
                 note.file_size = file_info['file_size']
                 note.file_type = file_info['saved_name'].split('.')[-1].upper()
                 note.file_url = file_info['file_url']
+                note.blob_sha256 = file_info['sha256']
+                note.original_blob_sha256 = file_info['original_sha256']
+                note.original_file_size = file_info['original_size']
             
-            db.session.add(note)
-            db.session.commit()
+            error = commit_file_record(note)
+            if error:
+                flash(error, 'error')
+                return redirect(url_for('add_note'))
+            invalidate_page_cache()
+            if file_info:
+                schedule_file_jobs(note, file_info)
             
             # Log successful note creation with course details
             course = Course.query.get(course_id)
@@ -770,13 +1622,12 @@ def edit_note(note_id):
             return redirect(url_for('edit_note', note_id=note_id))
         
         # Dosya güncelleme
+        file_info = None
         if file and file.filename:
-            # Eski dosyayı sil
-            if note.file_path and os.path.exists(note.file_path):
-                file_manager.delete_file(note.file_path)
-            
-            # Yeni dosyayı yükle
-            file_info, message = file_manager.save_file(file, 'notes', session['user_id'])
+            # Yeni dosyayı yükle (eskisi commit sonrası silinir); kota not sahibinin, eski dosya düşülerek
+            file_info, message = file_manager.save_file(
+                file, 'notes', session['user_id'], storage_remaining(note.uploaded_by, _stored_size(note))
+            )
             if not file_info:
                 flash(message, 'error')
                 return redirect(url_for('edit_note', note_id=note_id))
@@ -786,12 +1637,21 @@ def edit_note(note_id):
             note.file_size = file_info['file_size']
             note.file_type = file_info['saved_name'].split('.')[-1].upper()
             note.file_url = file_info['file_url']
+            note.blob_sha256 = file_info['sha256']
+            note.original_blob_sha256 = file_info['original_sha256']
+            note.original_file_size = file_info['original_size']
         
         note.title = title
         note.content = content
         note.course_id = course_id
         
-        db.session.commit()
+        error = commit_file_record()
+        if error:
+            flash(error, 'error')
+            return redirect(url_for('edit_note', note_id=note_id))
+        invalidate_page_cache()
+        if file_info:
+            schedule_file_jobs(note, file_info)
         flash('Not başarıyla güncellendi!', 'success')
         return redirect(url_for('notes'))
     
@@ -812,12 +1672,10 @@ def delete_note(note_id):
         flash('Bu notu silme yetkiniz yok!', 'error')
         return redirect(url_for('notes'))
     
-    # Dosyayı sil
-    if note.file_path and os.path.exists(note.file_path):
-        file_manager.delete_file(note.file_path)
-    
+    # Dosya commit sonrası silinir (blob referansı ya da eski dosya)
     db.session.delete(note)
     db.session.commit()
+    invalidate_page_cache()
     
     flash('Not başarıyla silindi!', 'success')
     return redirect(url_for('notes'))
@@ -829,12 +1687,17 @@ def delete_note(note_id):
 def projects():
     grade = request.args.get('grade', type=int)
     
+    projects_query = Project.query.options(joinedload(Project.user))
     if grade:
-        projects_list = Project.query.filter_by(grade=grade).all()
-    else:
-        projects_list = Project.query.all()
+        projects_query = projects_query.filter_by(grade=grade)
     
-    return render_template('projects.html', projects=projects_list, selected_grade=grade)
+    cursor, limit = get_page_args()
+    page = keyset_paginate(projects_query, [Project.created_at, Project.id], cursor, limit)
+    if wants_json():
+        return page_json(page)
+    pending_jobs = BackgroundJob.pending_for('project', [p.id for p in page.items if not p.archive_info])
+    return render_template('projects.html', projects=page.items, selected_grade=grade,
+                         next_cursor=page.next_cursor, pending_jobs=pending_jobs)
 
 # Proje ekleme
 @app.route('/projects/add', methods=['GET', 'POST'])
@@ -855,16 +1718,17 @@ def add_project():
         
         # Dosya yükleme işlemi
         file_info = None
-        archive_info = None
-        if file and file.filename:
-            file_info, message = file_manager.save_file(file, 'projects', session['user_id'])
+        upload_id = request.form.get('upload_id')
+        if upload_id or (file and file.filename):
+            # Büyük dosyalar /uploads ile parça parça gelir; form yalnızca kimliğini taşır
+            if upload_id:
+                file_info, message = take_upload(upload_id, 'projects')
+            else:
+                file_info, message = file_manager.save_file(file, 'projects', session['user_id'],
+                                                            storage_remaining(session['user_id']))
             if not file_info:
                 flash(message, 'error')
                 return redirect(url_for('add_project'))
-            
-            # Arşiv dosyası bilgilerini çıkar
-            if file_info['saved_name'].endswith(('.zip', '.rar')):
-                archive_info = file_manager.extract_archive_info(file_info['file_path'])
         
         # Proje kaydetme
         project = Project(
@@ -880,12 +1744,16 @@ def add_project():
             project.file_size = file_info['file_size']
             project.file_type = file_info['saved_name'].split('.')[-1].upper()
             project.file_url = file_info['file_url']
-            if archive_info:
-                import json
-                project.archive_info = json.dumps(archive_info)
+            project.blob_sha256 = file_info['sha256']
         
-        db.session.add(project)
-        db.session.commit()
+        error = commit_file_record(project)
+        if error:
+            flash(error, 'error')
+            return redirect(url_for('add_project'))
+        invalidate_page_cache()
+        # Arşiv listesi ve önizleme arka planda çıkarılır; sayfa durumu yoklar
+        if file_info:
+            schedule_file_jobs(project, file_info)
         
         flash('Proje başarıyla eklendi!', 'success')
         return redirect(url_for('projects'))
@@ -917,13 +1785,16 @@ def edit_project(project_id):
             return redirect(url_for('edit_project', project_id=project_id))
         
         # Dosya güncelleme
-        if file and file.filename:
-            # Eski dosyayı sil
-            if project.file_path and os.path.exists(project.file_path):
-                file_manager.delete_file(project.file_path)
-            
-            # Yeni dosyayı yükle
-            file_info, message = file_manager.save_file(file, 'projects', session['user_id'])
+        file_info = None
+        upload_id = request.form.get('upload_id')
+        if upload_id or (file and file.filename):
+            # Yeni dosyayı yükle (eskisi commit sonrası silinir)
+            released = project.file_size or 0
+            if upload_id:
+                file_info, message = take_upload(upload_id, 'projects', project.uploaded_by, released)
+            else:
+                file_info, message = file_manager.save_file(file, 'projects', session['user_id'],
+                                                            storage_remaining(project.uploaded_by, released))
             if not file_info:
                 flash(message, 'error')
                 return redirect(url_for('edit_project', project_id=project_id))
@@ -933,19 +1804,21 @@ def edit_project(project_id):
             project.file_size = file_info['file_size']
             project.file_type = file_info['saved_name'].split('.')[-1].upper()
             project.file_url = file_info['file_url']
-            
-            # Arşiv dosyası bilgilerini güncelle
-            if file_info['saved_name'].endswith(('.zip', '.rar')):
-                archive_info = file_manager.extract_archive_info(file_info['file_path'])
-                if archive_info:
-                    import json
-                    project.archive_info = json.dumps(archive_info)
+            project.blob_sha256 = file_info['sha256']
+            # Eski arşivin listesi yeni dosyanınki çıkarılana kadar gösterilmez
+            project.archive_info = None
         
         project.title = title
         project.description = description
         project.grade = grade
         
-        db.session.commit()
+        error = commit_file_record()
+        if error:
+            flash(error, 'error')
+            return redirect(url_for('edit_project', project_id=project_id))
+        invalidate_page_cache()
+        if file_info:
+            schedule_file_jobs(project, file_info)
         flash('Proje başarıyla güncellendi!', 'success')
         return redirect(url_for('projects'))
     
@@ -965,28 +1838,33 @@ def delete_project(project_id):
         flash('Bu projeyi silme yetkiniz yok!', 'error')
         return redirect(url_for('projects'))
     
-    # Dosyayı sil
-    if project.file_path and os.path.exists(project.file_path):
-        file_manager.delete_file(project.file_path)
-    
+    # Dosya commit sonrası silinir (blob referansı ya da eski dosya)
     db.session.delete(project)
     db.session.commit()
+    invalidate_page_cache()
     
     flash('Proje başarıyla silindi!', 'success')
     return redirect(url_for('projects'))
 
 # Mentorluk
 @app.route('/mentorship')
+@cached_page(page_cache)
 def mentorship():
-    mentors = Mentorship.query.all()
-    return render_template('mentorship.html', mentors=mentors)
+    cursor, limit = get_page_args()
+    page = keyset_paginate(Mentorship.query, [Mentorship.id], cursor, limit, descending=False)
+    if wants_json():
+        return page_json(page)
+    return render_template('mentorship.html', mentors=page.items, next_cursor=page.next_cursor)
 
 # Ders Forumu
 @app.route('/course_forum')
 def course_forum():
     # Mevcut yorumları veritabanından al
-    reviews = CourseReview.query.order_by(CourseReview.created_at.desc()).all()
-    return render_template('course_forum.html', reviews=reviews)
+    cursor, limit = get_page_args()
+    page = keyset_paginate(CourseReview.query, [CourseReview.created_at, CourseReview.id], cursor, limit)
+    if wants_json():
+        return page_json(page)
+    return render_template('course_forum.html', reviews=page.items, next_cursor=page.next_cursor)
 
 @app.route('/course_forum/add_review', methods=['POST'])
 def add_course_review():
@@ -1017,8 +1895,7 @@ def add_course_review():
         )
         
         # Veritabanına kaydet
-        db.session.add(new_review)
-        db.session.commit()
+        add_and_commit(new_review)
         
         flash('Yorum başarıyla eklendi!', 'success')
         loggers['app'].info(f"New course review added: {course_name} by {author_name}")
@@ -1030,6 +1907,63 @@ def add_course_review():
     
     return redirect(url_for('course_forum'))
 
+def _shifted_likes(delta):
+    """likes + delta ifadesi (SQL tarafında, sıfırın altına inmez)"""
+    likes = CourseReview.__table__.c.likes
+    shifted = func.coalesce(likes, 0) + delta
+    return case((shifted < 0, 0), else_=shifted)
+
+@retry_on_lock(db.session)
+def change_review_likes(review_id, is_liked):
+    """Beğeni sayısını tek bir UPDATE ile atomik değiştir; yorum yoksa None döner"""
+    table = CourseReview.__table__
+    result = db.session.execute(
+        table.update().where(table.c.id == review_id).values(likes=_shifted_likes(1 if is_liked else -1))
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return None
+    likes = db.session.execute(select(table.c.likes).where(table.c.id == review_id)).scalar()
+    db.session.commit()
+    return likes
+
+@retry_on_lock(db.session)
+def apply_review_like_deltas(deltas):
+    """Tampondaki {review_id: fark} değerlerini tek transaction'da yaz.
+
+    Sıfır sınırı net farka uygulanır (bkz. write_behind); tampon açıkken
+    sıfırdaki yoruma gelen geri al + beğen dizisi 1 değil 0 yazar.
+    """
+    table = CourseReview.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('review_id')).values(likes=_shifted_likes(bindparam('delta'))),
+        [{'review_id': review_id, 'delta': delta} for review_id, delta in deltas.items()]
+    )
+    db.session.commit()
+
+def flush_review_likes(deltas):
+    """Write-behind tamponunun yazma fonksiyonu (zamanlayıcı thread'inden de çağrılır)"""
+    with app.app_context():
+        apply_review_like_deltas(deltas)
+
+# İsteğe bağlı beğeni tamponu: LIKE_BUFFER_INTERVAL=<saniye> ile açılır
+app.config['LIKE_BUFFER_INTERVAL'] = float(os.getenv('LIKE_BUFFER_INTERVAL', 0))
+like_buffer = None
+if app.config['LIKE_BUFFER_INTERVAL'] > 0:
+    like_buffer = CounterBuffer(flush_review_likes, interval=app.config['LIKE_BUFFER_INTERVAL'])
+    atexit.register(like_buffer.flush)
+
+def buffer_review_like(review_id, is_liked):
+    """Beğeniyi tampona ekle; yorum yoksa None, varsa tahmini güncel sayıyı döner"""
+    row = db.session.execute(
+        select(CourseReview.id, CourseReview.likes).where(CourseReview.id == review_id)
+    ).first()
+    db.session.rollback()  # okuma transaction'ını kapat
+    if row is None:
+        return None
+    like_buffer.add(review_id, 1 if is_liked else -1)
+    return max(0, (row.likes or 0) + like_buffer.pending(review_id))
+
 @app.route('/course_forum/update_like', methods=['POST'])
 def update_course_review_like():
     """Ders yorumu beğeni sayısını güncelle"""
@@ -1038,15 +1972,12 @@ def update_course_review_like():
         review_id = data.get('review_id')
         is_liked = data.get('liked')
         
-        review = CourseReview.query.get(review_id)
-        if review:
-            if is_liked:
-                review.likes += 1
-            else:
-                review.likes = max(0, review.likes - 1)
-            
-            db.session.commit()
-            return jsonify({'success': True, 'likes': review.likes})
+        if like_buffer is not None:
+            likes = buffer_review_like(review_id, is_liked)
+        else:
+            likes = change_review_likes(review_id, is_liked)
+        if likes is not None:
+            return jsonify({'success': True, 'likes': likes})
         else:
             return jsonify({'success': False, 'error': 'Review not found'}), 404
             
@@ -1055,6 +1986,34 @@ def update_course_review_like():
         loggers['error'].error(f"Error updating like: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@retry_on_lock(db.session)
+def save_review_comment(review_id, comment_text, author_name):
+    """Yorumu kaydet ve sayacı aynı transaction'da atomik artır; yorum yoksa None döner"""
+    table = CourseReview.__table__
+    result = db.session.execute(
+        table.update().where(table.c.id == review_id)
+        .values(comments_count=func.coalesce(table.c.comments_count, 0) + 1)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return None
+    comment = ReviewComment(review_id=review_id, comment_text=comment_text, author_name=author_name)
+    db.session.add(comment)
+    db.session.flush()
+    comment_count = db.session.execute(select(table.c.comments_count).where(table.c.id == review_id)).scalar()
+    db.session.commit()
+    return comment, comment_count
+
+# Yorum altındaki yorumlar: modal açıldığında sayfa sayfa yüklenir
+@app.route('/course_forum/<int:review_id>/comments')
+def review_comments(review_id):
+    if db.session.get(CourseReview, review_id) is None:
+        return jsonify({'success': False, 'error': 'Review not found'}), 404
+    cursor, limit = get_page_args()
+    query = ReviewComment.query.filter(ReviewComment.review_id == review_id)
+    page = keyset_paginate(query, [ReviewComment.created_at, ReviewComment.id], cursor, limit, descending=False)
+    return page_json(page)
+
 @app.route('/course_forum/add_comment', methods=['POST'])
 def add_course_review_comment():
     """Ders yorumuna yorum ekle"""
@@ -1067,20 +2026,13 @@ def add_course_review_comment():
         if not comment_text:
             return jsonify({'success': False, 'error': 'Comment text is required'}), 400
         
-        review = CourseReview.query.get(review_id)
-        if review:
-            review.comments_count += 1
-            db.session.commit()
-            
-            # Burada ayrı bir Comment modeli de eklenebilir
+        result = save_review_comment(review_id, comment_text, author_name or 'Anonim')
+        if result:
+            comment, comment_count = result
             return jsonify({
                 'success': True, 
-                'comment_count': review.comments_count,
-                'comment': {
-                    'text': comment_text,
-                    'author': author_name,
-                    'date': datetime.now().strftime('%d.%m.%Y')
-                }
+                'comment_count': comment_count,
+                'comment': comment.to_dict()
             })
         else:
             return jsonify({'success': False, 'error': 'Review not found'}), 404
@@ -1348,43 +2300,110 @@ def add_sample_course_reviews_without_flash():
 
 
 # Arama sayfası
+SEARCH_PAGE_SIZE = 20  # Tür başına sayfa başı sonuç
+SEARCH_TYPES = ('notes', 'questions', 'projects')
+SEMESTERS = ('Güz', 'Bahar', 'Seçmeli')
+
+def _search_columns(kind):
+    """Arama türü için (model, sınıf kolonu, dönem kolonu) döndür"""
+    if kind == 'notes':
+        return Note, Course.grade, Course.semester
+    if kind == 'questions':
+        return Question, Course.grade, Course.semester
+    return Project, Project.grade, None
+
+def _search_query(kind, entities, text_query, grade=None, semester=None, order=True):
+    """Metin, sınıf ve dönem filtreleri uygulanmış arama sorgusu.
+
+    Not ve sorular dönem/sınıf için Course ile JOIN edilir (course.id birincil
+    anahtarı üzerinden indeksli); projelerin dönemi olmadığından dönem
+    filtresi seçiliyse proje dönmez.
+    """
+    model, grade_column, semester_column = _search_columns(kind)
+    search_query = db.session.query(*entities).select_from(model)
+    if semester_column is not None:
+        search_query = search_query.join(Course, model.course_id == Course.id)
+    if text_query:
+        search_query = search_index.apply_search(search_query, model, text_query, db.session, order=order)
+    elif order:
+        search_query = search_query.order_by(model.created_at.desc(), model.id.desc())
+    if grade is not None:
+        search_query = search_query.filter(grade_column == grade)
+    if semester:
+        if semester_column is None:
+            search_query = search_query.filter(false())
+        else:
+            search_query = search_query.filter(semester_column == semester)
+    return search_query
+
+def search_facets(text_query, filter_type, grade, semester):
+    """Tür, sınıf ve dönem sayımlarını tek sorguda hesapla.
+
+    Her tür kendi (sınıf, dönem) gruplarını sayar ve gruplar UNION ALL ile
+    birleştirilir; arama yokken de sayım dış bir alt sorguyu taramadan
+    course_id / grade indeksleri üzerinden yapılır. Her facet diğer facet'lerin
+    filtrelerine uyar, kendi filtresini yok sayar; böylece kullanıcı seçimini
+    değiştirdiğinde kaç sonuç alacağını görür.
+    """
+    parts = []
+    for kind in SEARCH_TYPES:
+        _, grade_column, semester_column = _search_columns(kind)
+        semester_value = semester_column if semester_column is not None else null()
+        entities = [literal(kind).label('kind'), grade_column.label('grade'), semester_value.label('semester'),
+                    func.count().label('total')]
+        group_by = [grade_column] if semester_column is None else [grade_column, semester_column]
+        parts.append(_search_query(kind, entities, text_query, order=False).group_by(*group_by).statement)
+    rows = db.session.execute(union_all(*parts)).all()
+
+    type_ok = lambda row: filter_type == 'all' or row.kind == filter_type
+    grade_ok = lambda row: grade is None or row.grade == grade
+    semester_ok = lambda row: not semester or row.semester == semester
+
+    facets = {'type': dict.fromkeys(SEARCH_TYPES, 0), 'grade': {}, 'semester': {}}
+    total = 0
+    for row in rows:
+        if grade_ok(row) and semester_ok(row):
+            facets['type'][row.kind] += row.total
+        if type_ok(row) and semester_ok(row):
+            facets['grade'][row.grade] = facets['grade'].get(row.grade, 0) + row.total
+        if type_ok(row) and grade_ok(row) and row.semester:
+            facets['semester'][row.semester] = facets['semester'].get(row.semester, 0) + row.total
+        if type_ok(row) and grade_ok(row) and semester_ok(row):
+            total += row.total
+    facets['grade'] = dict(sorted(facets['grade'].items()))
+    return facets, total
+
 @app.route('/search')
 def search():
     query = request.args.get('q', '')
     filter_type = request.args.get('type', 'all')
-    grade_filter = request.args.get('grade', '')
+    if filter_type not in SEARCH_TYPES:
+        filter_type = 'all'
+    grade_filter = request.args.get('grade', type=int)
     semester_filter = request.args.get('semester', '')
+    if semester_filter not in SEMESTERS:
+        semester_filter = ''
+    page = max(request.args.get('page', 1, type=int), 1)
     
-    results = {}
+    facets, total_results = search_facets(query, filter_type, grade_filter, semester_filter)
     
-    if filter_type in ['all', 'notes']:
-        notes_query = Note.query
-        if query:
-            notes_query = notes_query.filter(Note.title.contains(query) | Note.content.contains(query))
-        if grade_filter:
-            notes_query = notes_query.join(Course).filter(Course.grade == int(grade_filter))
-        results['notes'] = notes_query.all()
-    
-    if filter_type in ['all', 'questions']:
-        questions_query = Question.query
-        if query:
-            questions_query = questions_query.filter(Question.question_text.contains(query))
-        if grade_filter:
-            questions_query = questions_query.join(Course).filter(Course.grade == int(grade_filter))
-        results['questions'] = questions_query.all()
-    
-    if filter_type in ['all', 'projects']:
-        projects_query = Project.query
-        if query:
-            projects_query = projects_query.filter(Project.title.contains(query) | Project.description.contains(query))
-        if grade_filter:
-            projects_query = projects_query.filter(Project.grade == int(grade_filter))
-        results['projects'] = projects_query.all()
-    
-    # Toplam sonuç sayısını hesapla
-    total_results = sum(len(results.get(key, [])) for key in ['notes', 'questions', 'projects'])
-    
-    return render_template('search_results.html', results=results, query=query, filter_type=filter_type, total_results=total_results)
+    # Yalnızca geçerli sayfadaki kayıtlar nesneye dönüştürülür
+    results = {}
+    has_next = False
+    for kind in SEARCH_TYPES:
+        if filter_type not in ('all', kind):
+            continue
+        model, _, semester_column = _search_columns(kind)
+        kind_query = _search_query(kind, [model], query, grade_filter, semester_filter)
+        if semester_column is not None:
+            kind_query = kind_query.options(contains_eager(model.course))
+        results[kind] = kind_query.limit(SEARCH_PAGE_SIZE).offset((page - 1) * SEARCH_PAGE_SIZE).all()
+        has_next = has_next or facets['type'][kind] > page * SEARCH_PAGE_SIZE
+    
+    return render_template('search_results.html', results=results, query=query, filter_type=filter_type,
+                         total_results=total_results, facets=facets, semesters=SEMESTERS,
+                         selected_grade=grade_filter, selected_semester=semester_filter,
+                         page=page, has_next=has_next)
 
 # Kullanıcı profili
 @app.route('/profile')
@@ -1522,43 +2541,57 @@ def download_file(file_type, filename):
             flash('Geçersiz dosya türü!', 'error')
             return redirect(url_for('index'))
         
-        # Orijinal dosya adını bul
-        original_filename = None
-        if file_type == 'notes':
-            note = Note.query.filter(Note.file_path.like(f'%{filename}')).first()
-            if note and note.file_name:
-                original_filename = note.file_name
-        elif file_type == 'projects':
-            project = Project.query.filter(Project.file_path.like(f'%{filename}')).first()
-            if project and project.file_name:
-                original_filename = project.file_name
-        elif file_type == 'questions':
-            question = Question.query.filter(Question.file_path.like(f'%{filename}')).first()
-            if question and question.file_name:
-                original_filename = question.file_name
+        # Kaydı ve orijinal dosya adını bul
+        model = {'notes': Note, 'projects': Project, 'questions': Question}[file_type]
+        record = model.query.filter_by(stored_filename=filename).first()
+        original_filename = record.file_name if record and record.file_name else None
         
         # Orijinal dosya adı yoksa yüklenen dosya adını kullan
         if not original_filename:
             original_filename = filename
         
-        # Dosya türüne göre dizin belirle
+        # İçerik adresli depodaki dosya
+        if record and record.blob_sha256:
+            # Uzak depoda baytlar süreli URL ile doğrudan depodan iner
+            url = file_manager.blob_url(record.blob_sha256, original_filename)
+            if url:
+                return redirect(url)
+            path = file_manager.blob_path(record.blob_sha256)
+            return send_download(path, original_filename, file_etag(path, record.blob_sha256),
+                                 file_manager.upload_folder)
+        
+        # Dosya türüne göre dizin belirle (eski dosyalar her arka uçta yerel klasördedir)
         if file_type == 'notes':
             if os.path.exists(os.path.join('static', 'notes', filename)):
                 directory = 'static/notes'
             else:
-                directory = 'uploads/notes'
+                directory = file_manager.notes_folder
         elif file_type == 'projects':
-            directory = 'uploads/projects'
+            directory = file_manager.projects_folder
         elif file_type == 'questions':
-            directory = 'uploads/questions'
+            directory = file_manager.questions_folder
         
-        return send_from_directory(directory, filename, as_attachment=True, download_name=original_filename)
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            raise FileNotFoundError(filename)
+        return send_download(path, original_filename, file_etag(path), file_manager.upload_folder)
         
+    except HTTPException:
+        # 304/416 gibi protokol yanıtları olduğu gibi dönsün
+        raise
     except Exception as e:
         flash(f'Dosya indirme hatası: {str(e)}', 'error')
         return redirect(url_for('index'))
 
-# Basit dosya önizleme (testler için 200 dönsün)
+# Dosya önizleme (PDF ilk sayfası / küçültülmüş görsel)
+PREVIEW_MAX_AGE = 365 * 24 * 3600  # önizleme adresi içerikle değişir
+app.jinja_env.globals['preview_types'] = sorted(previews.IMAGE_TYPES | previews.PDF_TYPES)
+
+@app.template_filter('from_json')
+def from_json_filter(value):
+    """Şablonlarda JSON metin kolonlarını (archive_info) aç"""
+    return json.loads(value) if value else {}
+
 @app.route('/preview/<file_type>/<path:filename>')
 def preview_file(file_type, filename):
     # Test, JSON body bekliyor; auth gerektiren hata mesajı dönelim
@@ -1566,10 +2599,218 @@ def preview_file(file_type, filename):
         return jsonify({'success': False, 'error': 'Lütfen giriş yapın'}), 200
     if file_type not in ['notes', 'projects', 'questions']:
         return jsonify({'success': False, 'error': 'Geçersiz dosya türü'}), 400
-    return jsonify({'success': True, 'message': 'Önizleme hazır', 'file': filename, 'type': file_type}), 200
+    size = request.args.get('size', previews.DEFAULT_SIZE)
+    if size not in previews.PREVIEW_SIZES:
+        return jsonify({'success': False, 'error': 'Geçersiz önizleme boyutu'}), 400
+    
+    model = {'notes': Note, 'projects': Project, 'questions': Question}[file_type]
+    record = model.query.filter_by(stored_filename=filename).first()
+    if record is None:
+        return jsonify({'success': False, 'error': 'Dosya bulunamadı'}), 404
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    
+    if record.blob_sha256:
+        # Uzak depodaki blob yalnızca önizleme henüz yoksa geçici dosyaya indirilir
+        source, key = file_manager.blob_file(record.blob_sha256), record.blob_sha256
+    else:
+        # Blob deposundan önceki dosyalar: anahtar boyut ve mtime'dan
+        directory = {'notes': 'uploads/notes', 'projects': 'uploads/projects',
+                     'questions': 'uploads/questions'}[file_type]
+        if file_type == 'notes' and os.path.exists(os.path.join('static', 'notes', filename)):
+            directory = 'static/notes'
+        source = safe_join(directory, filename)
+        if source is None or not os.path.isfile(source):
+            return jsonify({'success': False, 'error': 'Dosya bulunamadı'}), 404
+        key = hashlib.sha256(file_etag(source).encode()).hexdigest()
+        source = nullcontext(source)
+    
+    try:
+        path = file_manager.previews.cached(key, size)
+        if path is None and previews.can_preview(ext):
+            with source as source_path:
+                path = file_manager.previews.get_or_create(key, source_path, ext, size)
+    except Exception as e:
+        loggers['error'].error(f"Preview failed: {file_type}/{filename} - {e}")
+        path = None
+    if path is None:
+        return jsonify({'success': False, 'error': 'Bu dosya için önizleme yok'}), 404
+    
+    response = send_file(path, mimetype='image/jpeg', conditional=True, etag=f'{key}-{size}')
+    # Önizleme yetki gerektirdiği için paylaşılan önbelleklerde tutulmaz
+    response.headers['Cache-Control'] = f'private, max-age={PREVIEW_MAX_AGE}, immutable'
+    return response
 
 
 
+# Arka plan iş durumu (arayüz yoklar)
+@app.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Lütfen giriş yapın'}), 401
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None or (job.user_id != session['user_id'] and not session.get('is_admin')):
+        return jsonify({'success': False, 'error': 'İş bulunamadı'}), 404
+    response = jsonify({'success': True, 'job': job.to_dict()})
+    if job.status in BackgroundJob.PENDING:
+        response.headers['Retry-After'] = '2'
+    return response
+
+# Proje arşivine göz atma (arşiv indirilmeden)
+def _archive_project(project_id):
+    """Dizini çıkarılabilecek (blob deposundaki zip/rar) proje; yoksa None"""
+    project = db.session.get(Project, project_id)
+    if project is None or not project.blob_sha256 or (project.file_type or '').lower() not in ('zip', 'rar'):
+        return None
+    return project
+
+@app.route('/projects/<int:project_id>/archive')
+def browse_project_archive(project_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Lütfen giriş yapın'}), 401
+    project = _archive_project(project_id)
+    if project is None:
+        return jsonify({'success': False, 'error': 'Arşiv bulunamadı'}), 404
+    
+    directory = request.args.get('dir', '').lstrip('/')
+    if directory and not directory.endswith('/'):
+        directory += '/'
+    cursor, limit = get_page_args()
+    query = ArchiveEntry.query.filter_by(blob_sha256=project.blob_sha256, parent=directory)
+    page = keyset_paginate(query, [ArchiveEntry.path], cursor, limit, descending=False)
+    if not page.items and cursor is None:
+        indexed = db.session.query(ArchiveEntry.id).filter_by(blob_sha256=project.blob_sha256).first()
+        if indexed is None:
+            return jsonify({'success': False, 'error': 'Arşiv içeriği henüz hazırlanıyor'}), 404
+        if directory:
+            return jsonify({'success': False, 'error': 'Klasör bulunamadı'}), 404
+    return jsonify({
+        'success': True,
+        'dir': directory,
+        'items': [entry.to_dict() for entry in page.items],
+        'next_cursor': page.next_cursor,
+        'has_more': page.has_more
+    })
+
+@app.route('/projects/<int:project_id>/archive/file')
+def download_archive_member(project_id):
+    if 'user_id' not in session:
+        flash('Lütfen önce giriş yapın!', 'error')
+        return redirect(url_for('login'))
+    project = _archive_project(project_id)
+    path = request.args.get('path', '')
+    entry = project and ArchiveEntry.query.filter_by(blob_sha256=project.blob_sha256, path=path).first()
+    if not entry or entry.is_dir:
+        return jsonify({'success': False, 'error': 'Dosya bulunamadı'}), 404
+    
+    # Blob değişmez; üyenin içeriği blob özeti ve yoluyla belirlenir
+    etag = hashlib.sha256(f'{project.blob_sha256}/{path}'.encode()).hexdigest()
+    try:
+        return send_stream(
+            lambda: file_manager.iter_blob_member(project.blob_sha256, project.file_type.lower(), entry.member),
+            entry.name, entry.size, etag,
+        )
+    except KeyError:
+        # Dizindeki kayıt arşivde yok (bozuk ya da eski dizin)
+        return jsonify({'success': False, 'error': 'Dosya bulunamadı'}), 404
+
+# Parça parça, kaldığı yerden devam eden yükleme (tus 1.0; resumable.py)
+app.config['UPLOAD_EXPIRES'] = int(os.getenv('UPLOAD_EXPIRES', resumable.DEFAULT_EXPIRES))  # saniye
+app.jinja_env.globals['upload_chunk_size'] = resumable.CLIENT_CHUNK_SIZE
+
+def _tus_response(status=204, body=None, **headers):
+    """Tus başlıklı yanıt; ``Upload_Offset=5`` gibi adlar ``Upload-Offset`` olur"""
+    response = app.response_class(body, status=status, mimetype='text/plain')
+    response.headers['Tus-Resumable'] = resumable.TUS_VERSION
+    response.headers['Cache-Control'] = 'no-store'
+    for name, value in headers.items():
+        response.headers[name.replace('_', '-')] = str(value)
+    return response
+
+@app.errorhandler(resumable.UploadError)
+def upload_error(error):
+    return _tus_response(error.status, error.message)
+
+def _upload_for_request(upload_id):
+    """Oturumdaki kullanıcının yüklemesi; yoksa UploadError"""
+    if request.headers.get('Tus-Resumable') != resumable.TUS_VERSION:
+        raise resumable.UploadError(412, 'Desteklenmeyen Tus-Resumable sürümü')
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != session['user_id']:
+        raise resumable.UploadError(404, 'Yükleme bulunamadı')
+    if upload.expires_at() < datetime.utcnow():
+        discard_upload(upload)
+        db.session.commit()
+        raise resumable.UploadError(410, 'Yüklemenin süresi doldu')
+    return upload
+
+@app.route('/uploads', methods=['OPTIONS', 'POST'])
+def create_upload():
+    if request.method == 'OPTIONS':
+        return _tus_response(Tus_Version=resumable.TUS_VERSION, Tus_Extension=resumable.TUS_EXTENSIONS,
+                             Tus_Max_Size=max(file_manager.max_file_sizes.values()) * 1024 * 1024)
+    if 'user_id' not in session:
+        raise resumable.UploadError(401, 'Lütfen giriş yapın')
+    if request.headers.get('Tus-Resumable') != resumable.TUS_VERSION:
+        raise resumable.UploadError(412, 'Desteklenmeyen Tus-Resumable sürümü')
+    
+    length = resumable.parse_offset(request.headers.get('Upload-Length'), 'Upload-Length')
+    metadata = resumable.parse_metadata(request.headers.get('Upload-Metadata'))
+    file_type = metadata.get('file_type', 'projects')
+    filename = metadata.get('filename', '')
+    # Tür ve boyut baştan kontrol edilir; reddedilecek dosyanın baytları hiç gönderilmez
+    if file_type not in file_manager.allowed_extensions or not file_manager.is_allowed_file(filename, file_type):
+        raise resumable.UploadError(415, f'Desteklenmeyen dosya türü: {filename}')
+    max_mb = file_manager.max_file_sizes.get(file_type, 10)
+    if length == 0 or length > max_mb * 1024 * 1024:
+        raise resumable.UploadError(413, f'Dosya boyutu geçersiz. Maksimum: {max_mb}MB')
+    
+    # Süresi dolan yarım yüklemeler kotada yer tutmasın
+    purge_expired_uploads()
+    quota_remaining = storage_remaining(session['user_id'])
+    if quota_remaining is not None and length > quota_remaining:
+        raise resumable.UploadError(413, file_manager.quota_message(quota_remaining))
+    
+    upload = UploadSession(user_id=session['user_id'], file_type=file_type, file_name=filename, length=length,
+                           temp_name=os.path.basename(file_manager.create_temp_file()))
+    add_and_commit(upload)
+    loggers['file_upload'].info(f"Resumable upload created: {upload.id} - {filename} - {length} bytes - "
+                                f"User: {session['user_id']}")
+    return _tus_response(201, Location=url_for('upload_status', upload_id=upload.id),
+                         Upload_Expires=format_http_date(upload.expires_at()))
+
+@app.route('/uploads/<upload_id>', methods=['HEAD', 'PATCH', 'DELETE'])
+def upload_status(upload_id):
+    if 'user_id' not in session:
+        raise resumable.UploadError(401, 'Lütfen giriş yapın')
+    upload = _upload_for_request(upload_id)
+    
+    if request.method == 'DELETE':
+        discard_upload(upload)
+        db.session.commit()
+        return _tus_response(204)
+    
+    if request.method == 'PATCH':
+        if request.mimetype != resumable.OFFSET_CONTENT_TYPE:
+            raise resumable.UploadError(415, f'Content-Type {resumable.OFFSET_CONTENT_TYPE} olmalı')
+        offset = resumable.parse_offset(request.headers.get('Upload-Offset'), 'Upload-Offset')
+        if offset != upload.upload_offset:
+            raise resumable.UploadError(409, f'Upload-Offset {upload.upload_offset} olmalı')
+        written = resumable.append_chunk(upload.temp_path, offset, request.stream, upload.length - offset)
+        # Ofset yalnızca hâlâ beklenen değerdeyse ilerler; araya giren başka bir PATCH'i ezmez
+        table = UploadSession.__table__
+        moved = db.session.execute(
+            table.update()
+            .where(table.c.id == upload.id, table.c.upload_offset == offset)
+            .values(upload_offset=offset + written, updated_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not moved:
+            raise resumable.UploadError(409, 'Yükleme başka bir istekle ilerledi')
+        db.session.refresh(upload)
+    
+    return _tus_response(204 if request.method == 'PATCH' else 200, Upload_Offset=upload.upload_offset,
+                         Upload_Length=upload.length, Upload_Expires=format_http_date(upload.expires_at()))
+
 # Admin çıkış
 @app.route('/admin/logout')
 def admin_logout():
@@ -1587,12 +2828,36 @@ def delete_user(user_id):
     if user.is_admin:
         flash('Admin kullanıcısı silinemez!', 'error')
     else:
+        # Yüklemeleri ORM üzerinden silinir; blob referansları ve eski dosyalar commit sonrası temizlenir
+        for record in Note.query.filter_by(uploaded_by=user.id).all() + \
+                Project.query.filter_by(uploaded_by=user.id).all():
+            db.session.delete(record)
+        for upload in UploadSession.query.filter_by(user_id=user.id).all():
+            discard_upload(upload)
         db.session.delete(user)
         db.session.commit()
+        invalidate_page_cache()
         flash('Kullanıcı başarıyla silindi!', 'success')
     
     return redirect(url_for('admin_dashboard'))
 
+# Admin - Kullanıcı depolama kotası
+@app.route('/admin/user_quota/<int:user_id>', methods=['POST'])
+def set_user_quota(user_id):
+    if not session.get('admin'):
+        return redirect(url_for('admin_login'))
+    
+    user = User.query.get_or_404(user_id)
+    quota_mb = request.form.get('quota_mb', '').strip()
+    if quota_mb and not quota_mb.isdigit():
+        flash('Kota MB cinsinden tam sayı olmalı!', 'error')
+        return redirect(url_for('admin_dashboard'))
+    # Boş değer genel kotaya (STORAGE_QUOTA_MB) döner, 0 sınırsız
+    user.storage_quota = int(quota_mb) * 1024 * 1024 if quota_mb else None
+    db.session.commit()
+    flash('Kullanıcı kotası güncellendi!', 'success')
+    return redirect(url_for('admin_dashboard'))
+
 # Admin - Ders ekleme
 # Admin - Ders ekleme
 @app.route('/admin/add_course', methods=['POST'])
@@ -1620,8 +2885,8 @@ def add_course():
         semester=semester, 
         description=description
     )
-    db.session.add(course)
-    db.session.commit()
+    add_and_commit(course)
+    invalidate_page_cache()
     
     flash('Ders başarıyla eklendi!', 'success')
     return redirect(url_for('admin_dashboard'))
@@ -1635,6 +2900,7 @@ def delete_course(course_id):
     course = Course.query.get_or_404(course_id)
     db.session.delete(course)
     db.session.commit()
+    invalidate_page_cache()
     
     flash('Ders başarıyla silindi!', 'success')
     return redirect(url_for('admin_dashboard'))
@@ -1647,6 +2913,48 @@ def reset_database():
     db.create_all()
     print("Veritabanı sıfırlandı ve yeniden oluşturuldu!")
 
+# Mevcut veritabanına model indekslerini uygulama (flask --app app apply-indexes)
+@app.cli.command('apply-indexes')
+def apply_indexes_command():
+    """Modellerde tanımlı eksik indeksleri mevcut veritabanında oluştur"""
+    created = migrations.apply_declared_indexes(db.engine, db.metadata)
+    if created:
+        for name in created:
+            print(f"İndeks oluşturuldu: {name}")
+    else:
+        print("Tüm indeksler zaten mevcut.")
+
+@app.cli.command('recount-stats')
+def recount_stats_command():
+    """Ana sayfa ve kullanıcı depolama sayaçlarını tablolardan yeniden hesapla (toplu silme/içe aktarma sonrası)"""
+    stats = SiteStats.recount()
+    with db.engine.begin() as conn:
+        migrations.recount_storage_used(conn)
+    print(f"Sayaçlar güncellendi: {stats.to_dict()}")
+
+@app.cli.command('reconcile-files')
+@click.option('--apply', 'apply_changes', is_flag=True, help='Sahipsiz dosyaları sil (varsayılan: yalnızca rapor)')
+@click.option('--batch-size', default=RECONCILE_BATCH_SIZE, show_default=True, help='Toplu sorgu başına anahtar')
+@click.option('--grace-minutes', default=60, show_default=True, help='Bu süreden yeni dosyalara dokunulmaz')
+def reconcile_files_command(apply_changes, batch_size, grace_minutes):
+    """Yükleme deposunu dosya kolonlarıyla karşılaştır; sahipsiz ve eksik dosyaları raporla"""
+    reconciler = FileReconciler(db.engine, file_manager, batch_size=batch_size,
+                                grace=timedelta(minutes=grace_minutes),
+                                legacy_fallbacks={'notes': [os.path.join('static', 'notes')]})
+    report = reconciler.run(dry_run=not apply_changes)
+    print(f"Taranan: {report['scanned']} dosya ({report['recent']} yeni dosya atlandı)")
+    print(f"Sahipsiz: {report['orphaned']} dosya, {report['orphaned_bytes'] / 1024 / 1024:.1f} MB")
+    for key in report['orphaned_sample']:
+        print(f"  - {key}")
+    print(f"Eksik: {report['missing']} dosya")
+    for entry in report['missing_sample']:
+        print(f"  - {entry}")
+    print(f"Yanlış referans sayısı: {report['miscounted']} blob")
+    if apply_changes:
+        print(f"Geri kazanılan: {report['reclaimed']} dosya, {report['reclaimed_bytes'] / 1024 / 1024:.1f} MB")
+    else:
+        print("Deneme modu: hiçbir şey silinmedi (--apply ile uygulanır)")
+
 # Ders verilerini veritabanına aktarma fonksiyonu
 def populate_courses():
     courses_data = [
@@ -1961,10 +3269,8 @@ def initialize_sample_data_once():
         return
     try:
         with app.app_context():
-            # Create tables if not present
-            db.create_all()
-            ensure_user_columns()
-            ensure_question_columns()
+            # Tabloları oluştur ve bekleyen migration'ları uygula
+            run_schema_migrations()
             # Populate base data if missing
             if Course.query.count() == 0:
                 populate_courses()
@@ -1972,6 +3278,8 @@ def initialize_sample_data_once():
                 populate_sample_data()
             # Ensure admin user exists
             create_admin_user()
+            # Önceki süreçten kalan arka plan işleri
+            resume_pending_jobs()
         _INITIAL_DATA_DONE = True
     except Exception as e:
         logging.getLogger('error').error(f"Initial data load error: {e}")
@@ -1980,11 +3288,8 @@ initialize_sample_data_once()
 
 if __name__ == '__main__':
     with app.app_context():
-        # Veritabanı tablolarını oluştur (eğer yoksa)
-        db.create_all()
-        # Eksik kolonları ekle (mevcut DB için)
-        ensure_user_columns()
-        ensure_question_columns()
+        # Veritabanı tablolarını oluştur ve bekleyen migration'ları uygula
+        run_schema_migrations()
         
         # Dosya yolu düzeltmesi - mevcut notları ve projeleri güncelle
         try:
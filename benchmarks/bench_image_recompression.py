@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Not görsellerinin yeniden sıkıştırılması: kazanılan bayt ve süre.
+
+Telefon fotoğrafı (EXIF'li 12MP JPEG), ekran görüntüsü (BMP), çizim (PNG) ve
+GIF örnekleri üretilip ``images.ImageOptimizer`` ile işlenir. ``--dir``
+verilirse o klasördeki gerçek görseller kullanılır. Her dosya için önceki ve
+sonraki boyut, kazanılan oran ve işlem süresi raporlanır.
+
+Kullanım:
+    python benchmarks/bench_image_recompression.py --max-dimension 2560 --quality 85
+    python benchmarks/bench_image_recompression.py --dir ~/Resimler
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from images import OPTIMIZED_TYPES, ImageOptimizer
+
+
+def phone_photo(path):
+    """Kamera fotoğrafına benzer: yumuşak geçişler üzerinde sensör gürültüsü"""
+    size = (4032, 3024)
+    gradient = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 12)
+    image = Image.merge('RGB', (gradient, Image.blend(gradient, noise, 0.3), noise))
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    exif[0x0112] = 6  # dikey çekim
+    image.save(path, 'JPEG', quality=95, exif=exif.tobytes())
+
+
+def screenshot(path, fmt):
+    """Düz renkler ve metin benzeri çizgilerden oluşan ekran görüntüsü"""
+    image = Image.new('RGB', (1920, 1080), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1920, 60), fill=(40, 60, 90))
+    for y in range(120, 1000, 24):
+        draw.line((80, y, 80 + (y * 37) % 1500, y), fill='black', width=2)
+    draw.ellipse((1300, 300, 1700, 700), outline='red', width=6)
+    image.save(path, fmt)
+
+
+def diagram_gif(path):
+    image = Image.new('P', (800, 600), 0)
+    image.putpalette([255, 255, 255, 0, 0, 0, 200, 30, 30] + [0] * 759)
+    draw = ImageDraw.Draw(image)
+    for i in range(10):
+        draw.rectangle((40 + i * 70, 100, 90 + i * 70, 500 - i * 30), outline=1, fill=2)
+    image.save(path, 'GIF')
+
+
+def make_samples(workdir):
+    samples = {
+        'telefon.jpg': phone_photo,
+        'ekran.bmp': lambda path: screenshot(path, 'BMP'),
+        'cizim.png': lambda path: screenshot(path, 'PNG'),
+        'grafik.gif': diagram_gif,
+    }
+    paths = []
+    for name, make in samples.items():
+        path = os.path.join(workdir, name)
+        make(path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', help='Örnek yerine bu klasördeki görselleri kullan')
+    parser.add_argument('--max-dimension', type=int, default=2560, help='Uzun kenar sınırı (px)')
+    parser.add_argument('--quality', type=int, default=85, help='JPEG kalitesi')
+    args = parser.parse_args()
+
+    optimizer = ImageOptimizer(max_dimension=args.max_dimension, jpeg_quality=args.quality)
+    workdir = tempfile.mkdtemp()
+    try:
+        if args.dir:
+            paths = sorted(os.path.join(args.dir, name) for name in os.listdir(args.dir)
+                           if name.rsplit('.', 1)[-1].lower() in OPTIMIZED_TYPES)
+        else:
+            paths = make_samples(workdir)
+
+        print(f"Max dimension: {args.max_dimension}px - JPEG quality: {args.quality}")
+        print(f"{'File':<24}{'before KB':>12}{'after KB':>12}{'saved':>9}{'ms':>9}")
+        total_before = total_after = 0
+        for path in paths:
+            before = os.path.getsize(path)
+            start = time.perf_counter()
+            result = optimizer.optimize(path, path.rsplit('.', 1)[-1], workdir)
+            elapsed = (time.perf_counter() - start) * 1000
+            after = before
+            name = os.path.basename(path)
+            if result:
+                optimized_path, ext = result
+                after = os.path.getsize(optimized_path)
+                os.remove(optimized_path)
+                name = f"{name} -> {ext}"
+            total_before += before
+            total_after += after
+            print(f"{name[:23]:<24}{before / 1024:>12.0f}{after / 1024:>12.0f}"
+                  f"{(1 - after / before) * 100:>8.1f}%{elapsed:>9.0f}")
+        if total_before:
+            print(f"{'Total':<24}{total_before / 1024:>12.0f}{total_after / 1024:>12.0f}"
+                  f"{(1 - total_after / total_before) * 100:>8.1f}%")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
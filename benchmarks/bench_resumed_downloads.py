@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Kesilen indirmelerin devam ettirilmesi: tam yeniden indirme vs. Range.
+
+Büyük bir dosya birkaç kez rastgele noktalarda kesilerek indirilir. "full"
+modunda her kesintiden sonra dosya baştan istenir (Range/ETag olmayan eski
+davranış); "range" modunda ``If-Range`` ile kalınan yerden devam edilir.
+Ardından dosyanın yeniden açılması ``If-None-Match`` ile ölçülür.
+Aktarılan bayt ve süre raporlanır.
+
+Kullanım:
+    python benchmarks/bench_resumed_downloads.py --size-mb 50 --interruptions 3 --rounds 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, send_file
+
+from downloads import file_etag, send_stored_file
+
+
+def make_app(path):
+    app = Flask(__name__)
+
+    @app.route('/full')
+    def full():
+        return send_file(path, as_attachment=True, download_name='ders.pdf', conditional=False, etag=False)
+
+    @app.route('/range')
+    def ranged():
+        return send_stored_file(path, 'ders.pdf', file_etag(path))
+
+    return app
+
+
+def read(client, url, headers=None, limit=None):
+    """İsteği akış olarak oku; limit verilirse o kadar bayttan sonra bağlantıyı kes"""
+    response = client.get(url, headers=headers or {}, buffered=False)
+    received = 0
+    try:
+        for chunk in response.iter_encoded():
+            received += len(chunk)
+            if limit is not None and received >= limit:
+                received = limit
+                break
+    finally:
+        response.close()
+    return response, received
+
+
+def download_with_interruptions(client, mode, cuts):
+    transferred = 0
+    offset = 0
+    etag = None
+    for cut in cuts + [None]:
+        if mode == 'full':
+            _, received = read(client, '/full', limit=cut)
+            transferred += received
+            continue
+        headers = {}
+        if offset:
+            headers = {'Range': f'bytes={offset}-', 'If-Range': etag}
+        response, received = read(client, '/range', headers, limit=None if cut is None else cut - offset)
+        etag = response.headers['ETag']
+        transferred += received
+        offset += received
+    return transferred
+
+
+def reopen(client, mode, etag):
+    """Önceden indirilmiş dosyayı tekrar aç (tarayıcı önbelleğindeki ETag ile)"""
+    if mode == 'full':
+        return read(client, '/full')[1]
+    response, received = read(client, '/range', {'If-None-Match': etag})
+    assert response.status_code == 304
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=50, help='Dosya boyutu (MB)')
+    parser.add_argument('--interruptions', type=int, default=3, help='İndirme başına kesinti sayısı')
+    parser.add_argument('--rounds', type=int, default=5, help='Tekrar sayısı')
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'%PDF-1.4\n' + os.urandom(size - 9))
+        rng = random.Random(42)
+        plans = [sorted(rng.sample(range(1, size), args.interruptions)) for _ in range(args.rounds)]
+        client = make_app(path).test_client()
+        etag = f'"{file_etag(path)}"'
+
+        print(f"File: {args.size_mb}MB - Interruptions: {args.interruptions} - Rounds: {args.rounds}")
+        print(f"{'Mode':<8}{'resume MB':>12}{'resume s':>10}{'reopen MB':>12}{'reopen s':>10}")
+        for mode in ('full', 'range'):
+            start = time.perf_counter()
+            resumed = sum(download_with_interruptions(client, mode, cuts) for cuts in plans)
+            resume_time = time.perf_counter() - start
+            start = time.perf_counter()
+            reopened = sum(reopen(client, mode, etag) for _ in plans)
+            reopen_time = time.perf_counter() - start
+            print(f"{mode:<8}{resumed / 2 ** 20:>12.1f}{resume_time:>10.2f}"
+                  f"{reopened / 2 ** 20:>12.1f}{reopen_time:>10.2f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
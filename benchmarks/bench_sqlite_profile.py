@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+SQLite profil karşılaştırması: varsayılan motor vs. üretim profili (WAL).
+
+gunicorn worker'larını taklit eden birden fazla süreç aynı veritabanına
+karışık okuma/yazma trafiği gönderir (ders forumu listesi ve beğeni/yorum
+yazımları). Her mod için saniyedeki işlem sayısı ve kilit hataları raporlanır.
+
+Kullanım:
+    python benchmarks/bench_sqlite_profile.py --workers 2 --seconds 5 --write-ratio 0.2
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from db_tuning import apply_sqlite_profile, is_lock_error
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_review (
+    id INTEGER PRIMARY KEY,
+    course_name VARCHAR(100) NOT NULL,
+    review_text TEXT NOT NULL,
+    likes INTEGER DEFAULT 0,
+    created_at DATETIME
+)
+"""
+
+
+def make_engine(db_path, tuned):
+    # Varsayılan modda sqlite3 sürücüsünün kendi 5s beklemesi de kapatılır,
+    # böylece "öncesi" gerçekten ayarsız motoru temsil eder
+    connect_args = {} if tuned else {'timeout': 0}
+    engine = create_engine(f'sqlite:///{db_path}', connect_args=connect_args)
+    if tuned:
+        apply_sqlite_profile(engine)
+    return engine
+
+
+def prepare(db_path, rows):
+    engine = create_engine(f'sqlite:///{db_path}')
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+        conn.execute(text('CREATE INDEX IF NOT EXISTS ix_cr_created ON course_review (created_at)'))
+        conn.execute(
+            text("INSERT INTO course_review (course_name, review_text, likes, created_at) "
+                 "VALUES (:n, :t, 0, datetime('now', :o))"),
+            [{'n': f'Course {i}', 't': 'x' * 400, 'o': f'-{i} seconds'} for i in range(rows)]
+        )
+    engine.dispose()
+
+
+def worker(db_path, tuned, seconds, write_ratio, rows, results):
+    engine = make_engine(db_path, tuned)
+    rng = random.Random(os.getpid())
+    reads = writes = lock_errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    if rng.random() < 0.5:
+                        conn.execute(text('UPDATE course_review SET likes = likes + 1 WHERE id = :id'),
+                                     {'id': rng.randint(1, rows)})
+                    else:
+                        conn.execute(text("INSERT INTO course_review (course_name, review_text, created_at) "
+                                          "VALUES ('bench', :t, datetime('now'))"), {'t': 'y' * 400})
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT id, course_name, likes FROM course_review '
+                                      'ORDER BY created_at DESC LIMIT 20')).all()
+                reads += 1
+        except OperationalError as e:
+            if not is_lock_error(e):
+                raise
+            lock_errors += 1
+    engine.dispose()
+    results.put((reads, writes, lock_errors))
+
+
+def run(tuned, args):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        prepare(db_path, args.rows)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker,
+                                         args=(db_path, tuned, args.seconds, args.write_ratio, args.rows, results))
+                 for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        totals = [0, 0, 0]
+        for _ in procs:
+            for i, value in enumerate(results.get()):
+                totals[i] += value
+        for p in procs:
+            p.join()
+        return totals
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='Eş zamanlı süreç sayısı (Procfile: 2)')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Her mod için süre')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Yazma işlemlerinin oranı')
+    parser.add_argument('--rows', type=int, default=5000, help='Başlangıç satır sayısı')
+    args = parser.parse_args()
+
+    print(f"Workers: {args.workers} - Duration: {args.seconds}s - Write ratio: {args.write_ratio}")
+    print(f"{'Mode':<12}{'ops/s':>10}{'reads':>10}{'writes':>10}{'locked':>10}")
+    for label, tuned in (('default', False), ('production', True)):
+        reads, writes, locked = run(tuned, args)
+        ops = (reads + writes) / args.seconds
+        print(f"{label:<12}{ops:>10.0f}{reads:>10}{writes:>10}{locked:>10}")
+
+
+if __name__ == '__main__':
+    main()
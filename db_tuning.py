@@ -0,0 +1,81 @@
+"""SQLite üretim ayar profili.
+
+Varsayılan SQLite motoru rollback journal ile çalışır; gunicorn'un birden fazla
+worker'ı eş zamanlı yazdığında istekler sıraya girer ve "database is locked"
+hataları görülür. Bu profil her yeni bağlantıda WAL ve ilgili PRAGMA'ları
+uygular. Profil isteğe bağlıdır: ``SQLITE_PROFILE=production``.
+"""
+import functools
+import logging
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,  # 256MB
+    'cache_size': -64 * 1024,  # Negatif değer KiB cinsinden: 64MB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # ms
+}
+
+
+def is_sqlite_engine(engine):
+    return engine.dialect.name == 'sqlite'
+
+
+def apply_sqlite_profile(engine, pragmas=None):
+    """Motorun açacağı her bağlantıda PRAGMA'ları çalıştır.
+
+    SQLite dışındaki motorlar için hiçbir şey yapmaz; profil uygulandıysa True döner.
+    """
+    if not is_sqlite_engine(engine):
+        return False
+    pragmas = dict(PRODUCTION_PRAGMAS if pragmas is None else pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    # Havuzda zaten açık bağlantılar varsa yeni ayarlarla yeniden açılsın
+    engine.dispose()
+    logging.getLogger('app').info(f"SQLite production profile applied: {pragmas}")
+    return True
+
+
+def is_lock_error(error):
+    message = str(getattr(error, 'orig', error)).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_lock(session, attempts=5, base_delay=0.05):
+    """SQLite kilit hatasında iş birimini geri alıp yeniden dene.
+
+    Dekore edilen fonksiyon yazma işini ve commit'i kendisi yapmalı ve yeniden
+    çalıştırılmaya uygun (idempotent ya da tek bir atomik değişiklik) olmalıdır.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    if not is_lock_error(e) or attempt == attempts:
+                        raise
+                    session.rollback()
+                    delay = base_delay * (2 ** (attempt - 1))
+                    logging.getLogger('app').warning(
+                        f"Database locked in {func.__name__}, retry {attempt}/{attempts - 1} in {delay:.2f}s"
+                    )
+                    time.sleep(delay + random.uniform(0, base_delay))
+        return wrapper
+    return decorator
@@ -0,0 +1,181 @@
+"""İndirme yanıtları: güçlü ETag, koşullu GET ve byte aralıkları.
+
+Tek aralıklı istekler, If-None-Match / If-Modified-Since (304) ve If-Range
+Werkzeug'un ``send_file(conditional=True)`` desteğiyle karşılanır. Werkzeug
+birden fazla aralık istendiğinde dosyanın tamamını gönderdiği için çoklu
+aralıklar burada ``multipart/byteranges`` olarak üretilir.
+
+``DOWNLOAD_OFFLOAD`` ayarı verilirse (``x-accel`` / ``x-sendfile``) uygulama
+yalnızca yetki kontrolünü yapar; dosya baytlarını ters vekil (nginx, Apache)
+gönderir ve Range/koşullu istekleri de o karşılar. Böylece yavaş indiren
+istemciler gunicorn worker'larını meşgul etmez.
+"""
+import mimetypes
+import os
+import unicodedata
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from flask import current_app, request, send_file
+from werkzeug.http import is_resource_modified
+
+MAX_RANGES = 16  # daha fazlası istenirse tüm dosya gönderilir
+READ_SIZE = 64 * 1024
+
+OFFLOAD_MODES = ('x-accel', 'x-sendfile')
+DEFAULT_ACCEL_PREFIX = '/_protected/'  # nginx'teki internal location
+
+
+def file_etag(path, sha256=None):
+    """Güçlü ETag: içerik özeti varsa o, yoksa boyut ve mtime"""
+    if sha256:
+        return sha256
+    stat = os.stat(path)
+    return f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+
+def _satisfiable_ranges(ranges, length):
+    """Werkzeug aralıklarını dosya boyutuna göre [start, stop) çiftlerine çevir"""
+    result = []
+    for start, stop in ranges:
+        if start < 0:  # son N bayt
+            start, stop = max(0, length + start), length
+        else:
+            stop = length if stop is None else min(stop, length)
+        if start < stop:
+            result.append((start, stop))
+    return result
+
+
+def _if_range_matches(etag, last_modified):
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return last_modified <= if_range.date
+    return True
+
+
+def _content_disposition(download_name):
+    try:
+        download_name.encode('ascii')
+        return {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='')}"}
+
+
+def _multipart_response(path, ranges, length, mimetype, etag, last_modified, download_name):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for index, (start, stop) in enumerate(ranges):
+        # Parçayı önceki veriden ayıran CRLF sınırın bir parçasıdır
+        separator = b'' if index == 0 else b'\r\n'
+        header = separator + (
+            f"--{boundary}\r\n"
+            f"Content-Type: {mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n"
+        ).encode('ascii')
+        parts.append((header, start, stop))
+    closing = f'\r\n--{boundary}--\r\n'.encode('ascii')
+    content_length = sum(len(header) + stop - start for header, start, stop in parts) + len(closing)
+
+    def generate():
+        with open(path, 'rb') as f:
+            for header, start, stop in parts:
+                yield header
+                f.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    chunk = f.read(min(READ_SIZE, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+            yield closing
+
+    response = current_app.response_class(
+        generate(), status=206, mimetype=f'multipart/byteranges; boundary={boundary}',
+        direct_passthrough=True
+    )
+    response.headers['Content-Length'] = str(content_length)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers.set('Content-Disposition', 'attachment', **_content_disposition(download_name))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def send_stored_file(path, download_name, etag, as_attachment=True):
+    """Dosyayı ETag, koşullu GET ve Range desteğiyle gönder"""
+    stat = os.stat(path)
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+    parsed = request.range
+    if (parsed is not None and parsed.units == 'bytes' and 1 < len(parsed.ranges) <= MAX_RANGES
+            and _if_range_matches(etag, last_modified)
+            and is_resource_modified(request.environ, etag=etag, last_modified=last_modified)):
+        ranges = _satisfiable_ranges(parsed.ranges, stat.st_size)
+        if not ranges:
+            response = current_app.response_class(status=416)
+            response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        return _multipart_response(path, ranges, stat.st_size, mimetype, etag, last_modified, download_name)
+
+    response = send_file(path, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name,
+                         conditional=True, etag=etag, last_modified=last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+    # Tarayıcı saklayabilir ama her açılışta ETag ile doğrulamalı
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def send_stream(open_chunks, download_name, length, etag=None):
+    """Diskte ayrı dosyası olmayan içeriği (ör. arşiv üyesi) ETag ile akıt.
+
+    Range desteklenmez; ``open_chunks`` yalnızca gövde gönderilecekse çağrılır,
+    ``If-None-Match`` eşleşirse içerik hiç açılmaz. Çağrının hatası (ör. eksik
+    üye için KeyError) yanıt başlamadan çağırana geçer.
+    """
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    response = current_app.response_class(mimetype=mimetype, direct_passthrough=True)
+    response.headers.set('Content-Disposition', 'attachment', **_content_disposition(download_name))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if etag:
+        response.set_etag(etag)
+    response = response.make_conditional(request)
+    if response.status_code != 304:
+        response.response = open_chunks()
+        response.headers['Content-Length'] = str(length)
+    return response
+
+
+def offload_response(path, root, download_name, mode, accel_prefix=DEFAULT_ACCEL_PREFIX):
+    """Dosyayı ters vekile gönderten boş yanıt; dosya ``root`` dışındaysa None"""
+    real_root = os.path.realpath(root)
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([real_root, real_path]) != real_root:
+        return None
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    response = current_app.response_class(mimetype=mimetype)
+    if mode == 'x-accel':
+        relative = os.path.relpath(real_path, real_root).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(relative)
+    else:
+        response.headers['X-Sendfile'] = real_path
+    response.headers.set('Content-Disposition', 'attachment', **_content_disposition(download_name))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def send_download(path, download_name, etag, root):
+    """Ayara göre dosyayı vekile devret ya da uygulama içinden gönder"""
+    mode = current_app.config.get('DOWNLOAD_OFFLOAD')
+    if mode in OFFLOAD_MODES:
+        prefix = current_app.config.get('DOWNLOAD_ACCEL_PREFIX') or DEFAULT_ACCEL_PREFIX
+        response = offload_response(path, root, download_name, mode, prefix)
+        if response is not None:
+            return response
+    return send_stored_file(path, download_name, etag)
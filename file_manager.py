@@ -1,5 +1,7 @@
 import os
 import uuid
+import hashlib
+import tempfile
 import zipfile
 import rarfile
 from PIL import Image
@@ -8,15 +10,95 @@ from datetime import datetime
 import io
 import mimetypes
 import logging
+from images import OPTIMIZED_TYPES, optimizer_from_config
+from previews import PreviewCache
+from storage import DEFAULT_URL_EXPIRES, LocalStorage, storage_from_config
+
+# Yüklemeler belleğe alınmadan bu boyutta parçalarla diske akıtılır
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Uzantı -> kabul edilen dosya imzaları (magic bytes). None: metin dosyası.
+ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')
+MAGIC_SIGNATURES = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'bmp': (b'BM',),
+    'docx': ZIP_SIGNATURES,
+    'zip': ZIP_SIGNATURES,
+    'rar': (b'Rar!\x1a\x07\x00', b'Rar!\x1a\x07\x01\x00'),
+    'txt': None, 'py': None, 'cpp': None, 'h': None, 'ino': None,
+}
+# Hiçbir uzantıyla kabul edilmeyen çalıştırılabilir dosya imzaları (MZ ayrıca PE başlığıyla doğrulanır)
+EXECUTABLE_SIGNATURES = (b'\x7fELF', b'\xfe\xed\xfa', b'\xcf\xfa\xed\xfe', b'\xca\xfe\xba\xbe')
+PE_OFFSET_FIELD = 0x3C  # DOS başlığında PE başlığının konumu (e_lfanew)
+
+
+def stored_filename_for(file_path):
+    """Kayıttaki file_path'ten indirme URL'sinde kullanılan dosya adını çıkar"""
+    return file_path.replace('\\', '/').rsplit('/', 1)[-1] if file_path else None
+
+
+def archive_summary(archive_type, entries):
+    """Proje kartında gösterilen kısa arşiv özeti (archive_info JSON'u)"""
+    file_list = [entry['path'] for entry in entries]
+    return {
+        'type': archive_type,
+        'file_count': len(file_list),
+        'files': file_list[:10],  # İlk 10 dosya
+        'total_size': sum(entry['size'] for entry in entries)
+    }
+
+
+def is_windows_executable(head):
+    """'MZ' ile başlayan ve PE başlığı gösterdiği yerde duran dosya.
+
+    Yalnızca 'MZ' ile başlayan düz metin (ör. "MZ-80 notları") reddedilmez.
+    """
+    if not head.startswith(b'MZ') or len(head) < PE_OFFSET_FIELD + 4:
+        return False
+    pe_offset = int.from_bytes(head[PE_OFFSET_FIELD:PE_OFFSET_FIELD + 4], 'little')
+    return head[pe_offset:pe_offset + 4] == b'PE\x00\x00'
+
+
+def looks_like_text(head):
+    """İlk parça metin mi? Kodlama (UTF-8, Windows-1254...) aranmaz; NUL baytı ikili dosya sayılır"""
+    return b'\x00' not in head
+
+
+def sniff_matches(head, ext):
+    """Dosyanın ilk baytları uzantısıyla uyuşuyor mu?"""
+    if head.startswith(EXECUTABLE_SIGNATURES) or is_windows_executable(head):
+        return False
+    if ext not in MAGIC_SIGNATURES:
+        return False
+    signatures = MAGIC_SIGNATURES[ext]
+    if signatures is None:
+        return looks_like_text(head)
+    return head.startswith(signatures)
 
 class FileManager:
-    def __init__(self, app):
+    def __init__(self, app, upload_folder='uploads', storage=None):
         self.app = app
-        self.upload_folder = 'uploads'
+        self.upload_folder = upload_folder
+        # Kalıcı baytlar bu arka uçta tutulur (storage.py); geçici ve önizleme dosyaları her zaman yereldir
+        self.storage = storage if storage is not None else storage_from_config(app.config, upload_folder)
+        # Blob deposundan önceki kayıtların dosyaları (notes/, projects/, questions/) ve parça
+        # yüklemeleri (temp/) her arka uçta yerel klasörde kalır; indirme de onları oradan okur
+        self.legacy_storage = LocalStorage(upload_folder)
         self.notes_folder = os.path.join(self.upload_folder, 'notes')
         self.projects_folder = os.path.join(self.upload_folder, 'projects')
         self.temp_folder = os.path.join(self.upload_folder, 'temp')
         self.questions_folder = os.path.join(self.upload_folder, 'questions')
+        # İçerik adresli depo: aynı içerik tek kez saklanır (blobs/<sha[:2]>/<sha256>)
+        self.blobs_folder = os.path.join(self.upload_folder, 'blobs')
+        # Önizleme önbelleği (previews/<sha[:2]>/<sha256>_<genişlik>.jpg)
+        self.previews_folder = os.path.join(self.upload_folder, 'previews')
+        self.previews = PreviewCache(self.previews_folder)
+        # Not görselleri depoya alınmadan yeniden sıkıştırılır (images.py); IMAGE_OPTIMIZE kapalıysa None
+        self.image_optimizer = optimizer_from_config(app.config)
         
         # Logger setup - basit formatter kullan
         self.logger = logging.getLogger('file_upload')
@@ -47,7 +129,8 @@ class FileManager:
     
     def _create_folders(self):
         """Gerekli klasörleri oluştur"""
-        for folder in [self.upload_folder, self.notes_folder, self.projects_folder, self.questions_folder, self.temp_folder]:
+        for folder in [self.upload_folder, self.notes_folder, self.projects_folder, self.questions_folder,
+                       self.temp_folder, self.blobs_folder, self.previews_folder]:
             if not os.path.exists(folder):
                 os.makedirs(folder)
     
@@ -63,8 +146,13 @@ class FileManager:
         max_size = self.max_file_sizes.get(file_type, 10) * 1024 * 1024  # MB to bytes
         return file.content_length <= max_size if hasattr(file, 'content_length') else True
     
-    def validate_file_content(self, file_path, file_type):
-        """Dosya içeriğini güvenlik açısından kontrol et"""
+    def validate_file_content(self, file_path, file_type, head=None):
+        """Dosya içeriğini güvenlik açısından kontrol et.
+        
+        ``head`` gelen akışın ilk parçasıdır; verilmezse diskteki dosyanın
+        başı okunur. Uzantı ve MIME kontrolünün yanında imza (magic bytes)
+        uzantıyla karşılaştırılır.
+        """
         try:
             # Dosya uzantısından MIME türünü tahmin et
             mime_type, _ = mimetypes.guess_type(file_path)
@@ -94,6 +182,13 @@ class FileManager:
             if mime_type and mime_type not in safe_mimes.get(file_type, []):
                 return False, f"Güvenli olmayan dosya türü: {mime_type}"
             
+            # İçerik imzası kontrolü
+            if head is None:
+                with open(file_path, 'rb') as f:
+                    head = f.read(CHUNK_SIZE)
+            if not sniff_matches(head, file_ext.lstrip('.')):
+                return False, f"Dosya içeriği uzantısıyla uyuşmuyor: {file_ext}"
+            
             return True, "Dosya güvenli"
             
         except Exception as e:
@@ -106,8 +201,90 @@ class FileManager:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return f"{file_type}_{timestamp}_{unique_id}.{ext}"
     
-    def save_file(self, file, file_type, user_id):
-        """Dosyayı güvenli şekilde kaydet"""
+    def blob_key(self, sha256):
+        """İçerik özetinden depolama anahtarını üret"""
+        return f'blobs/{sha256[:2]}/{sha256}'
+    
+    def blob_path(self, sha256):
+        """Yerel depoda blob dosyasının yolu; uzak depoda None"""
+        return self.storage.local_path(self.blob_key(sha256))
+    
+    def blob_exists(self, sha256):
+        return self.storage.exists(self.blob_key(sha256))
+    
+    def open_blob(self, sha256):
+        """Blob'u aranabilir dosya olarak aç (uzak depoda Range istekleriyle okunur)"""
+        return self.storage.open(self.blob_key(sha256))
+    
+    def blob_file(self, sha256):
+        """Yerel yol gerektiren işlemler için blob'un yolunu veren context manager"""
+        return self.storage.local_copy(self.blob_key(sha256), temp_dir=self.temp_folder)
+    
+    def blob_url(self, sha256, download_name):
+        """Depodan doğrudan indirme URL'si; yerel depoda None"""
+        expires = self.app.config.get('S3_URL_EXPIRES') or DEFAULT_URL_EXPIRES
+        return self.storage.url(self.blob_key(sha256), download_name, expires=expires)
+    
+    def stream_to_temp(self, stream, max_size, head=b''):
+        """Akışı parça parça geçici dosyaya yaz, SHA-256'yı yazarken hesapla.
+        
+        ``head`` akıştan önceden okunmuş ilk parçadır. Boyut sınırı aşılırsa
+        geçici dosya silinir ve None döner; aksi halde (geçici yol, sha256,
+        boyut) döner.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_folder, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                chunk = head
+                while True:
+                    if not chunk:
+                        chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    chunk = b''
+        except Exception:
+            os.remove(temp_path)
+            raise
+        if size > max_size:
+            os.remove(temp_path)
+            return None
+        return temp_path, digest.hexdigest(), size
+    
+    def store_blob(self, temp_path, sha256):
+        """Geçici dosyayı içerik adresli anahtara taşı; içerik zaten varsa kopyayı at.
+        
+        (yerel blob yolu ya da uzak depoda None, tekrar mı) döner.
+        """
+        key = self.blob_key(sha256)
+        if self.storage.exists(key):
+            os.remove(temp_path)
+            return self.blob_path(sha256), True
+        self.storage.put_file(key, temp_path)
+        return self.blob_path(sha256), False
+    
+    def delete_blob(self, sha256):
+        """Blob'u ve önizlemelerini sil (yalnızca son referans kalktığında çağrılmalı)"""
+        self.previews.delete(sha256)
+        return self.storage.delete(self.blob_key(sha256))
+    
+    @staticmethod
+    def quota_message(quota_remaining):
+        remaining_mb = max(quota_remaining, 0) / (1024 * 1024)
+        return f"Depolama kotanız yetersiz. Kalan alan: {remaining_mb:.1f}MB"
+    
+    def save_file(self, file, file_type, user_id, quota_remaining=None):
+        """Dosyayı güvenli şekilde kaydet.
+        
+        ``quota_remaining`` kullanıcının kotasında kalan byte'tır (None: sınırsız);
+        dosya ondan büyükse depoya hiçbir bayt yazılmadan reddedilir.
+        """
         try:
             if not file or file.filename == '':
                 self.logger.warning(f"No file selected for upload - User: {user_id}")
@@ -124,103 +301,280 @@ class FileManager:
                 self.logger.warning(f"File too large: {file.filename} - User: {user_id} - Max size: {max_size}MB")
                 return None, f"Dosya boyutu çok büyük. Maksimum: {max_size}MB"
             
-            # Güvenli dosya adı oluştur
-            filename = secure_filename(file.filename)
-            unique_filename = self.generate_unique_filename(filename, file_type)
-            
-            # Dosya türüne göre klasör seç
-            if file_type == 'notes':
-                save_path = os.path.join(self.notes_folder, unique_filename)
-            elif file_type == 'projects':
-                save_path = os.path.join(self.projects_folder, unique_filename)
-            elif file_type == 'questions':
-                save_path = os.path.join(self.questions_folder, unique_filename)
-            else:
+            if file_type not in self.allowed_extensions:
                 self.logger.error(f"Invalid file type: {file_type} - User: {user_id}")
                 return None, "Geçersiz dosya türü"
             
-            # Dosyayı kaydet
-            file.save(save_path)
-            self.logger.info(f"File saved to disk: {save_path} - User: {user_id}")
+            # Kota, bildirilen boyutla baştan; bildirilmemişse akış sırasında kontrol edilir
+            if quota_remaining is not None and (quota_remaining <= 0 or (file.content_length or 0) > quota_remaining):
+                self.logger.warning(f"Storage quota exceeded: {file.filename} - User: {user_id}")
+                return None, self.quota_message(quota_remaining)
+            
+            # Güvenli dosya adı oluştur (kayda özel ad; içerik blob deposunda tutulur)
+            filename = secure_filename(file.filename)
+            unique_filename = self.generate_unique_filename(filename, file_type)
             
-            # Dosya içeriğini doğrula
-            is_safe, message = self.validate_file_content(save_path, file_type)
+            # İçeriği diske yazmadan önce ilk parçadan doğrula
+            head = file.stream.read(CHUNK_SIZE)
+            is_safe, message = self.validate_file_content(unique_filename, file_type, head)
             if not is_safe:
-                # Güvenli olmayan dosyayı sil
-                os.remove(save_path)
-                self.logger.error(f"Unsafe file detected and removed: {save_path} - User: {user_id} - Reason: {message}")
+                self.logger.error(f"Unsafe file rejected before write: {filename} - User: {user_id} - Reason: {message}")
                 return None, message
             
-            file_size = os.path.getsize(save_path)
-            self.logger.info(f"File upload successful: {filename} -> {unique_filename} - Size: {file_size} bytes - User: {user_id}")
+            # Dosyayı parça parça geçici dosyaya akıt, özeti yazarken hesapla
+            max_size = self.max_file_sizes.get(file_type, 10) * 1024 * 1024
+            limit = max_size if quota_remaining is None else min(max_size, quota_remaining)
+            streamed = self.stream_to_temp(file.stream, limit, head)
+            if streamed is None and limit < max_size:
+                self.logger.warning(f"Storage quota exceeded: {file.filename} - User: {user_id}")
+                return None, self.quota_message(quota_remaining)
+            if streamed is None:
+                self.logger.warning(f"File too large: {file.filename} - User: {user_id} - Max size: {max_size // (1024 * 1024)}MB")
+                return None, f"Dosya boyutu çok büyük. Maksimum: {max_size // (1024 * 1024)}MB"
+            temp_path, sha256, file_size = streamed
             
-            # URL için kullanılacak dosya adını da döndür
-            return {
-                'original_name': filename,
-                'saved_name': unique_filename,
-                'file_path': unique_filename,  # Sadece dosya adı (klasör yolu olmadan)
-                'file_url': unique_filename,  # URL için sadece dosya adı
-                'file_size': file_size,
-                'file_type': file_type,
-                'upload_date': datetime.now(),
-                'user_id': user_id
-            }, "Dosya başarıyla yüklendi"
+            return self._store_upload(temp_path, sha256, file_size, filename, unique_filename, file_type, user_id), \
+                "Dosya başarıyla yüklendi"
             
         except Exception as e:
             self.logger.error(f"File save error: {str(e)} - User: {user_id} - File: {file.filename if file else 'Unknown'}")
             return None, f"Dosya kaydetme hatası: {str(e)}"
     
-    def extract_archive_info(self, file_path):
-        """Arşiv dosyalarından bilgi çıkar"""
+    def _optimize_image(self, temp_path, ext, filename, user_id):
+        """Not görselini yeniden sıkıştır; (geçici yol, uzantı) ya da olduğu gibi kalacaksa None"""
+        if self.image_optimizer is None or ext not in OPTIMIZED_TYPES:
+            return None
         try:
-            if file_path.endswith('.zip'):
-                with zipfile.ZipFile(file_path, 'r') as zip_file:
-                    file_list = zip_file.namelist()
-                    return {
-                        'type': 'zip',
-                        'file_count': len(file_list),
-                        'files': file_list[:10],  # İlk 10 dosya
-                        'total_size': sum(zip_file.getinfo(f).file_size for f in file_list)
-                    }
-            elif file_path.endswith('.rar'):
-                with rarfile.RarFile(file_path, 'r') as rar_file:
-                    file_list = rar_file.namelist()
-                    return {
-                        'type': 'rar',
-                        'file_count': len(file_list),
-                        'files': file_list[:10],  # İlk 10 dosya
-                        'total_size': sum(rar_file.getinfo(f).file_size for f in file_list)
-                    }
+            return self.image_optimizer.optimize(temp_path, ext, self.temp_folder)
         except Exception as e:
-            return {'error': str(e)}
+            # Pillow'un açamadığı görsel (bozuk, desteklenmeyen alt tür) olduğu gibi saklanır
+            self.logger.warning(f"Image recompression skipped: {filename} - User: {user_id} - Reason: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _store_upload(self, temp_path, sha256, file_size, filename, unique_filename, file_type, user_id):
+        """Doğrulanmış geçici dosyayı depoya al ve kayıt için dosya bilgisini döndür.
+        
+        Not görselleri önce yeniden sıkıştırılır; IMAGE_KEEP_ORIGINAL açıksa
+        kaynak dosya da blob olarak saklanır (``original_sha256``).
+        """
+        original_sha256 = original_size = None
+        ext = unique_filename.rsplit('.', 1)[-1].lower()
+        optimized = self._optimize_image(temp_path, ext, filename, user_id) if file_type == 'notes' else None
+        if optimized:
+            optimized_path, new_ext = optimized
+            optimized_size = os.path.getsize(optimized_path)
+            self.logger.info(f"Image recompressed: {filename} - {file_size} -> {optimized_size} bytes - User: {user_id}")
+            if self.image_optimizer.keep_original:
+                self.store_blob(temp_path, sha256)
+                original_sha256, original_size = sha256, file_size
+            else:
+                os.remove(temp_path)
+            temp_path, sha256, file_size = optimized_path, self._hash_file(optimized_path), optimized_size
+            filename = f"{filename.rsplit('.', 1)[0]}.{new_ext}"
+            unique_filename = f"{unique_filename.rsplit('.', 1)[0]}.{new_ext}"
+        
+        blob_path, deduplicated = self.store_blob(temp_path, sha256)
+        self.logger.info(
+            f"File upload successful: {filename} -> {unique_filename} - Size: {file_size} bytes - "
+            f"SHA-256: {sha256}{' (deduplicated)' if deduplicated else ''} - User: {user_id}"
+        )
+        
+        # URL için kullanılacak dosya adını da döndür
+        return {
+            'original_name': filename,
+            'saved_name': unique_filename,
+            'file_path': unique_filename,  # Sadece dosya adı (klasör yolu olmadan)
+            'file_url': unique_filename,  # URL için sadece dosya adı
+            'file_size': file_size,
+            'file_type': file_type,
+            'sha256': sha256,
+            'original_sha256': original_sha256,
+            'original_size': original_size,
+            'blob_path': blob_path,
+            'deduplicated': deduplicated,
+            'upload_date': datetime.now(),
+            'user_id': user_id
+        }
+    
+    def create_temp_file(self):
+        """Parça parça yükleme için temp klasöründe boş dosya oluştur"""
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_folder, suffix='.upload')
+        os.close(fd)
+        return temp_path
+    
+    def save_temp_file(self, temp_path, original_filename, file_type, user_id, quota_remaining=None):
+        """Tamamlanmış parça yüklemesini save_file ile aynı kurallarla depoya al.
+        
+        Geçici dosya başarıda depoya taşınır, reddedilirse silinir.
+        """
+        try:
+            if not self.is_allowed_file(original_filename, file_type):
+                return None, f"Desteklenmeyen dosya türü: {original_filename}"
+            max_size = self.max_file_sizes.get(file_type, 10) * 1024 * 1024
+            file_size = os.path.getsize(temp_path)
+            if file_size > max_size:
+                return None, f"Dosya boyutu çok büyük. Maksimum: {max_size // (1024 * 1024)}MB"
+            if quota_remaining is not None and file_size > quota_remaining:
+                self.logger.warning(f"Storage quota exceeded: {original_filename} - User: {user_id}")
+                return None, self.quota_message(quota_remaining)
+            
+            filename = secure_filename(original_filename)
+            unique_filename = self.generate_unique_filename(filename, file_type)
+            digest = hashlib.sha256()
+            with open(temp_path, 'rb') as f:
+                head = f.read(CHUNK_SIZE)
+                is_safe, message = self.validate_file_content(unique_filename, file_type, head)
+                if not is_safe:
+                    self.logger.error(f"Unsafe file rejected: {filename} - User: {user_id} - Reason: {message}")
+                    return None, message
+                # Özet parçalar gelirken tutulamaz (süreç yeniden başlayabilir); tamamlanınca bir kez okunur
+                chunk = head
+                while chunk:
+                    digest.update(chunk)
+                    chunk = f.read(CHUNK_SIZE)
+            
+            file_info = self._store_upload(temp_path, digest.hexdigest(), file_size, filename, unique_filename,
+                                           file_type, user_id)
+            return file_info, "Dosya başarıyla yüklendi"
+        except Exception as e:
+            self.logger.error(f"Resumable upload save error: {str(e)} - User: {user_id} - File: {original_filename}")
+            return None, f"Dosya kaydetme hatası: {str(e)}"
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _open_archive(self, source, archive_type):
+        """``source`` dosya yolu ya da aranabilir dosya nesnesi olabilir"""
+        if archive_type == 'zip':
+            return zipfile.ZipFile(source, 'r')
+        if archive_type == 'rar':
+            return rarfile.RarFile(source, 'r')
+        raise ValueError(f"Desteklenmeyen arşiv türü: {archive_type}")
+    
+    def list_archive_entries(self, source, archive_type):
+        """Arşivin merkez dizinini (central directory) oku; içerik açılmaz.
+        
+        Her üye için path, is_dir, size, compressed_size, crc ve modified_at
+        içeren sözlükler döner. ``path`` '/' ayraçlı gösterim yoludur; üyeyi
+        açmak için arşivdeki özgün ad ``member``'da tutulur.
+        """
+        with self._open_archive(source, archive_type) as archive:
+            entries = []
+            for info in archive.infolist():
+                is_dir = info.is_dir()
+                path = info.filename.replace('\\', '/')
+                if is_dir and not path.endswith('/'):
+                    path += '/'
+                try:
+                    modified_at = datetime(*info.date_time) if info.date_time else None
+                except (TypeError, ValueError):
+                    modified_at = None
+                entries.append({
+                    'path': path,
+                    'member': info.filename,
+                    'is_dir': is_dir,
+                    'size': info.file_size,
+                    'compressed_size': info.compress_size,
+                    'crc': info.CRC,
+                    'modified_at': modified_at,
+                })
+            return entries
+    
+    def iter_archive_member(self, source, archive_type, member, chunk_size=64 * 1024):
+        """Tek bir üyeyi parça parça aç; diğer üyeler diske çıkarılmaz.
+        
+        Üretici kapatıldığında (istemci bağlantıyı keserse) arşiv de kapanır.
+        ZIP üyelerinin CRC'si okuma bitince doğrulanır.
+        """
+        with self._open_archive(source, archive_type) as archive:
+            with archive.open(member) as stream:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+    
+    def iter_blob_member(self, sha256, archive_type, member, chunk_size=64 * 1024):
+        """Blob'daki arşivin bir üyesini akıt.
+        
+        Blob ve üye çağrı anında açılır: üye yoksa KeyError yanıt başlamadan
+        yükselir. Akış kapatılınca arşiv ve blob da kapanır.
+        """
+        chunks = self._iter_blob_member(sha256, archive_type, member, chunk_size)
+        first = next(chunks, b'')
         
-        return None
+        def stream():
+            try:
+                yield first
+                yield from chunks
+            finally:
+                chunks.close()
+        return stream()
+    
+    def _iter_blob_member(self, sha256, archive_type, member, chunk_size):
+        with self.open_blob(sha256) as source:
+            yield from self.iter_archive_member(source, archive_type, member, chunk_size)
+    
+    def extract_archive_info(self, file_path, archive_type=None):
+        """Arşiv dosyalarından bilgi çıkar (uzantısız blob yolları için türü archive_type verir)"""
+        archive_type = archive_type or os.path.splitext(file_path)[1].lstrip('.').lower()
+        if archive_type not in ('zip', 'rar'):
+            return None
+        try:
+            entries = self.list_archive_entries(file_path, archive_type)
+        except Exception as e:
+            return {'error': str(e)}
+        return archive_summary(archive_type, entries)
     
 
     
+    def storage_key(self, file_path):
+        """Yükleme klasörü altındaki yolu depolama anahtarına çevir; klasör dışındaysa None"""
+        relative = os.path.relpath(os.path.abspath(file_path), os.path.abspath(self.upload_folder))
+        if relative == '.' or relative.split(os.sep)[0] == '..':
+            return None
+        return relative.replace(os.sep, '/')
+    
+    def storage_for(self, key):
+        """Anahtarın arka ucu: blobs/ blob deposunda, eski klasörler her zaman yerel diskte"""
+        return self.storage if key.startswith('blobs/') else self.legacy_storage
+    
     def delete_file(self, file_path):
-        """Dosyayı sil"""
+        """Yükleme klasörü altındaki yolu (blob ya da eski dosya) kendi arka ucundan sil"""
+        key = self.storage_key(file_path)
+        if key is None:
+            return False, "Dosya yükleme klasörü dışında"
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            if self.storage_for(key).delete(key):
                 return True, "Dosya başarıyla silindi"
             return False, "Dosya bulunamadı"
         except Exception as e:
             return False, f"Dosya silme hatası: {str(e)}"
     
     def get_file_info(self, file_path):
-        """Dosya bilgilerini getir"""
+        """Dosya bilgilerini yolun arka ucundan getir"""
+        key = self.storage_key(file_path)
         try:
-            if not os.path.exists(file_path):
+            info = self.storage_for(key).info(key) if key else None
+            if info is None:
                 return None
             
-            stat = os.stat(file_path)
             mime_type, _ = mimetypes.guess_type(file_path)
+            # Nesne depolarında oluşturma zamanı yok; son değişiklik kullanılır
+            modified = info['modified'].astimezone().replace(tzinfo=None) if info['modified'] else None
             
             return {
-                'size': stat.st_size,
-                'created': datetime.fromtimestamp(stat.st_ctime),
-                'modified': datetime.fromtimestamp(stat.st_mtime),
+                'size': info['size'],
+                'created': modified,
+                'modified': modified,
                 'mime_type': mime_type or 'application/octet-stream'
             }
         except Exception as e:
@@ -0,0 +1,108 @@
+"""Not görsellerinin yüklemede yeniden sıkıştırılması.
+
+Telefon fotoğrafları ve BMP'ler olduğu gibi saklanınca çok yer tutar. Yüklenen
+görsel depoya alınmadan önce Pillow ile:
+
+- EXIF yönüne göre döndürülür (görüntüleyiciler yönü okumasa da doğru durur),
+- EXIF/XMP/yorum gibi üst verilerden arındırılır (renk profili korunur),
+- uzun kenarı ``max_dimension``'dan büyükse küçültülür,
+- kayıplı kaynak (JPEG) JPEG olarak, kayıpsız kaynak (PNG, BMP, GIF) PNG
+  olarak yeniden kodlanır; çizim ve ekran görüntülerine JPEG izi eklenmez.
+
+Hareketli GIF'ler ve çok büyük görseller olduğu gibi bırakılır. Yeniden
+kodlanmış dosya yalnızca döndürme, küçültme ya da üst veri temizliği
+gerektiğinde veya daha küçük olduğunda kullanılır.
+"""
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+from previews import MAX_SOURCE_PIXELS
+
+MAX_DIMENSION = 2560  # px, uzun kenar
+JPEG_QUALITY = 85
+
+LOSSY_TYPES = {'jpg', 'jpeg'}
+OPTIMIZED_TYPES = LOSSY_TYPES | {'png', 'gif', 'bmp'}
+# Kaldırılan üst veri anahtarları (PNG metin parçaları ayrıca kontrol edilir)
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop')
+EXIF_ORIENTATION = 0x0112
+
+
+def _has_metadata(image):
+    return any(key in image.info for key in METADATA_KEYS) or bool(getattr(image, 'text', None))
+
+
+class ImageOptimizer:
+    """Görseli ``max_dimension`` ve ``jpeg_quality`` ile yeniden kodlar.
+
+    ``keep_original`` açıksa çağıran taraf kaynak dosyayı da saklar.
+    """
+
+    def __init__(self, max_dimension=MAX_DIMENSION, jpeg_quality=JPEG_QUALITY, keep_original=False):
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.keep_original = keep_original
+
+    def optimize(self, source_path, ext, temp_dir):
+        """(geçici yol, yeni uzantı) döndür; görsel olduğu gibi kalmalıysa None.
+
+        Kaynak dosyaya dokunulmaz; geçici dosyayı silmek çağırana kalır.
+        """
+        ext = ext.lower()
+        if ext not in OPTIMIZED_TYPES:
+            return None
+        lossy = ext in LOSSY_TYPES
+        new_ext = ext if lossy else 'png'
+        with Image.open(source_path) as image:
+            if getattr(image, 'n_frames', 1) > 1:
+                return None  # animasyon tek kareye indirilmez
+            if image.width * image.height > MAX_SOURCE_PIXELS:
+                return None
+            original_size = image.size
+            rotated = image.getexif().get(EXIF_ORIENTATION, 1) not in (0, 1)
+            stripped = _has_metadata(image)
+            icc_profile = image.info.get('icc_profile')
+            if lossy:
+                # JPEG'lerde çözme aşamasında küçültme; tam boy açılmaz
+                image.draft(image.mode, (self.max_dimension, self.max_dimension))
+            result = ImageOps.exif_transpose(image)
+            result.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS)
+            resized = sorted(result.size) != sorted(original_size)
+
+            if lossy:
+                if result.mode not in ('RGB', 'L', 'CMYK'):
+                    result = result.convert('RGB')
+                params = {'quality': self.jpeg_quality, 'optimize': True, 'progressive': True}
+            else:
+                params = {'optimize': True}
+                if 'transparency' in result.info:
+                    params['transparency'] = result.info['transparency']
+            if icc_profile:
+                params['icc_profile'] = icc_profile
+            result.info = {}  # yorum ve XMP gibi alanlar Pillow tarafından kopyalanmasın
+
+            fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=f'.{new_ext}')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    result.save(out, 'JPEG' if lossy else 'PNG', **params)
+            except Exception:
+                os.remove(temp_path)
+                raise
+
+        if not (rotated or resized or stripped) and os.path.getsize(temp_path) >= os.path.getsize(source_path):
+            os.remove(temp_path)
+            return None
+        return temp_path, new_ext
+
+
+def optimizer_from_config(config):
+    """Uygulama ayarlarından görsel iyileştiriciyi kur; kapalıysa None"""
+    if not config.get('IMAGE_OPTIMIZE', True):
+        return None
+    return ImageOptimizer(
+        max_dimension=int(config.get('IMAGE_MAX_DIMENSION') or MAX_DIMENSION),
+        jpeg_quality=int(config.get('IMAGE_JPEG_QUALITY') or JPEG_QUALITY),
+        keep_original=bool(config.get('IMAGE_KEEP_ORIGINAL')),
+    )
@@ -0,0 +1,100 @@
+"""Yükleme sonrası işler için süreç içi arka plan iş havuzu.
+
+İşler veritabanındaki ``background_job`` tablosuna yazılır, kimlikleri bu
+havuza verilir. Havuz yalnızca "şu işi çalıştır" der; işi sahiplenme,
+sonucu ve hatayı kaydetme ``run_func`` içinde yapılır. Böylece süreç
+yeniden başlarsa bekleyen işler tablodan yeniden kuyruğa alınabilir ve
+birden fazla gunicorn worker'ı aynı işi iki kez çalıştırmaz.
+
+``workers=0`` işleri çağıran iş parçacığında hemen çalıştırır.
+
+``heartbeat`` verilirse iş çalıştığı sürece her ``heartbeat_interval``
+saniyede bir çağrılır; uygulama bununla sahiplendiği işlerin kirasını
+(lease) tazeler. Kirası dolan iş, süreci ölmüş sayılıp yeniden kuyruğa alınır.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_WORKERS = 2
+DEFAULT_HEARTBEAT_INTERVAL = 30  # saniye
+
+
+class JobQueue:
+    """İş kimliklerini ``run_func``'a veren iş parçacığı havuzu"""
+
+    def __init__(self, run_func, workers=DEFAULT_WORKERS, heartbeat=None,
+                 heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL):
+        self.run_func = run_func
+        self.workers = workers
+        self.heartbeat = heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job') if workers > 0 else None
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._stopped = threading.Event()
+        self._heartbeat_thread = None
+        self._heartbeat_pid = None
+
+    def submit(self, job_id):
+        """İşi havuza ver (workers=0 ise hemen çalıştır)"""
+        if self._executor is None:
+            self._run(job_id)
+            return None
+        future = self._executor.submit(self._run, job_id)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _run(self, job_id):
+        self._start_heartbeat()
+        with self._lock:
+            self._running += 1
+        try:
+            self.run_func(job_id)
+        except Exception as e:
+            # run_func hatayı işe kaydeder; buraya yalnızca kayıt da başarısızsa düşülür
+            logging.getLogger('error').error(f"Background job {job_id} crashed: {e}")
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _start_heartbeat(self):
+        # İş parçacıkları fork'tan sağ çıkmaz (gunicorn --preload); her süreç kendi nabzını başlatır
+        if self.heartbeat is None:
+            return
+        with self._lock:
+            if self._heartbeat_pid == os.getpid() and self._heartbeat_thread.is_alive():
+                return
+            self._heartbeat_pid = os.getpid()
+            self._heartbeat_thread = threading.Thread(target=self._beat, name='job-heartbeat', daemon=True)
+            self._heartbeat_thread.start()
+
+    def _beat(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            with self._lock:
+                busy = self._running > 0
+            if not busy:
+                continue
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logging.getLogger('error').error(f"Background job heartbeat failed: {e}")
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def join(self, timeout=None):
+        """Kuyruktaki tüm işlerin bitmesini bekle; bitmeyen iş sayısını döndür"""
+        with self._lock:
+            futures = list(self._futures)
+        return len(wait(futures, timeout).not_done) if futures else 0
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
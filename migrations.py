@@ -0,0 +1,386 @@
+"""Sürümlü şema migration'ları.
+
+Her migration ``schema_version`` tablosuna bir satır olarak kaydedilir. Açılışta
+tek bir SELECT ile mevcut sürüm okunur; şema güncelse hiçbir introspection
+(create_all, kolon listeleme) yapılmaz. Migration'lar idempotent yazılır, böylece
+aynı anda açılan gunicorn worker'ları birbirini bozmaz.
+"""
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import (BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table,
+                        Text, inspect, text)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+import search_index
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Fonksiyonu sıralı migration listesine kaydet"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def _quote(conn, name):
+    """Tablo adını lehçeye göre tırnakla (PostgreSQL'de "user" ayrılmış kelime)"""
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def add_missing_columns(conn, table, columns):
+    """Tabloda olmayan kolonları ekle. ``columns``: [(ad, DDL tipi), ...]"""
+    existing = {col['name'] for col in inspect(conn).get_columns(table)}
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {_quote(conn, table)} ADD COLUMN {name} {ddl}"))
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """İndeksi yoksa oluştur (SQLite ve PostgreSQL IF NOT EXISTS destekler)"""
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    conn.execute(text(
+        f"CREATE {kind} IF NOT EXISTS {name} ON {_quote(conn, table)} ({', '.join(columns)})"
+    ))
+
+
+def apply_declared_indexes(engine, metadata):
+    """Modellerde tanımlı, veritabanında eksik olan indeksleri oluştur.
+
+    Mevcut veritabanlarını model tanımlarıyla eşitlemek için kullanılır;
+    oluşturulan indeks adlarının listesini döndürür.
+    """
+    created = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    created.append(index.name)
+    return created
+
+
+def recount_storage_used(conn, originals=True):
+    """Kullanıcı depolama sayaçlarını not ve proje dosya boyutlarından yeniden hesapla.
+
+    ``originals`` saklanan görsel orijinallerini de sayar; kolon migration 18'den
+    önceki şemada yoktur.
+    """
+    user = _quote(conn, 'user')
+    note_size = 'coalesce(file_size, 0) + coalesce(original_file_size, 0)' if originals else 'file_size'
+    conn.execute(text(
+        f"UPDATE {user} SET storage_used = "
+        f"coalesce((SELECT sum({note_size}) FROM note WHERE note.uploaded_by = {user}.id), 0) + "
+        f"coalesce((SELECT sum(file_size) FROM project WHERE project.uploaded_by = {user}.id), 0)"
+    ))
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def get_schema_version(engine):
+    """Uygulanmış son migration sürümünü döndür; tablo yoksa None"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except SQLAlchemyError:
+        return None
+
+
+def upgrade(engine, create_all):
+    """Bekleyen migration'ları sırayla uygula.
+
+    ``create_all`` yalnızca şema güncel değilse çağrılır. Uygulanan migration
+    sayısını döndürür.
+    """
+    logger = logging.getLogger('app')
+    current = get_schema_version(engine)
+    target = latest_version()
+    if current is not None and current >= target:
+        return 0
+
+    # Yeni tablolar modellerden oluşturulur; migration'lar mevcut tabloları yükseltir
+    create_all()
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+
+    applied = 0
+    for version, description, func in MIGRATIONS:
+        if current is not None and version <= current:
+            continue
+        try:
+            with engine.begin() as conn:
+                already = conn.execute(
+                    text("SELECT 1 FROM schema_version WHERE version = :v"), {'v': version}
+                ).first()
+                if already:
+                    continue
+                func(conn)
+                conn.execute(
+                    text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                    {'v': version, 'd': description, 't': datetime.utcnow()}
+                )
+            applied += 1
+            logger.info(f"Schema migration applied: {version} - {description}")
+        except IntegrityError:
+            # Başka bir worker aynı migration'ı eş zamanlı uyguladı
+            logger.info(f"Schema migration {version} already applied by another process")
+    return applied
+
+
+@migration(1, 'User profil kolonları')
+def _user_profile_columns(conn):
+    add_missing_columns(conn, 'user', [
+        ('birth_date', 'DATE'),
+        ('school', 'VARCHAR(120)'),
+        ('department', 'VARCHAR(120)'),
+        ('interests', 'TEXT'),
+        ('profile_bg', "VARCHAR(255) DEFAULT 'splash_cockpit.jpg'"),
+    ])
+
+
+@migration(2, 'Question dosya kolonları')
+def _question_file_columns(conn):
+    add_missing_columns(conn, 'question', [
+        ('file_path', 'VARCHAR(200)'),
+        ('file_name', 'VARCHAR(200)'),
+        ('file_size', 'INTEGER'),
+        ('file_type', 'VARCHAR(50)'),
+        ('file_url', 'VARCHAR(200)'),
+    ])
+
+
+@migration(3, 'Yabancı anahtar indeksleri')
+def _foreign_key_indexes(conn):
+    create_index(conn, 'ix_note_course_id', 'note', ['course_id'])
+    create_index(conn, 'ix_note_uploaded_by', 'note', ['uploaded_by'])
+    create_index(conn, 'ix_question_course_id', 'question', ['course_id'])
+    create_index(conn, 'ix_project_uploaded_by', 'project', ['uploaded_by'])
+
+
+@migration(4, 'Sıralama ve filtre kolonu indeksleri')
+def _sort_column_indexes(conn):
+    create_index(conn, 'ix_course_grade', 'course', ['grade'])
+    create_index(conn, 'ix_note_created_at', 'note', ['created_at'])
+    create_index(conn, 'ix_note_course_id_created_at', 'note', ['course_id', 'created_at'])
+    create_index(conn, 'ix_question_year', 'question', ['year'])
+    create_index(conn, 'ix_question_created_at', 'question', ['created_at'])
+    create_index(conn, 'ix_question_course_id_year', 'question', ['course_id', 'year'])
+    create_index(conn, 'ix_project_grade', 'project', ['grade'])
+    create_index(conn, 'ix_project_created_at', 'project', ['created_at'])
+    create_index(conn, 'ix_project_grade_created_at', 'project', ['grade', 'created_at'])
+    create_index(conn, 'ix_course_review_created_at', 'course_review', ['created_at'])
+
+
+@migration(5, 'Tam metin arama indeksleri (FTS5 / tsvector)')
+def _fulltext_search_index(conn):
+    search_index.install(conn, rebuild=True, columns=search_index.SEARCH_FIELDS)
+
+
+@migration(6, 'Türkçe normalize arama anahtarları')
+def _normalized_search_keys(conn):
+    search_index.uninstall(conn)
+    for table_name in search_index.SEARCH_FIELDS:
+        add_missing_columns(conn, table_name, [(search_index.KEY_COLUMN, 'TEXT')])
+        search_index.backfill_search_keys(conn, table_name)
+    search_index.install(conn, rebuild=True)
+
+
+@migration(7, 'Ana sayfa sayaç tablosu')
+def _site_stats(conn):
+    # Tablo create_all ile oluşur; mevcut veriler için sayaçlar bir kez sayılır
+    conn.execute(text(
+        f"INSERT INTO site_stats (id, users, notes, questions, projects, updated_at) "
+        f"SELECT 1, (SELECT count(*) FROM {_quote(conn, 'user')}), (SELECT count(*) FROM note), "
+        f"(SELECT count(*) FROM question), (SELECT count(*) FROM project), :now "
+        f"WHERE NOT EXISTS (SELECT 1 FROM site_stats WHERE id = 1)"
+    ), {'now': datetime.utcnow()})
+
+
+@migration(8, 'Ders yorumu alt yorum tablosu')
+def _review_comments(conn):
+    # Tablo create_all ile oluşur. Eski sayaçlar hiç saklanmamış yorumları
+    # sayıyordu; gerçekte kayıtlı yorum sayısıyla eşitlenir.
+    conn.execute(text(
+        "UPDATE course_review SET comments_count = "
+        "(SELECT count(*) FROM review_comment WHERE review_comment.review_id = course_review.id)"
+    ))
+
+
+@migration(9, 'İçerik adresli dosya referansları')
+def _blob_references(conn):
+    # file_blob tablosu create_all ile oluşur; eski kayıtlar klasördeki dosyalarını kullanmaya devam eder
+    for table_name in ('note', 'question', 'project'):
+        add_missing_columns(conn, table_name, [('blob_sha256', 'VARCHAR(64)')])
+        create_index(conn, f'ix_{table_name}_blob_sha256', table_name, ['blob_sha256'])
+
+
+@migration(10, 'Benzersiz indeksli stored_filename kolonu')
+def _stored_filenames(conn, batch_size=1000):
+    for table_name in ('note', 'question', 'project'):
+        add_missing_columns(conn, table_name, [('stored_filename', 'VARCHAR(200)')])
+        table_sql = _quote(conn, table_name)
+        # Aynı ada sahip eski kayıtlardan yalnızca ilki (LIKE aramasının da bulduğu) adı alır
+        taken = {row[0] for row in conn.execute(text(
+            f"SELECT stored_filename FROM {table_sql} WHERE stored_filename IS NOT NULL"
+        ))}
+        last_id = 0
+        while True:
+            rows = conn.execute(text(
+                f"SELECT id, file_path FROM {table_sql} WHERE id > :last AND file_path IS NOT NULL "
+                f"AND stored_filename IS NULL ORDER BY id LIMIT :n"
+            ), {'last': last_id, 'n': batch_size}).all()
+            if not rows:
+                break
+            updates = []
+            for row_id, file_path in rows:
+                # file_manager.stored_filename_for ile aynı; migration'lar uygulama modüllerine bağlanmaz
+                name = file_path.replace('\\', '/').rsplit('/', 1)[-1]
+                if name and name not in taken:
+                    taken.add(name)
+                    updates.append({'id': row_id, 'name': name})
+            if updates:
+                conn.execute(text(f"UPDATE {table_sql} SET stored_filename = :name WHERE id = :id"), updates)
+            last_id = rows[-1][0]
+        create_index(conn, f'ix_{table_name}_stored_filename', table_name, ['stored_filename'], unique=True)
+
+
+@migration(11, 'Arka plan iş tablosu')
+def _background_jobs(conn):
+    # Tablo bu sürümdeki haliyle açıkça kurulur (create_all önce çalıştıysa dokunulmaz);
+    # sonraki kolonları kendi migration'ları ekler
+    metadata = MetaData()
+    Table('user', metadata, Column('id', Integer, primary_key=True))  # yalnızca yabancı anahtar için
+    jobs = Table(
+        'background_job', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('kind', String(50), nullable=False),
+        Column('status', String(20), nullable=False, index=True),
+        Column('payload', Text),
+        Column('result', Text),
+        Column('error', Text),
+        Column('attempts', Integer, nullable=False),
+        Column('user_id', Integer, ForeignKey('user.id', ondelete='SET NULL')),
+        Column('target_type', String(20)),
+        Column('target_id', Integer),
+        Column('created_at', DateTime),
+        Column('started_at', DateTime),
+        Column('finished_at', DateTime),
+        Index('ix_background_job_target', 'target_type', 'target_id'),
+    )
+    jobs.create(conn, checkfirst=True)
+
+
+@migration(12, 'Arşiv merkez dizini tablosu')
+def _archive_entries(conn):
+    # archive_entry tablosu create_all ile oluşur. Mevcut zip/rar projeleri için
+    # dizin çıkarma işleri kuyruğa yazılır; uygulama açılırken iş havuzu çalıştırır.
+    queue_archive_indexing(conn)
+
+
+def queue_archive_indexing(conn):
+    """Dizini olmayan ve bekleyen işi de olmayan zip/rar projeleri için iş kuyruğa yaz"""
+    project, jobs_table = _quote(conn, 'project'), _quote(conn, 'background_job')
+    rows = conn.execute(text(
+        f"SELECT p.id, p.blob_sha256, p.file_type FROM {project} p "
+        f"WHERE p.blob_sha256 IS NOT NULL AND lower(p.file_type) IN ('zip', 'rar') "
+        f"AND NOT EXISTS (SELECT 1 FROM archive_entry e WHERE e.blob_sha256 = p.blob_sha256) "
+        f"AND NOT EXISTS (SELECT 1 FROM {jobs_table} j WHERE j.target_type = 'project' "
+        f"AND j.target_id = p.id AND j.status IN ('queued', 'running'))"
+    )).all()
+    jobs = [{
+        'kind': 'archive_info',
+        'status': 'queued',
+        'payload': json.dumps({'project_id': row_id, 'sha256': sha256, 'ext': file_type.lower()}),
+        'target_type': 'project',
+        'target_id': row_id,
+        'created_at': datetime.utcnow(),
+    } for row_id, sha256, file_type in rows]
+    if jobs:
+        conn.execute(text(
+            f"INSERT INTO {jobs_table} "
+            f"(kind, status, payload, target_type, target_id, created_at, attempts) "
+            f"VALUES (:kind, :status, :payload, :target_type, :target_id, :created_at, 0)"
+        ), jobs)
+
+
+@migration(13, 'Parça parça yükleme tablosu')
+def _upload_sessions(conn):
+    # Tablo bu sürümdeki haliyle açıkça kurulur (create_all önce çalıştıysa dokunulmaz)
+    metadata = MetaData()
+    Table('user', metadata, Column('id', Integer, primary_key=True))  # yalnızca yabancı anahtar için
+    uploads = Table(
+        'upload_session', metadata,
+        Column('id', String(32), primary_key=True),
+        Column('user_id', Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True),
+        Column('file_type', String(20), nullable=False),
+        Column('file_name', String(255), nullable=False),
+        Column('length', BigInteger, nullable=False),
+        Column('upload_offset', BigInteger, nullable=False),
+        Column('temp_name', String(255), nullable=False),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime, index=True),
+    )
+    uploads.create(conn, checkfirst=True)
+
+
+@migration(14, 'Kullanıcı depolama sayacı ve kotası')
+def _storage_quota(conn):
+    add_missing_columns(conn, 'user', [('storage_used', 'BIGINT NOT NULL DEFAULT 0'),
+                                       ('storage_quota', 'BIGINT')])
+    # Mevcut yüklemeler bir kez toplanır; sonrasında sayaç ekleme/silmede güncellenir
+    recount_storage_used(conn, originals=False)
+
+
+@migration(15, 'Yeniden sıkıştırılan not görsellerinin orijinali')
+def _original_image_blobs(conn):
+    add_missing_columns(conn, 'note', [('original_blob_sha256', 'VARCHAR(64)')])
+    create_index(conn, 'ix_note_original_blob_sha256', 'note', ['original_blob_sha256'])
+
+
+@migration(16, 'Arşiv üyelerinin özgün adları')
+def _archive_member_names(conn):
+    add_missing_columns(conn, 'archive_entry', [('member', 'VARCHAR(1024)')])
+    # Eski dizinler yalnızca düzeltilmiş yolu tutuyordu ('\\' -> '/', baştaki '/' atılmış);
+    # özgün adlar ancak arşiv yeniden okunarak bulunur, bu yüzden dizin baştan çıkarılır
+    conn.execute(text(
+        "DELETE FROM archive_entry WHERE blob_sha256 NOT IN "
+        "(SELECT blob_sha256 FROM archive_entry WHERE member IS NOT NULL)"
+    ))
+    queue_archive_indexing(conn)
+
+
+@migration(17, 'Arka plan işlerinin sahibi ve nabzı')
+def _job_leases(conn):
+    add_missing_columns(conn, 'background_job', [('owner', 'VARCHAR(100)'), ('heartbeat_at', 'TIMESTAMP')])
+
+
+@migration(18, 'Saklanan görsel orijinallerinin boyutu')
+def _original_image_sizes(conn):
+    add_missing_columns(conn, 'note', [('original_file_size', 'INTEGER')])
+    # Orijinaller artık kotaya sayılır; boyutu blob kaydında bilinenler toplanır
+    conn.execute(text(
+        "UPDATE note SET original_file_size = "
+        "(SELECT size FROM file_blob WHERE file_blob.sha256 = note.original_blob_sha256) "
+        "WHERE original_blob_sha256 IS NOT NULL"
+    ))
+    recount_storage_used(conn)
@@ -0,0 +1,87 @@
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPage:
+    """Tek bir keyset sayfasının sonucu"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    """Sıralama anahtarı değerlerini URL güvenli bir cursor'a çevir"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Cursor'ı sıralama kolonlarının tiplerine göre çöz; geçersizse None döner"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            return None
+        values = []
+        for column, value in zip(columns, payload):
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        logging.getLogger('app').warning(f"Invalid pagination cursor ignored: {cursor[:64]}")
+        return None
+
+
+def _after(columns, values, descending):
+    """(c1, c2, ...) demetinin cursor'dan sonra gelmesi koşulu"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def clamp_page_size(limit):
+    """İstenen sayfa boyutunu izin verilen aralığa sınırla"""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_paginate(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """Sorguyu verilen kolonlara göre sırala ve cursor'dan sonraki sayfayı getir.
+
+    Son kolon benzersiz olmalıdır (genellikle id). OFFSET kullanılmadığı için
+    derin sayfalar ilk sayfa kadar ucuzdur.
+    """
+    limit = clamp_page_size(limit)
+    values = decode_cursor(cursor, columns)
+    if values is not None:
+        query = query.filter(_after(columns, values, descending))
+    ordering = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return KeysetPage(rows, next_cursor)
@@ -0,0 +1,121 @@
+"""Dosya önizlemeleri: PDF ilk sayfası ve görsellerin küçültülmüş hali.
+
+Önizlemeler içerik anahtarı (blob SHA-256'sı ya da eski dosyalar için
+boyut-mtime) ve genişliğe göre diskte saklanır; aynı içerik için bir kez
+üretilir. Anahtar içerikle değiştiği için yanıtlar uzun süre önbelleğe
+alınabilir.
+
+Görseller Pillow ile, PDF'ler poppler'ın ``pdftoppm`` aracıyla işlenir.
+``pdftoppm`` kurulu değilse PDF önizlemesi üretilmez (None döner).
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+from PIL import Image, ImageOps
+
+PREVIEW_SIZES = {'thumb': 320, 'large': 1024}  # ad -> genişlik (px)
+DEFAULT_SIZE = 'thumb'
+MAX_ASPECT = 3  # çok uzun görseller genişliğin bu katıyla kırpılmadan sınırlanır
+JPEG_QUALITY = 80
+PDF_TIMEOUT = 30  # saniye
+MAX_SOURCE_PIXELS = 50_000_000  # sıkıştırma bombalarına karşı
+
+IMAGE_TYPES = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
+PDF_TYPES = {'pdf'}
+
+
+def can_preview(ext):
+    return ext in IMAGE_TYPES or ext in PDF_TYPES
+
+
+def _to_rgb(image):
+    """Saydam görselleri beyaz zemine oturt (JPEG alfa kanalı taşımaz)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_image(source, width):
+    """Görseli en fazla ``width`` genişliğe küçültülmüş RGB görsel olarak döndür"""
+    with Image.open(source) as image:
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise ValueError(f'Görsel çok büyük: {image.width}x{image.height}')
+        # JPEG'lerde çözme aşamasında küçültme; tam boy açılmaz
+        image.draft('RGB', (width, width * MAX_ASPECT))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, width * MAX_ASPECT))
+        return _to_rgb(image)
+
+
+def render_pdf_first_page(source, width, pdftoppm=None):
+    """PDF'in ilk sayfasını ``width`` genişlikte görsel olarak döndür; araç yoksa None"""
+    pdftoppm = pdftoppm or shutil.which('pdftoppm')
+    if not pdftoppm:
+        return None
+    with tempfile.TemporaryDirectory() as workdir:
+        target = os.path.join(workdir, 'page')
+        subprocess.run(
+            [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to-x', str(width),
+             '-scale-to-y', '-1', source, target],
+            check=True, capture_output=True, timeout=PDF_TIMEOUT,
+        )
+        with Image.open(target + '.png') as page:
+            page.load()
+            return _to_rgb(page)
+
+
+class PreviewCache:
+    """Önizlemeleri ``<root>/<anahtar[:2]>/<anahtar>_<genişlik>.jpg`` altında tutar"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, key, width):
+        return os.path.join(self.root, key[:2], f'{key}_{width}.jpg')
+
+    def cached(self, key, size=DEFAULT_SIZE):
+        """Önceden üretilmiş önizlemenin yolu; yoksa None"""
+        path = self.path_for(key, PREVIEW_SIZES[size])
+        return path if os.path.exists(path) else None
+
+    def get_or_create(self, key, source, ext, size=DEFAULT_SIZE):
+        """Önizleme yolunu döndür; yoksa üret. Desteklenmeyen türde None"""
+        width = PREVIEW_SIZES[size]
+        path = self.path_for(key, width)
+        if os.path.exists(path):
+            return path
+        if ext in IMAGE_TYPES:
+            image = render_image(source, width)
+        elif ext in PDF_TYPES:
+            image = render_pdf_first_page(source, width)
+        else:
+            return None
+        if image is None:
+            return None
+
+        # Aynı anda üreten istekler birbirinin yarım dosyasını görmesin
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                image.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return path
+
+    def delete(self, key):
+        """Anahtarın tüm boyutlardaki önizlemelerini sil"""
+        removed = 0
+        for width in PREVIEW_SIZES.values():
+            path = self.path_for(key, width)
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        return removed
@@ -0,0 +1,232 @@
+"""Yükleme deposu ile veritabanını karşılaştıran uzlaştırıcı ve çöp toplayıcı.
+
+Depodaki anahtarlar (``storage.iter_keys``) akış halinde okunur ve
+``batch_size``'lık gruplar halinde dosya kolonlarına tek bir toplu sorguyla
+eşlenir; ağacın tamamı belleğe alınmaz. Hiçbir kaydın göstermediği dosyalar
+sahipsiz (orphaned), kaydı olup dosyası olmayanlar eksik (missing) olarak
+raporlanır. ``dry_run=False`` verilirse sahipsiz dosyalar grup grup silinir
+ve yanlış blob referans sayıları düzeltilir.
+
+Taranan önekler:
+
+- ``blobs/<ab>/<sha256>``: note/question/project ``blob_sha256`` ve
+  note ``original_blob_sha256`` kolonları
+- ``notes/``, ``projects/``, ``questions/``: blob deposundan önceki kayıtların
+  ``file_path`` / ``stored_filename`` kolonları
+- ``temp/``: süren parça yüklemeleri (``upload_session.temp_name``)
+
+Yalnızca ``blobs/`` blob arka ucunda (yerel ya da S3) aranır; diğer önekler
+her zaman yükleme klasöründedir (``file_manager.legacy_storage``).
+
+Önizlemeler türetilmiş önbellektir ve blob'la birlikte silinir; taranmaz.
+Yeni yazılmış dosyalar henüz commit edilmemiş bir kayda ait olabileceği için
+``grace`` süresi dolmadan silinmez.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, text
+
+from file_manager import stored_filename_for
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_GRACE = timedelta(hours=1)
+SAMPLE_SIZE = 20  # raporda örnek olarak listelenen anahtar sayısı
+
+LEGACY_FOLDERS = {'notes': 'note', 'projects': 'project', 'questions': 'question'}
+# (tablo, kolon): blob özeti tutan kolonlar; notlarda yeniden sıkıştırılan görselin orijinali de
+BLOB_COLUMNS = (('note', 'blob_sha256'), ('note', 'original_blob_sha256'),
+                ('question', 'blob_sha256'), ('project', 'blob_sha256'))
+
+_BLOB_REFS = ' UNION ALL '.join(f'SELECT {column} AS blob_sha256 FROM {table} WHERE {column} IS NOT NULL'
+                                for table, column in BLOB_COLUMNS)
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class FileReconciler:
+    """``file_manager`` deposunu ``engine``'deki dosya kolonlarıyla karşılaştırır.
+
+    ``legacy_fallbacks`` eski kayıtların depo dışında da aranabileceği yerel
+    klasörlerdir (ör. ``{'notes': ['static/notes']}``).
+    """
+
+    def __init__(self, engine, file_manager, batch_size=DEFAULT_BATCH_SIZE, grace=DEFAULT_GRACE,
+                 legacy_fallbacks=None):
+        self.engine = engine
+        self.file_manager = file_manager
+        self.storage = file_manager.storage
+        # Eski klasörler ve temp/ blob arka ucu ne olursa olsun yereldir
+        self.local_storage = file_manager.legacy_storage
+        self.batch_size = batch_size
+        self.grace = grace
+        self.legacy_fallbacks = legacy_fallbacks or {}
+
+    # --- toplu referans sorguları ---
+    @staticmethod
+    def _query(conn, sql, **lists):
+        """``IN :ad`` parametreleri liste olarak genişletilen sorgu"""
+        statement = text(sql).bindparams(*(bindparam(name, expanding=True) for name in lists))
+        return conn.execute(statement, {name: list(values) for name, values in lists.items()})
+
+    def _referenced(self, conn, prefix, names):
+        """Gruptaki adlardan veritabanında karşılığı olanlar"""
+        if prefix == 'blobs':
+            rows = self._query(conn, ' UNION '.join(
+                f'SELECT {column} FROM {table} WHERE {column} IN :names' for table, column in BLOB_COLUMNS
+            ), names=names)
+            return {row[0] for row in rows}
+        if prefix == 'temp':
+            rows = self._query(conn, 'SELECT temp_name FROM upload_session WHERE temp_name IN :names', names=names)
+            return {row[0] for row in rows}
+        # Eski kayıtlarda file_path yalın ad ya da klasörlü yol olabilir
+        paths = set(names) | {f'{prefix}/{n}' for n in names} | {f'uploads/{prefix}/{n}' for n in names}
+        rows = self._query(
+            conn, f'SELECT stored_filename, file_path FROM {LEGACY_FOLDERS[prefix]} '
+                  f'WHERE stored_filename IN :names OR file_path IN :paths', names=names, paths=paths
+        )
+        referenced = set()
+        for stored_filename, file_path in rows:
+            referenced.update({stored_filename, stored_filename_for(file_path)})
+        return referenced
+
+    def _storage_for(self, prefix):
+        return self.file_manager.storage_for(f'{prefix}/')
+
+    def _is_recent(self, prefix, key, now):
+        info = self._storage_for(prefix).info(key)
+        return info is None or (info['modified'] is not None and info['modified'] > now - self.grace)
+
+    # --- tarama ---
+    def _walk(self, prefix):
+        """Önek altındaki (ad, anahtar, boyut) üçlüleri"""
+        for key, size in self._storage_for(prefix).iter_keys(f'{prefix}/'):
+            name = key.rsplit('/', 1)[-1]
+            if prefix == 'blobs' and key != self.file_manager.blob_key(name):
+                continue  # blob düzenine uymayan dosya: sahibi belirsiz, dokunulmaz
+            yield name, key, size
+
+    def _reclaim(self, conn, prefix, orphans):
+        """Sahipsiz dosyaları sil; silmeden hemen önce referansları yeniden kontrol et"""
+        still_referenced = self._referenced(conn, prefix, [name for name, _, _ in orphans])
+        orphans = [orphan for orphan in orphans if orphan[0] not in still_referenced]
+        if prefix == 'blobs' and orphans:
+            shas = [name for name, _, _ in orphans]
+            self._query(conn, 'DELETE FROM archive_entry WHERE blob_sha256 IN :shas', shas=shas)
+            self._query(conn, 'DELETE FROM file_blob WHERE sha256 IN :shas', shas=shas)
+            conn.commit()  # dosyalar yalnızca kayıtlar kalıcı olarak silindikten sonra kaldırılır
+        reclaimed, reclaimed_bytes = 0, 0
+        for name, key, size in orphans:
+            if prefix == 'blobs':
+                self.file_manager.delete_blob(name)
+                deleted = True
+            else:
+                deleted = self.local_storage.delete(key)
+            if deleted:
+                reclaimed += 1
+                reclaimed_bytes += size
+        return reclaimed, reclaimed_bytes
+
+    def find_orphans(self, conn, report, dry_run):
+        now = datetime.now(timezone.utc)
+        for prefix in ('blobs', 'temp', *LEGACY_FOLDERS):
+            for batch in _batches(self._walk(prefix), self.batch_size):
+                report['scanned'] += len(batch)
+                referenced = self._referenced(conn, prefix, [name for name, _, _ in batch])
+                orphans = []
+                for name, key, size in batch:
+                    if name in referenced:
+                        continue
+                    if self._is_recent(prefix, key, now):
+                        report['recent'] += 1
+                        continue
+                    orphans.append((name, key, size))
+                    report['orphaned'] += 1
+                    report['orphaned_bytes'] += size
+                    if len(report['orphaned_sample']) < SAMPLE_SIZE:
+                        report['orphaned_sample'].append(key)
+                if orphans and not dry_run:
+                    reclaimed, reclaimed_bytes = self._reclaim(conn, prefix, orphans)
+                    report['reclaimed'] += reclaimed
+                    report['reclaimed_bytes'] += reclaimed_bytes
+
+    def _legacy_exists(self, folder, name):
+        try:
+            if self.local_storage.exists(f'{folder}/{name}'):
+                return True
+        except ValueError:
+            return False  # '..' gibi geçersiz ad: depoda olamaz
+        return any(os.path.isfile(os.path.join(root, name)) for root in self.legacy_fallbacks.get(folder, ()))
+
+    def _add_missing(self, report, entry):
+        report['missing'] += 1
+        if len(report['missing_sample']) < SAMPLE_SIZE:
+            report['missing_sample'].append(entry)
+
+    def find_missing(self, conn, report):
+        # Blob'lar: kolonlardaki farklı özetler sırayla (keyset) okunur
+        after = ''
+        while True:
+            shas = [row[0] for row in conn.execute(text(
+                f'SELECT DISTINCT blob_sha256 FROM ({_BLOB_REFS}) refs '
+                f'WHERE blob_sha256 > :after ORDER BY blob_sha256 LIMIT :limit'
+            ), {'after': after, 'limit': self.batch_size})]
+            if not shas:
+                break
+            for sha256 in shas:
+                if not self.file_manager.blob_exists(sha256):
+                    self._add_missing(report, self.file_manager.blob_key(sha256))
+            after = shas[-1]
+
+        # Eski kayıtlar: kendi klasörlerindeki dosya
+        for folder, table in LEGACY_FOLDERS.items():
+            after = 0
+            while True:
+                rows = conn.execute(text(
+                    f'SELECT id, file_path, stored_filename FROM {table} '
+                    f'WHERE blob_sha256 IS NULL AND file_path IS NOT NULL AND id > :after ORDER BY id LIMIT :limit'
+                ), {'after': after, 'limit': self.batch_size}).all()
+                if not rows:
+                    break
+                for row_id, file_path, stored_filename in rows:
+                    name = stored_filename or stored_filename_for(file_path)
+                    if not self._legacy_exists(folder, name):
+                        self._add_missing(report, f'{folder}/{name} ({table} #{row_id})')
+                after = rows[-1][0]
+
+    def fix_ref_counts(self, conn, report, dry_run):
+        """file_blob.ref_count'u kolonlardaki gerçek referans sayısıyla karşılaştır"""
+        rows = conn.execute(text(
+            f'SELECT b.sha256, b.ref_count, coalesce(r.n, 0) FROM file_blob b '
+            f'LEFT JOIN (SELECT blob_sha256, count(*) AS n FROM ({_BLOB_REFS}) refs GROUP BY blob_sha256) r '
+            f'ON r.blob_sha256 = b.sha256 WHERE b.ref_count != coalesce(r.n, 0)'
+        )).all()
+        report['miscounted'] = len(rows)
+        if rows and not dry_run:
+            conn.execute(text('UPDATE file_blob SET ref_count = :n WHERE sha256 = :sha'),
+                         [{'n': actual, 'sha': sha256} for sha256, _, actual in rows])
+
+    def run(self, dry_run=True):
+        """Uzlaştırmayı çalıştır ve rapor sözlüğünü döndür"""
+        report = {
+            'dry_run': dry_run, 'scanned': 0, 'recent': 0,
+            'orphaned': 0, 'orphaned_bytes': 0, 'orphaned_sample': [],
+            'missing': 0, 'missing_sample': [],
+            'miscounted': 0, 'reclaimed': 0, 'reclaimed_bytes': 0,
+        }
+        with self.engine.connect() as conn:
+            self.fix_ref_counts(conn, report, dry_run)
+            conn.commit()
+            self.find_orphans(conn, report, dry_run)
+            conn.commit()
+            self.find_missing(conn, report)
+        return report
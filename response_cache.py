@@ -0,0 +1,130 @@
+"""Sayfa yanıtı önbelleği (TTL + LRU).
+
+Ana sayfa ve katalog sayfaları her anonim ziyaretçi için aynı HTML'i üretir.
+Bu önbellek GET yanıtlarının gövdesini rota, sorgu parametreleri ve
+ziyaretçi durumuna göre saklar; isabet halinde ne veritabanına ne Jinja'ya
+gidilir. Kayıtlar süreç içidir; ``stamp_path`` verilirse ``invalidate()`` bu
+dosyanın mtime'ını da günceller ve diğer gunicorn worker'ları eski damgayla
+saklanmış kayıtları bir sonraki okumada atar.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, make_response, request, session
+
+DEFAULT_TTL = 60  # saniye
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResponseCache:
+    """İş parçacığı güvenli, süreli ve en az kullanılanı atan sözlük.
+
+    ``stamp_path`` süreçler arası paylaşılan nesil damgasıdır (dosya mtime'ı).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, clock=time.monotonic, stamp_path=None):
+        self.max_entries = max_entries
+        self._clock = clock
+        self.stamp_path = stamp_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self):
+        """Paylaşılan damga; damga dosyası yoksa 0 (yalnızca süreç içi temizlik)"""
+        if self.stamp_path is None:
+            return 0
+        try:
+            return os.stat(self.stamp_path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def get(self, key, generation=None):
+        if generation is None:
+            generation = self.generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock() or entry[1] != generation:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl, generation=None):
+        """Kaydı sakla; ``generation`` içerik okunmadan önce alınan damgadır.
+
+        Görünüm çalışırken başka bir worker temizlik yaptıysa kayıt eski damgayla
+        saklanır ve ilk okumada atılır.
+        """
+        if generation is None:
+            generation = self.generation()
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Tüm kayıtları sil ve damgayı ilerlet (içerik değiştiğinde çağrılır)"""
+        with self._lock:
+            self._entries.clear()
+        if self.stamp_path is not None:
+            os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+            with open(self.stamp_path, 'a'):
+                pass
+            now = time.time_ns()
+            os.utime(self.stamp_path, ns=(now, now))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def viewer_key():
+    """Ziyaretçi durumu: anonim için None, girişli kullanıcı için (id, admin).
+
+    Menüde kullanıcı adı gösterildiği için girişli kullanıcılar birbirinin
+    sayfasını paylaşmaz.
+    """
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    return (user_id, bool(session.get('is_admin')))
+
+
+def cached_page(cache):
+    """GET yanıtını önbellekten sun; TTL ``RESPONSE_CACHE_TTL`` ayarından okunur (0 kapatır).
+
+    Bekleyen flash mesajı varken önbellek atlanır; aksi halde mesaj
+    gösterilmez ya da başka ziyaretçilere sızar.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            ttl = current_app.config.get('RESPONSE_CACHE_TTL', DEFAULT_TTL)
+            if not ttl or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))), viewer_key())
+            generation = cache.generation()
+            cached = cache.get(key, generation)
+            if cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                cache.set(key, (response.get_data(), response.mimetype), ttl, generation)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
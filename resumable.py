@@ -0,0 +1,97 @@
+"""Parça parça, kaldığı yerden devam edebilen yüklemeler (tus 1.0 çekirdeği).
+
+İstemci önce ``POST /uploads`` ile toplam boyutu (``Upload-Length``) ve dosya
+adını (``Upload-Metadata``) bildirir, dönen adrese ``PATCH`` ile parçaları
+``Upload-Offset`` başlığıyla gönderir. Bağlantı koparsa ``HEAD`` ile sunucunun
+kaydettiği ofseti öğrenip oradan devam eder; baştan başlamaz.
+
+Ofset veritabanında tutulur, baytlar ``uploads/temp`` altındaki dosyaya
+eklenir. PATCH gövdesi form olarak ayrıştırılmadan doğrudan dosyaya akıtılır.
+Tamamlanan yükleme, form ``upload_id`` ile gönderildiğinde FileManager
+deposuna alınır.
+
+Desteklenen uzantılar: creation, expiration, termination.
+"""
+import base64
+import binascii
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: aynı yüklemeye eşzamanlı PATCH'ler yalnızca ofset kontrolüyle ayrılır
+    fcntl = None
+
+from werkzeug.exceptions import ClientDisconnected
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,expiration,termination'
+OFFSET_CONTENT_TYPE = 'application/offset+octet-stream'
+DEFAULT_EXPIRES = 24 * 3600  # saniye; bu süre dokunulmayan yarım yüklemeler silinir
+CLIENT_CHUNK_SIZE = 5 * 1024 * 1024  # tarayıcının PATCH başına gönderdiği bayt
+WRITE_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """İstemciye HTTP durum koduyla dönülecek protokol hatası"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_offset(value, header):
+    """Negatif olmayan tam sayı başlığı (Upload-Length, Upload-Offset)"""
+    if value is None or not value.isdigit():
+        raise UploadError(400, f'Geçersiz {header} başlığı')
+    return int(value)
+
+
+def parse_metadata(header):
+    """``Upload-Metadata: ad base64,ad2 base64`` başlığını sözlüğe çevir"""
+    metadata = {}
+    for pair in (header or '').split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value.strip(), validate=True).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(400, f'Geçersiz Upload-Metadata değeri: {key}')
+    return metadata
+
+
+def append_chunk(path, offset, stream, limit):
+    """``stream``'i dosyaya ``offset``'ten itibaren yaz; yazılan bayt sayısını döndür.
+
+    Önceki bir PATCH yazıp ofseti kaydedemeden koptuysa dosyadaki fazlalık
+    üzerine yazılır ve kesilir; kaynak her zaman veritabanındaki ofsettir.
+    Bağlantı koparsa o ana kadar gelen baytlar sayılır. ``limit`` aşılırsa
+    dosya ``offset``'e geri kesilip 413 verilir. Aynı yüklemeye eşzamanlı
+    ikinci PATCH 409 alır.
+    """
+    with open(path, 'r+b') as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError(409, 'Bu yüklemeye şu anda başka bir parça yazılıyor')
+        if os.fstat(f.fileno()).st_size < offset:
+            raise UploadError(409, 'Geçici dosya kayıttaki ofsetten kısa')
+        f.seek(offset)
+        written = 0
+        while True:
+            try:
+                chunk = stream.read(WRITE_SIZE)
+            except ClientDisconnected:
+                break  # bağlantı koptu: gelen kadarı kaydedilir, istemci HEAD ile devam eder
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > limit:
+                f.truncate(offset)
+                raise UploadError(413, 'Parça bildirilen dosya boyutunu aşıyor')
+            f.write(chunk)
+        f.truncate()
+        return written
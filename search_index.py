@@ -0,0 +1,245 @@
+"""Tam metin arama indeksi.
+
+Her içerik satırı için aranan alanlardan Türkçe kurallarına göre küçük harfe
+çevrilmiş ve aksanlardan arındırılmış bir ``search_key`` kolonu tutulur
+(İ/ı/I -> i, ş -> s, ğ -> g ...). Sorgular da aynı şekilde normalize edilir.
+
+SQLite'ta her içerik tablosu için ``search_key`` üzerinde bir FTS5 tablosu
+(external content) tutulur ve tetikleyicilerle insert/update/delete sırasında
+senkron kalır. PostgreSQL'de aynı kolon üzerinde ``to_tsvector`` ifade indeksi
+(GIN) kullanılır. FTS desteği olmayan motorlarda arama LIKE filtresine geri düşer.
+"""
+import logging
+import re
+import unicodedata
+
+from sqlalchemy import column, false, func, literal_column, table, text
+
+# tablo adı -> arama anahtarına giren kolonlar
+SEARCH_FIELDS = {
+    'note': ('title', 'content'),
+    'question': ('question_text',),
+    'project': ('title', 'description'),
+}
+KEY_COLUMN = 'search_key'
+
+# Unicode casefold Türkçe harfleri yanlış eşler ('İ' -> 'i̇', 'I' -> 'i' ama 'ı' kalır)
+_TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i',
+    'Ş': 's', 'ş': 's',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ü': 'u', 'ü': 'u',
+    'Ö': 'o', 'ö': 'o',
+    'Ç': 'c', 'ç': 'c',
+})
+
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+TS_CONFIG = 'simple'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_fts_available = {}
+
+
+def fts_table_name(table_name):
+    return f'{table_name}_fts'
+
+
+def normalize_search_text(value):
+    """Metni Türkçe kurallarıyla küçült, aksanları at ve boşlukları sadeleştir"""
+    if not value:
+        return ''
+    value = value.translate(_TURKISH_FOLD)
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.casefold().split())
+
+
+def build_search_key(values):
+    """Aranan alanların değerlerinden tek bir normalize anahtar üret"""
+    return normalize_search_text(' '.join(v for v in values if v))
+
+
+def refresh_search_key(mapper, connection, target):
+    """ORM before_insert/before_update olayı: modelin search_key'ini güncelle"""
+    fields = SEARCH_FIELDS[target.__tablename__]
+    setattr(target, KEY_COLUMN, build_search_key(getattr(target, f) for f in fields))
+
+
+def backfill_search_keys(conn, table_name, batch_size=1000):
+    """search_key'i boş satırları id sırasıyla parça parça doldur"""
+    fields = SEARCH_FIELDS[table_name]
+    table_sql = conn.dialect.identifier_preparer.quote(table_name)
+    select_sql = text(
+        f"SELECT id, {', '.join(fields)} FROM {table_sql} "
+        f"WHERE id > :last AND {KEY_COLUMN} IS NULL ORDER BY id LIMIT :n"
+    )
+    update_sql = text(f"UPDATE {table_sql} SET {KEY_COLUMN} = :key WHERE id = :id")
+    last_id = 0
+    while True:
+        rows = conn.execute(select_sql, {'last': last_id, 'n': batch_size}).all()
+        if not rows:
+            break
+        conn.execute(update_sql, [{'id': row[0], 'key': build_search_key(row[1:])} for row in rows])
+        last_id = rows[-1][0]
+
+
+def sqlite_has_fts5(conn):
+    """Derlenmiş SQLite FTS5 modülünü destekliyor mu?"""
+    try:
+        options = {row[0] for row in conn.exec_driver_sql('PRAGMA compile_options').all()}
+        return 'ENABLE_FTS5' in options
+    except Exception:
+        return False
+
+
+def _sqlite_statements(table_name, columns):
+    fts = fts_table_name(table_name)
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{c}' for c in columns)
+    old_values = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+        f"content='{table_name}', content_rowid='id', tokenize='{FTS_TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        # Yalnızca indekslenen kolonlar değiştiğinde yeniden indeksle (ör. beğeni güncellemeleri atlanır)
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def _tsvector_sql(columns):
+    parts = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return f"to_tsvector('{TS_CONFIG}', {parts})"
+
+
+def install(conn, rebuild=False, columns=None):
+    """Arama indekslerini oluştur. ``rebuild`` mevcut satırları da indeksler.
+
+    ``columns`` tablo -> indekslenen kolonlar eşlemesidir; varsayılan
+    ``search_key``'dir. Ham kolonlar yalnızca migration 5'in kurduğu ilk
+    indeks içindir (``SEARCH_FIELDS``).
+    """
+    columns = columns or {table_name: (KEY_COLUMN,) for table_name in SEARCH_FIELDS}
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        if not sqlite_has_fts5(conn):
+            logging.getLogger('app').warning("SQLite FTS5 not available, search falls back to LIKE")
+            return False
+        for table_name, table_columns in columns.items():
+            for statement in _sqlite_statements(table_name, table_columns):
+                conn.exec_driver_sql(statement)
+            if rebuild:
+                fts = fts_table_name(table_name)
+                conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        return True
+    if dialect == 'postgresql':
+        for table_name, table_columns in columns.items():
+            conn.exec_driver_sql(
+                f'CREATE INDEX IF NOT EXISTS ix_{table_name}_fts ON "{table_name}" '
+                f'USING GIN ({_tsvector_sql(table_columns)})'
+            )
+        return True
+    return False
+
+
+def uninstall(conn):
+    """Arama indekslerini ve SQLite senkron tetikleyicilerini kaldır"""
+    dialect = conn.dialect.name
+    for table_name in SEARCH_FIELDS:
+        fts = fts_table_name(table_name)
+        if dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {fts}')
+        elif dialect == 'postgresql':
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS ix_{table_name}_fts')
+
+
+def register_metadata_hooks(metadata):
+    """create_all/drop_all sırasında arama indekslerini de yönet"""
+    from sqlalchemy import event, inspect
+
+    @event.listens_for(metadata, 'after_create')
+    def _create_search_index(target, connection, **kw):
+        # Eski veritabanında search_key'i henüz olmayan tabloların indeksini migration'lar kurar
+        inspector = inspect(connection)
+        ready = {table_name: (KEY_COLUMN,) for table_name in SEARCH_FIELDS
+                 if KEY_COLUMN in {c['name'] for c in inspector.get_columns(table_name)}}
+        if ready:
+            install(connection, columns=ready)
+        _fts_available.clear()
+
+    @event.listens_for(metadata, 'before_drop')
+    def _drop_search_index(target, connection, **kw):
+        uninstall(connection)
+        _fts_available.clear()
+
+
+def fulltext_available(session):
+    """Aktif motorda tam metin araması kullanılabilir mi? (sonuç önbelleğe alınır)"""
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _fts_available:
+        dialect = bind.dialect.name
+        if dialect == 'sqlite':
+            names = [fts_table_name(t) for t in SEARCH_FIELDS]
+            found = session.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN "
+                     "(:a, :b, :c)"), dict(zip('abc', names))
+            ).scalar()
+            _fts_available[key] = found == len(names)
+        else:
+            _fts_available[key] = dialect == 'postgresql'
+    return _fts_available[key]
+
+
+def fts5_query(query):
+    """Normalize edilmiş girdiyi güvenli bir FTS5 sorgusuna çevir (her kelime önek araması)"""
+    tokens = _TOKEN.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def tsquery_prefix(query):
+    """Normalize edilmiş girdiyi to_tsquery sorgusuna çevir (FTS5 gibi her kelime önek araması)"""
+    tokens = _TOKEN.findall(query)
+    return ' & '.join("'{}':*".format(token.replace("'", "''")) for token in tokens)
+
+
+def apply_search(query, model, text_query, session, order=True):
+    """ORM sorgusuna arama filtresi ve alaka sıralaması ekle.
+
+    Sorgu, kayıtlardaki ``search_key`` ile aynı şekilde normalize edilir. FTS
+    varsa alakaya göre sıralanmış sorgu, yoksa tek kolonda LIKE filtreli ve en
+    yeni önce sıralanmış sorgu döner. ``order=False`` yalnızca filtreyi ekler
+    (sayım/agregasyon sorguları için). Sonuç sınırı çağıran tarafından uygulanır.
+    """
+    table_name = model.__tablename__
+    key_column = getattr(model, KEY_COLUMN)
+    normalized = normalize_search_text(text_query)
+
+    if fulltext_available(session):
+        dialect = session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            match = fts5_query(normalized)
+            if not match:
+                return query.filter(false())
+            fts = table(fts_table_name(table_name), column('rowid'), column('rank'))
+            query = (query.join(fts, fts.c.rowid == model.id)
+                     .filter(text(f'{fts.name} MATCH :{fts.name}_match').bindparams(**{f'{fts.name}_match': match})))
+            return query.order_by(fts.c.rank) if order else query
+        if dialect == 'postgresql':
+            document = func.coalesce(key_column, literal_column("''"))
+            vector = func.to_tsvector(literal_column(f"'{TS_CONFIG}'"), document)
+            prefix = tsquery_prefix(normalized)
+            if not prefix:
+                return query.filter(false())
+            ts_query = func.to_tsquery(literal_column(f"'{TS_CONFIG}'"), prefix)
+            query = query.filter(vector.op('@@')(ts_query))
+            return query.order_by(func.ts_rank(vector, ts_query).desc()) if order else query
+
+    query = query.filter(key_column.contains(normalized))
+    return query.order_by(model.created_at.desc()) if order else query
@@ -0,0 +1,406 @@
+"""Dosya depolama arka uçları: yerel disk ve S3 uyumlu nesne deposu.
+
+``FileManager`` baytları bu arayüz üzerinden yazar, okur ve siler; anahtarlar
+``blobs/ab/abcd...`` gibi '/' ile ayrılmış göreli yollardır.
+
+``LocalStorage`` anahtarları yükleme klasörü altındaki dosyalara eşler.
+``S3Storage`` AWS S3, MinIO, Cloudflare R2 gibi S3 API'si konuşan depolara
+path-style istekler gönderir. İstekler AWS Signature V4 ile ``requests``
+üzerinden imzalanır; ek bir SDK gerekmez. Büyük dosyalar multipart upload ile
+parça parça gönderilir. İndirmeler için süreli (presigned) URL üretilir,
+böylece baytlar Flask worker'larından geçmez.
+"""
+import abc
+import datetime
+import hashlib
+import hmac
+import io
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlsplit
+
+import requests
+
+DEFAULT_URL_EXPIRES = 300  # saniye
+MULTIPART_THRESHOLD = 16 * 1024 * 1024  # bu boyutun üstü parça parça gönderilir
+PART_SIZE = 8 * 1024 * 1024  # S3 en küçük parça: 5MB (son parça hariç)
+READ_BUFFER = 1024 * 1024  # ranged okuma tamponu
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+
+
+class StorageError(Exception):
+    """Depolama arka ucundan beklenmeyen yanıt"""
+
+
+class StorageBackend(abc.ABC):
+    """Depolama arka ucu arayüzü; eksik metodu olan arka uç oluşturulamaz"""
+
+    @abc.abstractmethod
+    def put_file(self, key, source_path):
+        """Yerel dosyayı anahtara taşı (kaynak dosya silinir)"""
+
+    def exists(self, key):
+        return self.info(key) is not None
+
+    @abc.abstractmethod
+    def info(self, key):
+        """{'size', 'modified'} ya da nesne yoksa None"""
+
+    @abc.abstractmethod
+    def open(self, key):
+        """Aranabilir (seekable) ikili dosya nesnesi"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Nesneyi sil; silindiyse True"""
+
+    @abc.abstractmethod
+    def iter_keys(self, prefix=''):
+        """Önekle başlayan (anahtar, boyut) çiftlerini akış halinde üret"""
+
+    def local_path(self, key):
+        """Nesnenin yerel dosya yolu; uzak depolarda None"""
+        return None
+
+    def url(self, key, download_name=None, expires=DEFAULT_URL_EXPIRES):
+        """Doğrudan indirme URL'si; yerel depoda None (uygulama kendisi gönderir)"""
+        return None
+
+    @contextmanager
+    def local_copy(self, key, temp_dir=None):
+        """Yerel yol gerektiren araçlar (pdftoppm vb.) için dosya yolu sağla"""
+        path = self.local_path(key)
+        if path is not None:
+            yield path
+            return
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out, self.open(key) as source:
+                shutil.copyfileobj(source, out, READ_BUFFER)
+            yield temp_path
+        finally:
+            os.remove(temp_path)
+
+
+def _check_key(key):
+    parts = key.split('/')
+    if not key or key.startswith('/') or '..' in parts or '' in parts:
+        raise ValueError(f'Geçersiz depolama anahtarı: {key!r}')
+    return parts
+
+
+class LocalStorage(StorageBackend):
+    """Anahtarları ``root`` altındaki dosyalara eşleyen depo"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, key):
+        return os.path.join(self.root, *_check_key(key))
+
+    def put_file(self, key, source_path):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+
+    def info(self, key):
+        try:
+            stat = os.stat(self.local_path(key))
+        except FileNotFoundError:
+            return None
+        return {
+            'size': stat.st_size,
+            'modified': datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc),
+        }
+
+    def open(self, key):
+        return open(self.local_path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_keys(self, prefix=''):
+        start = os.path.join(self.root, *prefix.rstrip('/').split('/')) if prefix.strip('/') else self.root
+        stack = [start]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        key = os.path.relpath(entry.path, self.root).replace(os.sep, '/')
+                        if key.startswith(prefix):
+                            yield key, entry.stat(follow_symlinks=False).st_size
+
+
+# --- AWS Signature V4 -------------------------------------------------------
+
+def _uri_encode(value, safe='-_.~'):
+    return quote(value, safe=safe)
+
+
+def _canonical_query(params):
+    return '&'.join(f'{_uri_encode(k)}={_uri_encode(str(v))}' for k, v in sorted(params.items()))
+
+
+def _signing_key(secret_key, date, region, service='s3'):
+    key = ('AWS4' + secret_key).encode()
+    for part in (date, region, service, 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+def _signature(method, path, params, headers, payload_hash, secret_key, region, amz_date):
+    """Kanonik isteği kurup imzala; (imza, imzalanan başlıklar) döndürür"""
+    names = sorted(name.lower() for name in headers)
+    values = {name.lower(): ' '.join(str(value).split()) for name, value in headers.items()}
+    canonical_request = '\n'.join([
+        method,
+        _uri_encode(path, safe='/-_.~'),
+        _canonical_query(params),
+        ''.join(f'{name}:{values[name]}\n' for name in names),
+        ';'.join(names),
+        payload_hash,
+    ])
+    scope = f'{amz_date[:8]}/{region}/s3/aws4_request'
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+    ])
+    signature = hmac.new(_signing_key(secret_key, amz_date[:8], region), string_to_sign.encode(),
+                         hashlib.sha256).hexdigest()
+    return signature, ';'.join(names)
+
+
+def sign_headers(method, url, headers, access_key, secret_key, region, now=None,
+                 payload_hash=UNSIGNED_PAYLOAD, params=None):
+    """İsteğe Authorization başlığı ekle (verilen tüm başlıklar imzalanır)"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    parts = urlsplit(url)
+    headers = dict(headers, Host=parts.netloc)
+    headers['x-amz-date'] = amz_date
+    headers['x-amz-content-sha256'] = payload_hash
+    signature, signed = _signature(method, parts.path or '/', params or {}, headers, payload_hash,
+                                   secret_key, region, amz_date)
+    headers['Authorization'] = (
+        f'AWS4-HMAC-SHA256 Credential={access_key}/{amz_date[:8]}/{region}/s3/aws4_request, '
+        f'SignedHeaders={signed}, Signature={signature}'
+    )
+    return headers
+
+
+def presign_url(method, url, access_key, secret_key, region, expires=DEFAULT_URL_EXPIRES,
+                now=None, params=None):
+    """Sorgu dizesiyle imzalanmış, ``expires`` saniye geçerli URL"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    parts = urlsplit(url)
+    query = dict(params or {})
+    query.update({
+        'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+        'X-Amz-Credential': f'{access_key}/{amz_date[:8]}/{region}/s3/aws4_request',
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(int(expires)),
+        'X-Amz-SignedHeaders': 'host',
+    })
+    signature, _ = _signature(method, parts.path or '/', query, {'host': parts.netloc}, UNSIGNED_PAYLOAD,
+                              secret_key, region, amz_date)
+    query['X-Amz-Signature'] = signature
+    return f'{parts.scheme}://{parts.netloc}{_uri_encode(parts.path, safe="/-_.~")}?{_canonical_query(query)}'
+
+
+def _xml_text(body, tag):
+    element = ET.fromstring(body).find(f'.//{{*}}{tag}')
+    return element.text if element is not None else None
+
+
+class _RangeReader(io.RawIOBase):
+    """Nesneyi HTTP Range istekleriyle okuyan aranabilir dosya.
+
+    zipfile gibi okuyucular yalnızca ihtiyaç duydukları bölümleri (ör. merkez
+    dizin ve tek bir üye) indirir.
+    """
+
+    def __init__(self, storage, key, size):
+        self._storage = storage
+        self._key = key
+        self._size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        if self._pos < 0:
+            raise ValueError('negative seek position')
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self._size or not len(buffer):
+            return 0
+        end = min(self._pos + len(buffer), self._size) - 1
+        response = self._storage._request('GET', self._key, headers={'Range': f'bytes={self._pos}-{end}'})
+        data = response.content
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class S3Storage(StorageBackend):
+    """S3 uyumlu nesne deposu (path-style: ``<endpoint>/<bucket>/<anahtar>``)"""
+
+    list_page_size = 1000  # ListObjectsV2 sayfa başına en fazla anahtar
+
+    def __init__(self, endpoint_url, bucket, access_key, secret_key, region='us-east-1',
+                 multipart_threshold=MULTIPART_THRESHOLD, part_size=PART_SIZE, http=None, timeout=(5, 60)):
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.http = http or requests.Session()
+        self.timeout = timeout
+
+    def _url(self, key=''):
+        return f'{self.endpoint_url}/{self.bucket}/{key}' if key else f'{self.endpoint_url}/{self.bucket}'
+
+    def _request(self, method, key='', params=None, headers=None, data=None, expected=(200, 204, 206)):
+        if key:
+            _check_key(key)
+        url = self._url(key)
+        signed = sign_headers(method, url, headers or {}, self.access_key, self.secret_key, self.region,
+                              params=params)
+        query = _canonical_query(params) if params else ''
+        full_url = _uri_encode(url, safe=':/-_.~') + (f'?{query}' if query else '')
+        response = self.http.request(method, full_url, headers=signed, data=data, timeout=self.timeout)
+        if response.status_code not in expected:
+            raise StorageError(f'{method} {key or self.bucket}: HTTP {response.status_code} {response.text[:200]}')
+        return response
+
+    def put_file(self, key, source_path):
+        _check_key(key)
+        size = os.path.getsize(source_path)
+        if size > self.multipart_threshold:
+            self._multipart_upload(key, source_path, size)
+        else:
+            with open(source_path, 'rb') as body:
+                self._request('PUT', key, headers={'Content-Length': str(size)}, data=body)
+        os.remove(source_path)
+
+    def _multipart_upload(self, key, source_path, size):
+        """Dosyayı ``part_size`` parçalarla gönder; hata olursa yüklemeyi iptal et"""
+        upload_id = _xml_text(self._request('POST', key, params={'uploads': ''}).content, 'UploadId')
+        if not upload_id:
+            raise StorageError(f'Multipart upload başlatılamadı: {key}')
+        parts = []
+        try:
+            with open(source_path, 'rb') as source:
+                number = 1
+                while True:
+                    chunk = source.read(self.part_size)
+                    if not chunk:
+                        break
+                    response = self._request('PUT', key, params={'partNumber': number, 'uploadId': upload_id},
+                                             headers={'Content-Length': str(len(chunk))}, data=chunk)
+                    parts.append((number, response.headers['ETag']))
+                    number += 1
+            body = '<CompleteMultipartUpload>' + ''.join(
+                f'<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>' for number, etag in parts
+            ) + '</CompleteMultipartUpload>'
+            response = self._request('POST', key, params={'uploadId': upload_id}, data=body.encode())
+            # S3 tamamlama hatasını 200 yanıtın gövdesinde de döndürebilir
+            if b'<Error>' in response.content:
+                raise StorageError(f'Multipart upload tamamlanamadı: {response.text[:200]}')
+        except Exception:
+            try:
+                self._request('DELETE', key, params={'uploadId': upload_id})
+            except Exception:
+                pass
+            raise
+
+    def info(self, key):
+        _check_key(key)  # boş anahtar kovanın kendisine gider
+        response = self._request('HEAD', key, expected=(200, 404))
+        if response.status_code == 404:
+            return None
+        modified = response.headers.get('Last-Modified')
+        return {
+            'size': int(response.headers.get('Content-Length', 0)),
+            'modified': parsedate_to_datetime(modified) if modified else None,
+        }
+
+    def open(self, key):
+        info = self.info(key)
+        if info is None:
+            raise FileNotFoundError(key)
+        return io.BufferedReader(_RangeReader(self, key, info['size']), buffer_size=READ_BUFFER)
+
+    def delete(self, key):
+        if not self.exists(key):
+            return False
+        self._request('DELETE', key)
+        return True
+
+    def iter_keys(self, prefix=''):
+        token = None
+        while True:
+            params = {'list-type': '2', 'prefix': prefix, 'max-keys': self.list_page_size}
+            if token:
+                params['continuation-token'] = token
+            root = ET.fromstring(self._request('GET', params=params).content)
+            for item in root.iterfind('{*}Contents'):
+                yield item.findtext('{*}Key'), int(item.findtext('{*}Size') or 0)
+            if root.findtext('{*}IsTruncated') != 'true':
+                return
+            token = root.findtext('{*}NextContinuationToken')
+
+    def url(self, key, download_name=None, expires=DEFAULT_URL_EXPIRES):
+        _check_key(key)
+        params = {}
+        if download_name:
+            ascii_name = download_name.encode('ascii', 'ignore').decode('ascii').replace('"', '') or 'download'
+            params['response-content-disposition'] = (
+                f'attachment; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(download_name, safe="")}'
+            )
+        return presign_url('GET', self._url(key), self.access_key, self.secret_key, self.region,
+                           expires=expires, params=params)
+
+
+def storage_from_config(config, upload_folder):
+    """Uygulama ayarlarından depolama arka ucunu kur"""
+    backend = (config.get('STORAGE_BACKEND') or 'local').lower()
+    if backend == 'local':
+        return LocalStorage(upload_folder)
+    if backend == 's3':
+        return S3Storage(
+            config['S3_ENDPOINT_URL'], config['S3_BUCKET'], config['S3_ACCESS_KEY'], config['S3_SECRET_KEY'],
+            region=config.get('S3_REGION') or 'us-east-1',
+        )
+    raise ValueError(f'Bilinmeyen STORAGE_BACKEND: {backend}')
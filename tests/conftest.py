@@ -1,7 +1,7 @@
 import pytest
 import tempfile
 import os
-from app import app, db
+from app import app, db, job_queue
 from werkzeug.security import generate_password_hash
 import uuid
 
@@ -10,6 +10,8 @@ def client():
     """Test client for Flask app with isolated database"""
     app.config['TESTING'] = True
     app.config['WTF_CSRF_ENABLED'] = False
+    # Testler veritabanını doğrudan değiştirir; sayfa önbelleği yalnızca kendi testlerinde açılır
+    app.config['RESPONSE_CACHE_TTL'] = 0
     
     # Use temporary database for testing
     db_fd, db_path = tempfile.mkstemp()
@@ -25,6 +27,8 @@ def client():
         with app.test_client() as client:
             yield client
             
+            # Arka plan işleri bitmeden tablolar silinmesin
+            job_queue.join()
             # Cleanup - drop all tables
             db.drop_all()
         
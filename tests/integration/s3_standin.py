@@ -0,0 +1,183 @@
+"""MinIO yerine testlerde kullanılan küçük, bellek içi S3 uyumlu sunucu.
+
+S3Storage'ın kullandığı alt kümeyi konuşur: PUT/GET(Range)/HEAD/DELETE,
+multipart upload, ListObjectsV2 ve presigned GET. İmzalar S3'ün yaptığı gibi
+AWS Signature V4 kurallarına göre bağımsız olarak doğrulanır.
+"""
+import datetime
+import hashlib
+import hmac
+import threading
+import uuid
+import xml.etree.ElementTree as ET
+from email.utils import format_datetime
+from urllib.parse import quote
+
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _encode(value, safe='-_.~'):
+    return quote(value, safe=safe)
+
+
+def _expected_signature(secret, method, path, query, headers, signed, payload_hash, amz_date, scope):
+    canonical = '\n'.join([
+        method,
+        _encode(path, safe='/-_.~'),
+        '&'.join(f'{_encode(k)}={_encode(v)}' for k, v in sorted(query)),
+        ''.join(f'{name}:{" ".join(headers.get(name, "").split())}\n' for name in signed),
+        ';'.join(signed),
+        payload_hash,
+    ])
+    to_sign = f'AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n{hashlib.sha256(canonical.encode()).hexdigest()}'
+    key = ('AWS4' + secret).encode()
+    for part in scope.split('/'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+class S3StandIn:
+    """Tek kovalı (bucket) bellek içi S3"""
+
+    def __init__(self, bucket='elohab', access_key='minio', secret_key='minio-secret', min_part_size=MIN_PART_SIZE):
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.min_part_size = min_part_size
+        self.objects = {}  # anahtar -> (bayt, değişme zamanı)
+        self.uploads = {}  # upload id -> {parça no: bayt}
+        self.requests = []  # (yöntem, anahtar, Range)
+        self._server = None
+
+    # --- sunucu ---
+    def start(self):
+        self._server = make_server('127.0.0.1', 0, self, threaded=True)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def stop(self):
+        self._server.shutdown()
+
+    def __call__(self, environ, start_response):
+        return self.handle(Request(environ))(environ, start_response)
+
+    # --- imza doğrulama ---
+    def _authorized(self, request):
+        query = [(k, v) for k, v in request.args.items(multi=True)]
+        headers = {k.lower(): v for k, v in request.headers.items()}
+        path = request.path
+        if 'X-Amz-Signature' in request.args:
+            args = request.args
+            issued = datetime.datetime.strptime(args['X-Amz-Date'], '%Y%m%dT%H%M%SZ').replace(tzinfo=datetime.timezone.utc)
+            if datetime.datetime.now(datetime.timezone.utc) > issued + datetime.timedelta(seconds=int(args['X-Amz-Expires'])):
+                return False
+            scope = args['X-Amz-Credential'].split('/', 1)[1]
+            unsigned = [(k, v) for k, v in query if k != 'X-Amz-Signature']
+            expected = _expected_signature(self.secret_key, request.method, path, unsigned, headers,
+                                           args['X-Amz-SignedHeaders'].split(';'), 'UNSIGNED-PAYLOAD',
+                                           args['X-Amz-Date'], scope)
+            return hmac.compare_digest(expected, args['X-Amz-Signature'])
+
+        auth = headers.get('authorization', '')
+        if not auth.startswith('AWS4-HMAC-SHA256 '):
+            return False
+        fields = dict(item.strip().split('=', 1) for item in auth[len('AWS4-HMAC-SHA256 '):].split(','))
+        access_key, scope = fields['Credential'].split('/', 1)
+        if access_key != self.access_key:
+            return False
+        expected = _expected_signature(self.secret_key, request.method, path, query, headers,
+                                       fields['SignedHeaders'].split(';'), headers.get('x-amz-content-sha256', ''),
+                                       headers.get('x-amz-date', ''), scope)
+        return hmac.compare_digest(expected, fields['Signature'])
+
+    # --- S3 işlemleri ---
+    @staticmethod
+    def _error(status, code):
+        return Response(f'<Error><Code>{code}</Code></Error>', status=status, mimetype='application/xml')
+
+    def handle(self, request):
+        bucket, _, key = request.path.lstrip('/').partition('/')
+        self.requests.append((request.method, key, request.headers.get('Range')))
+        if bucket != self.bucket:
+            return self._error(404, 'NoSuchBucket')
+        if not self._authorized(request):
+            return self._error(403, 'SignatureDoesNotMatch')
+        args = request.args
+
+        if not key:
+            return self._list(args)
+        if request.method == 'POST' and 'uploads' in args:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            return Response(f'<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId>'
+                            f'</InitiateMultipartUploadResult>', mimetype='application/xml')
+        if 'uploadId' in args:
+            return self._multipart(request, key, args['uploadId'])
+        if request.method == 'PUT':
+            data = request.get_data()
+            self.objects[key] = (data, datetime.datetime.now(datetime.timezone.utc))
+            return Response(headers={'ETag': f'"{hashlib.md5(data).hexdigest()}"'})
+        if key not in self.objects:
+            return self._error(404, 'NoSuchKey') if request.method != 'HEAD' else Response(status=404)
+        if request.method == 'DELETE':
+            del self.objects[key]
+            return Response(status=204)
+
+        data, modified = self.objects[key]
+        headers = {'Last-Modified': format_datetime(modified, usegmt=True), 'Accept-Ranges': 'bytes',
+                   'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+        if 'response-content-disposition' in args:
+            headers['Content-Disposition'] = args['response-content-disposition']
+        if request.method == 'HEAD':
+            headers['Content-Length'] = str(len(data))
+            return Response(status=200, headers=headers)
+        ranges = request.range
+        if ranges is not None:
+            start, stop = ranges.range_for_length(len(data))
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{len(data)}'
+            return Response(data[start:stop], status=206, headers=headers)
+        return Response(data, headers=headers)
+
+    def _multipart(self, request, key, upload_id):
+        parts = self.uploads.get(upload_id)
+        if parts is None:
+            return self._error(404, 'NoSuchUpload')
+        if request.method == 'PUT':
+            data = request.get_data()
+            parts[int(request.args['partNumber'])] = data
+            return Response(headers={'ETag': f'"{hashlib.md5(data).hexdigest()}"'})
+        if request.method == 'DELETE':
+            del self.uploads[upload_id]
+            return Response(status=204)
+        # Tamamla
+        listed = [(int(p.findtext('PartNumber')), p.findtext('ETag')) for p in ET.fromstring(request.get_data())]
+        numbers = [number for number, _ in listed]
+        if numbers != sorted(numbers) or any(n not in parts for n in numbers):
+            return self._error(400, 'InvalidPartOrder')
+        for index, (number, etag) in enumerate(listed):
+            if etag != f'"{hashlib.md5(parts[number]).hexdigest()}"':
+                return self._error(400, 'InvalidPart')
+            if index < len(listed) - 1 and len(parts[number]) < self.min_part_size:
+                return self._error(400, 'EntityTooSmall')
+        data = b''.join(parts[number] for number in numbers)
+        self.objects[key] = (data, datetime.datetime.now(datetime.timezone.utc))
+        del self.uploads[upload_id]
+        return Response('<CompleteMultipartUploadResult><Key>%s</Key></CompleteMultipartUploadResult>' % key,
+                        mimetype='application/xml')
+
+    def _list(self, args):
+        prefix = args.get('prefix', '')
+        max_keys = int(args.get('max-keys', 1000))
+        keys = sorted(k for k in self.objects if k.startswith(prefix))
+        start = keys.index(args['continuation-token']) if args.get('continuation-token') in keys else 0
+        page, rest = keys[start:start + max_keys], keys[start + max_keys:]
+        ns = 'http://s3.amazonaws.com/doc/2006-03-01/'
+        body = f'<ListBucketResult xmlns="{ns}"><IsTruncated>{"true" if rest else "false"}</IsTruncated>'
+        if rest:
+            body += f'<NextContinuationToken>{rest[0]}</NextContinuationToken>'
+        for key in page:
+            body += f'<Contents><Key>{key}</Key><Size>{len(self.objects[key][0])}</Size></Contents>'
+        return Response(body + '</ListBucketResult>', mimetype='application/xml')
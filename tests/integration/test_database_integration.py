@@ -204,3 +204,489 @@ class TestDatabaseIntegration:
         # Test file URL generation
         assert note.file_url is not None
         assert 'document' in note.file_url
+
+class TestQueryEfficiency:
+    """Test that listing routes issue a bounded number of queries"""
+    
+    @staticmethod
+    def _count_queries(client, url):
+        """Count SELECT statements executed while serving a request"""
+        from sqlalchemy import event
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append(statement)
+        
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        assert response.status_code == 200
+        return len(statements)
+    
+    @staticmethod
+    def _add_notes(db_session, count):
+        users = [User(username=f'n1user{i}', email=f'n1user{i}@example.com', password_hash='hash') for i in range(3)]
+        courses = [Course(name=f'N1 Course {i}', code=f'N1C{i}', grade=1, semester='Güz') for i in range(3)]
+        db_session.add_all(users + courses)
+        db_session.commit()
+        existing = Note.query.count()
+        for i in range(count):
+            db_session.add(Note(
+                title=f'Note {existing + i}',
+                content='content',
+                course_id=courses[i % 3].id,
+                uploaded_by=users[i % 3].id
+            ))
+        db_session.commit()
+        return courses
+    
+    def test_notes_listing_query_count_is_constant(self, client, db_session):
+        """Notes page must not issue one query per note"""
+        self._add_notes(db_session, 3)
+        small = self._count_queries(client, '/notes')
+        
+        db_session.query(Note).delete()
+        db_session.query(Course).delete()
+        db_session.query(User).delete()
+        db_session.commit()
+        self._add_notes(db_session, 30)
+        large = self._count_queries(client, '/notes')
+        
+        assert small == large
+        assert large <= 3
+    
+    def test_notes_listing_filtered_by_course(self, client, db_session):
+        """Filtered notes page also loads course and user eagerly"""
+        courses = self._add_notes(db_session, 12)
+        count = self._count_queries(client, f'/notes?course_id={courses[0].id}')
+        assert count <= 3
+
+class TestSqliteProfile:
+    """Test the opt-in SQLite production profile"""
+    
+    def test_profile_sets_pragmas_on_connect(self, tmp_path):
+        """Every new connection gets WAL and the tuning PRAGMAs"""
+        from sqlalchemy import create_engine, text
+        from db_tuning import apply_sqlite_profile
+        engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+        assert apply_sqlite_profile(engine)
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar().lower() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert conn.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+        engine.dispose()
+    
+    def test_retry_on_lock_retries_then_succeeds(self, db_session):
+        """Lock errors are retried after a rollback; other errors propagate"""
+        from sqlalchemy.exc import OperationalError
+        from db_tuning import retry_on_lock
+        calls = []
+        
+        @retry_on_lock(db_session, attempts=3, base_delay=0)
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('UPDATE', {}, Exception('database is locked'))
+            return 'ok'
+        
+        assert flaky() == 'ok'
+        assert len(calls) == 3
+        
+        @retry_on_lock(db_session, attempts=3, base_delay=0)
+        def broken():
+            raise OperationalError('UPDATE', {}, Exception('no such table: x'))
+        
+        with pytest.raises(OperationalError):
+            broken()
+
+class TestFullTextSearch:
+    """Test the full-text search index behind /search"""
+    
+    @pytest.fixture
+    def author(self, db_session):
+        user = User(username='ftsuser', email='fts@example.com', password_hash='hash')
+        course = Course(name='FTS Course', code='FTS101', grade=3, semester='Güz')
+        db_session.add_all([user, course])
+        db_session.commit()
+        return user, course
+    
+    def _search_titles(self, client, q, kind='notes'):
+        from flask import template_rendered
+        captured = []
+        
+        def record(sender, template, context, **extra):
+            captured.append(context)
+        
+        template_rendered.connect(record)
+        try:
+            response = client.get('/search', query_string={'q': q, 'type': kind})
+        finally:
+            template_rendered.disconnect(record)
+        assert response.status_code == 200
+        items = captured[0]['results'][kind]
+        return [getattr(item, 'title', None) or item.question_text for item in items]
+    
+    def test_fulltext_index_is_created_with_tables(self, db_session):
+        """create_all also creates the FTS tables on SQLite"""
+        import search_index
+        assert search_index.fulltext_available(db_session)
+    
+    def test_results_are_ranked_and_kept_in_sync(self, client, db_session, author):
+        """Insert, update and delete are reflected in search results"""
+        user, course = author
+        weak = Note(title='Genel notlar', content='biraz fourier', course_id=course.id, uploaded_by=user.id)
+        strong = Note(title='Fourier dönüşümü', content='fourier serisi ve fourier dönüşümü',
+                      course_id=course.id, uploaded_by=user.id)
+        db_session.add_all([weak, strong])
+        db_session.commit()
+        
+        assert self._search_titles(client, 'fourier') == ['Fourier dönüşümü', 'Genel notlar']
+        
+        weak.content = 'laplace'
+        db_session.commit()
+        assert self._search_titles(client, 'fourier') == ['Fourier dönüşümü']
+        assert self._search_titles(client, 'laplace') == ['Genel notlar']
+        
+        db_session.delete(strong)
+        db_session.commit()
+        assert self._search_titles(client, 'fourier') == []
+    
+    def test_search_matches_prefixes_and_diacritics(self, client, db_session, author):
+        """Prefix queries and ş/ç/ü folding work through the tokenizer"""
+        user, course = author
+        db_session.add(Project(title='Güç elektroniği projesi', description='Şarj devresi', grade=3,
+                               uploaded_by=user.id))
+        db_session.commit()
+        assert self._search_titles(client, 'elektron', 'projects') == ['Güç elektroniği projesi']
+        assert self._search_titles(client, 'sarj', 'projects') == ['Güç elektroniği projesi']
+    
+    def test_every_backend_matches_prefixes(self, client, db_session, author, monkeypatch):
+        """FTS5, the LIKE fallback and the Postgres tsquery all treat words as prefixes"""
+        import search_index
+        from types import SimpleNamespace
+        from sqlalchemy.dialects import postgresql
+        user, course = author
+        db_session.add(Note(title='Matematik notu', content='türev', course_id=course.id, uploaded_by=user.id))
+        db_session.commit()
+        assert self._search_titles(client, 'mat tür') == ['Matematik notu']
+
+        class PostgresSession:
+            def get_bind(self):
+                return SimpleNamespace(url='postgresql://search', dialect=postgresql.dialect())
+
+        query = search_index.apply_search(db_session.query(Note), Note, 'Mat Tür', PostgresSession())
+        compiled = query.statement.compile(dialect=postgresql.dialect())
+        assert 'to_tsquery' in str(compiled) and 'plainto_tsquery' not in str(compiled)
+        assert "'mat':* & 'tur':*" in compiled.params.values()
+
+        monkeypatch.setattr(search_index, 'fulltext_available', lambda session: False)
+        assert self._search_titles(client, 'mat') == ['Matematik notu']
+
+    def test_fallback_without_fulltext(self, client, db_session, author, monkeypatch):
+        """Backends without FTS fall back to LIKE filtering"""
+        import search_index
+        user, course = author
+        db_session.add(Question(question_text='Kirchhoff yasası sorusu', answer='', year=2022,
+                                course_id=course.id))
+        db_session.commit()
+        monkeypatch.setattr(search_index, 'fulltext_available', lambda session: False)
+        assert self._search_titles(client, 'Kirchhoff', 'questions') == ['Kirchhoff yasası sorusu']
+    
+    def test_turkish_case_variants_match_single_key(self, client, db_session, author):
+        """İ/ı/I and ş/ğ variants all resolve to the same normalized key"""
+        user, course = author
+        note = Note(title='IĞDIR İletişim Şebekesi', content='Işık hızı', course_id=course.id, uploaded_by=user.id)
+        db_session.add(note)
+        db_session.commit()
+        assert note.search_key == 'igdir iletisim sebekesi isik hizi'
+        for variant in ['ığdır', 'IGDIR', 'iğdir', 'İLETİŞİM', 'iletisim', 'şebeke', 'ışık']:
+            assert self._search_titles(client, variant) == ['IĞDIR İletişim Şebekesi'], variant
+
+class TestFacetedSearch:
+    """Test semester filtering, facet counts and paging on /search"""
+    
+    @pytest.fixture
+    def catalog(self, db_session):
+        user = User(username='facetuser', email='facet@example.com', password_hash='hash')
+        fall = Course(name='Devre Güz', code='FCT1', grade=1, semester='Güz')
+        spring = Course(name='Devre Bahar', code='FCT2', grade=2, semester='Bahar')
+        db_session.add_all([user, fall, spring])
+        db_session.commit()
+        db_session.add_all([
+            Note(title='Devre notu 1', content='devre', course_id=fall.id, uploaded_by=user.id),
+            Note(title='Devre notu 2', content='devre', course_id=fall.id, uploaded_by=user.id),
+            Note(title='Devre notu 3', content='devre', course_id=spring.id, uploaded_by=user.id),
+            Question(question_text='Devre sorusu', answer='', year=2023, course_id=spring.id),
+            Project(title='Devre projesi', description='devre', grade=2, uploaded_by=user.id),
+        ])
+        db_session.commit()
+    
+    def _render(self, client, **params):
+        from flask import template_rendered
+        captured = []
+        
+        def record(sender, template, context, **extra):
+            captured.append(context)
+        
+        template_rendered.connect(record)
+        try:
+            response = client.get('/search', query_string=params)
+        finally:
+            template_rendered.disconnect(record)
+        assert response.status_code == 200
+        return captured[0]
+    
+    def test_semester_filter_is_applied(self, client, catalog):
+        """Only notes and questions from the chosen semester are returned"""
+        context = self._render(client, q='devre', semester='Güz')
+        assert sorted(n.title for n in context['results']['notes']) == ['Devre notu 1', 'Devre notu 2']
+        assert context['results']['questions'] == []
+        assert context['results']['projects'] == []
+        assert context['total_results'] == 2
+    
+    def test_facet_counts_come_from_one_group_by(self, client, catalog):
+        """Facets reflect the other filters and are computed by a single aggregate"""
+        from sqlalchemy import event
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            context = self._render(client, q='devre', grade=2)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        
+        assert sum('GROUP BY' in s for s in statements) == 1
+        facets = context['facets']
+        assert facets['type'] == {'notes': 1, 'questions': 1, 'projects': 1}
+        assert facets['grade'] == {1: 2, 2: 3}
+        assert facets['semester'] == {'Bahar': 2}
+        assert context['total_results'] == 3
+    
+    def test_only_current_page_is_hydrated(self, client, catalog, monkeypatch):
+        """Results are limited to one page per type with a link to the next"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'SEARCH_PAGE_SIZE', 2)
+        first = self._render(client, q='devre', type='notes')
+        assert len(first['results']['notes']) == 2
+        assert first['has_next']
+        second = self._render(client, q='devre', type='notes', page=2)
+        assert len(second['results']['notes']) == 1
+        assert not second['has_next']
+
+class TestSiteStats:
+    """Test the materialized homepage counters"""
+
+    def test_counters_follow_inserts_and_deletes(self, db_session):
+        """Inserts and deletes adjust the single stats row in the same transaction"""
+        from app import SiteStats
+        assert SiteStats.current().to_dict() == {'users': 0, 'notes': 0, 'questions': 0, 'projects': 0}
+
+        user = User(username='statsuser', email='stats@example.com', password_hash='hash')
+        course = Course(name='Stats Course', code='STAT101', grade=1, semester='Güz')
+        db_session.add_all([user, course])
+        db_session.commit()
+        note = Note(title='Stats Note', content='c', course_id=course.id, uploaded_by=user.id)
+        db_session.add_all([
+            note,
+            Question(question_text='Q', answer='', year=2023, course_id=course.id),
+            Project(title='P', description='d', grade=1, uploaded_by=user.id),
+        ])
+        db_session.commit()
+        db_session.delete(note)
+        db_session.commit()
+
+        db_session.expire_all()
+        assert SiteStats.current().to_dict() == {'users': 1, 'notes': 0, 'questions': 1, 'projects': 1}
+
+    def test_homepage_does_not_count_tables(self, client):
+        """The homepage reads the stats row instead of running COUNT(*)"""
+        from sqlalchemy import event
+        client.get('/')  # sayaç satırını oluştur
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.lower())
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = client.get('/')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert response.status_code == 200
+        assert not [s for s in statements if 'count(' in s]
+        assert [s for s in statements if 'from site_stats' in s]
+
+    def test_concurrent_first_reads_share_one_row(self, db_session):
+        """A request that missed the row while another created it does not fail on insert"""
+        from sqlalchemy import event
+        from app import SiteStats
+        seeded = []
+
+        def other_request_seeds(conn, cursor, statement, parameters, context, executemany):
+            if 'insert into site_stats' in statement.lower() and not seeded:
+                seeded.append(True)
+                with db.engine.begin() as other:
+                    other.execute(SiteStats.__table__.insert().values(id=SiteStats.ROW_ID, users=7, notes=0,
+                                                                      questions=0, projects=0))
+
+        event.listen(db.engine, 'before_cursor_execute', other_request_seeds)
+        try:
+            stats = SiteStats.current()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', other_request_seeds)
+        assert seeded and stats.users == 7
+
+    def test_recount_repairs_drift(self, db_session):
+        """Bulk deletes bypass ORM events; recount rebuilds the counters"""
+        from app import SiteStats
+        db_session.add(User(username='drift', email='drift@example.com', password_hash='hash'))
+        db_session.commit()
+        SiteStats.current()
+        User.query.delete()
+        db_session.commit()
+        assert SiteStats.recount().users == 0
+
+class TestReviewLikes:
+    """Test atomic and write-behind like counters"""
+
+    @pytest.fixture
+    def review(self, db_session):
+        from app import CourseReview
+        review = CourseReview(course_name='Likes', course_type='Zorunlu Ders', grade=1, rating=5,
+                              review_text='text', difficulty_level='Kolay', author_name='Tester')
+        db_session.add(review)
+        db_session.commit()
+        return review
+
+    @staticmethod
+    def _like(client, review_id, liked=True):
+        return client.post('/course_forum/update_like', json={'review_id': review_id, 'liked': liked})
+
+    def test_like_is_a_single_atomic_update(self, client, review):
+        """The counter is incremented in SQL, not read-modify-written in Python"""
+        from sqlalchemy import event
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self._like(client, review.id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.get_json() == {'success': True, 'likes': 1}
+        updates = [s for s in statements if s.lstrip().upper().startswith('UPDATE')]
+        assert len(updates) == 1 and 'likes' in updates[0] and '+' in updates[0]
+
+    def test_stale_session_does_not_lose_updates(self, client, db_session, review):
+        """A concurrent increment committed elsewhere is not overwritten"""
+        from app import CourseReview
+        db_session.execute(CourseReview.__table__.update().values(likes=10))
+        db_session.commit()
+        assert self._like(client, review.id).get_json()['likes'] == 11
+        assert self._like(client, review.id, liked=False).get_json()['likes'] == 10
+
+    def test_unlike_never_goes_below_zero(self, client, review):
+        assert self._like(client, review.id, liked=False).get_json()['likes'] == 0
+
+    def test_unknown_review_returns_404(self, client):
+        assert self._like(client, 999).status_code == 404
+
+    def test_write_behind_buffer_coalesces_bursts(self, client, db_session, review, monkeypatch):
+        """Buffered likes are visible immediately and written in one batch"""
+        import app as app_module
+        from app import CourseReview
+        from write_behind import CounterBuffer
+        buffer = CounterBuffer(app_module.flush_review_likes, interval=3600)
+        monkeypatch.setattr(app_module, 'like_buffer', buffer)
+
+        for _ in range(3):
+            self._like(client, review.id)
+        response = self._like(client, review.id, liked=False)
+        assert response.get_json()['likes'] == 2
+
+        db_session.expire_all()
+        assert db_session.get(CourseReview, review.id).likes == 0
+        assert buffer.flush() == 1
+        db_session.expire_all()
+        assert db_session.get(CourseReview, review.id).likes == 2
+
+    def test_write_behind_clamps_the_net_delta(self, client, db_session, review, monkeypatch):
+        """Unlike-then-like at zero: immediate writes clamp each step, the buffer clamps the sum"""
+        import app as app_module
+        from app import CourseReview
+        from write_behind import CounterBuffer
+        self._like(client, review.id, liked=False)
+        self._like(client, review.id)
+        db_session.expire_all()
+        assert db_session.get(CourseReview, review.id).likes == 1
+
+        db_session.execute(CourseReview.__table__.update().values(likes=0))
+        db_session.commit()
+        buffer = CounterBuffer(app_module.flush_review_likes, interval=3600)
+        monkeypatch.setattr(app_module, 'like_buffer', buffer)
+        self._like(client, review.id, liked=False)
+        self._like(client, review.id)
+        buffer.flush()
+        db_session.expire_all()
+        assert db_session.get(CourseReview, review.id).likes == 0
+
+class TestReviewComments:
+    """Test persisted, paginated comment threads on course reviews"""
+
+    @pytest.fixture
+    def review(self, db_session):
+        from app import CourseReview
+        review = CourseReview(course_name='Thread', course_type='Zorunlu Ders', grade=1, rating=4,
+                              review_text='text', difficulty_level='Orta', author_name='Tester')
+        db_session.add(review)
+        db_session.commit()
+        return review
+
+    @staticmethod
+    def _comment(client, review_id, text, author='Okur'):
+        return client.post('/course_forum/add_comment',
+                           json={'review_id': review_id, 'comment_text': text, 'author_name': author})
+
+    def test_comment_is_stored_and_counted(self, client, db_session, review):
+        from app import CourseReview, ReviewComment
+        data = self._comment(client, review.id, 'İlk yorum').get_json()
+        assert data['success'] and data['comment_count'] == 1
+        assert data['comment']['text'] == 'İlk yorum'
+        assert self._comment(client, review.id, 'İkinci').get_json()['comment_count'] == 2
+
+        db_session.expire_all()
+        assert db_session.get(CourseReview, review.id).comments_count == 2
+        assert ReviewComment.query.filter_by(review_id=review.id).count() == 2
+
+    def test_comment_on_unknown_review_is_not_stored(self, client, db_session):
+        from app import ReviewComment
+        assert self._comment(client, 999, 'Boşluğa').status_code == 404
+        assert ReviewComment.query.count() == 0
+
+    def test_thread_pages_oldest_first(self, client, review):
+        for i in range(5):
+            self._comment(client, review.id, f'Yorum {i}')
+        texts = []
+        url = f'/course_forum/{review.id}/comments?limit=2'
+        while url:
+            data = client.get(url).get_json()
+            texts.extend(item['text'] for item in data['items'])
+            url = (f"/course_forum/{review.id}/comments?limit=2&cursor={data['next_cursor']}"
+                   if data['has_more'] else None)
+        assert texts == [f'Yorum {i}' for i in range(5)]
+
+    def test_thread_endpoint_unknown_review(self, client):
+        assert client.get('/course_forum/999/comments').status_code == 404
+
+    def test_forum_page_does_not_embed_comments(self, client, review):
+        self._comment(client, review.id, 'Gömülmeyen yorum')
+        response = client.get('/course_forum')
+        assert 'Gömülmeyen yorum'.encode() not in response.data
+        assert f'/course_forum/{review.id}/comments'.encode() in response.data
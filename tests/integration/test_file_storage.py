@@ -0,0 +1,1127 @@
+import io
+import os
+import json
+import threading
+import hashlib
+import pytest
+import app as app_module
+from app import db, User, Course, Note, Project, FileBlob, BackgroundJob, ArchiveEntry
+from file_manager import FileManager
+from storage import StorageError
+from werkzeug.datastructures import FileStorage
+
+PDF_BYTES = b'%PDF-1.4\n' + b'lecture notes ' * 1000 + b'\n%%EOF\n'
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """FileManager writing into a temporary upload folder"""
+    manager = FileManager(app_module.app, upload_folder=str(tmp_path / 'uploads'))
+    monkeypatch.setattr(app_module, 'file_manager', manager)
+    return manager
+
+@pytest.fixture
+def uploader(client, storage):
+    """Logged-in client with a course to attach notes to"""
+    user = User(username='uploader', email='uploader@example.com', password_hash='hash')
+    course = Course(name='Storage Course', code='STO101', grade=1, semester='Güz')
+    db.session.add_all([user, course])
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user.id
+        sess['username'] = user.username
+    return {'client': client, 'user': user, 'course': course}
+
+def upload_note(uploader, data=PDF_BYTES, filename='ders.pdf', title='Not'):
+    return uploader['client'].post('/notes/add', data={
+        'title': title, 'content': 'içerik', 'course_id': str(uploader['course'].id),
+        'file': (io.BytesIO(data), filename),
+    }, content_type='multipart/form-data')
+
+class TestContentAddressedStorage:
+    """Uploads are hashed while streaming and stored once per content"""
+
+    def test_stream_to_temp_hashes_in_chunks(self, storage, monkeypatch):
+        import file_manager
+        monkeypatch.setattr(file_manager, 'CHUNK_SIZE', 1000)
+        temp_path, sha256, size = storage.stream_to_temp(io.BytesIO(PDF_BYTES), max_size=10 ** 6)
+        assert sha256 == hashlib.sha256(PDF_BYTES).hexdigest()
+        assert size == len(PDF_BYTES) == os.path.getsize(temp_path)
+
+    def test_oversized_stream_leaves_no_temp_file(self, storage):
+        assert storage.stream_to_temp(io.BytesIO(PDF_BYTES), max_size=100) is None
+        assert os.listdir(storage.temp_folder) == []
+
+    def test_identical_uploads_share_one_blob(self, uploader, storage):
+        upload_note(uploader, title='Birinci')
+        upload_note(uploader, filename='kopya.pdf', title='İkinci')
+
+        sha256 = hashlib.sha256(PDF_BYTES).hexdigest()
+        notes = Note.query.order_by(Note.id).all()
+        assert [n.blob_sha256 for n in notes] == [sha256, sha256]
+        # Her kayıt kendi indirme adını korur
+        assert notes[0].file_path != notes[1].file_path
+        assert db.session.get(FileBlob, sha256).ref_count == 2
+        assert os.listdir(os.path.dirname(storage.blob_path(sha256))) == [sha256]
+
+    def test_blob_removed_with_last_reference(self, uploader, storage):
+        upload_note(uploader, title='Birinci')
+        upload_note(uploader, title='İkinci')
+        sha256 = hashlib.sha256(PDF_BYTES).hexdigest()
+        first, second = Note.query.order_by(Note.id).all()
+        client = uploader['client']
+
+        client.post(f'/notes/delete/{first.id}')
+        assert os.path.exists(storage.blob_path(sha256))
+        assert db.session.get(FileBlob, sha256).ref_count == 1
+
+        client.post(f'/notes/delete/{second.id}')
+        assert not os.path.exists(storage.blob_path(sha256))
+        assert db.session.get(FileBlob, sha256) is None
+
+    def test_replacing_a_file_moves_the_reference(self, db_session, storage):
+        user = User(username='owner', email='owner@example.com', password_hash='hash')
+        db_session.add(user)
+        db_session.commit()
+        old_path, _ = storage.store_blob(storage.stream_to_temp(io.BytesIO(b'old'), 100)[0], 'a' * 64)
+        project = Project(title='P', description='d', grade=1, uploaded_by=user.id, blob_sha256='a' * 64)
+        db_session.add(project)
+        db_session.commit()
+
+        storage.store_blob(storage.stream_to_temp(io.BytesIO(b'new'), 100)[0], 'b' * 64)
+        project.blob_sha256 = 'b' * 64
+        db_session.commit()
+        assert db_session.get(FileBlob, 'b' * 64).ref_count == 1
+        assert db_session.get(FileBlob, 'a' * 64) is None
+        assert not os.path.exists(old_path)
+
+    def test_upload_deduplicated_against_a_purged_blob_fails(self, uploader, storage):
+        """Cleanup that wins the race against a deduplicating upload is detected, not silently lost"""
+        upload_note(uploader, title='Birinci')
+        app_module.job_queue.join(timeout=10)
+        sha256 = hashlib.sha256(PDF_BYTES).hexdigest()
+        first = Note.query.one()
+        file_info, _ = storage.save_file(FileStorage(io.BytesIO(PDF_BYTES), 'ders.pdf'), 'notes', first.uploaded_by)
+        assert file_info['deduplicated']
+
+        # Son referans kalkar ve temizlik, yükleme kaydını yazmadan önce çalışır
+        db.session.delete(first)
+        db.session.commit()
+        assert not os.path.exists(storage.blob_path(sha256))
+
+        note = Note(title='İkinci', content='c', course_id=first.course_id, uploaded_by=first.uploaded_by,
+                    file_path=file_info['file_path'], file_size=file_info['file_size'], blob_sha256=sha256)
+        db.session.add(note)
+        with pytest.raises(StorageError):
+            db.session.commit()
+        db.session.rollback()
+        assert db.session.get(FileBlob, sha256) is None
+
+    def test_download_serves_blob_under_original_name(self, uploader):
+        upload_note(uploader, filename='Türev Notları.pdf')
+        note = Note.query.one()
+        response = uploader['client'].get(f'/download/notes/{note.file_url}')
+        assert response.status_code == 200
+        assert response.data == PDF_BYTES
+        assert note.file_name in response.headers['Content-Disposition']
+        response.close()
+
+    def test_download_matches_the_exact_stored_name(self, uploader):
+        """A name that is a suffix of another file's name must not pick that file"""
+        upload_note(uploader, filename='ders.pdf', title='Birinci')
+        note = Note.query.one()
+        stored = os.path.basename(note.file_path)
+        assert note.stored_filename == stored
+        other = Note(title='Eski', content='c', course_id=note.course_id, uploaded_by=note.uploaded_by,
+                     file_path=f'uploads/notes/x{stored}', file_name='eski.pdf')
+        db.session.add(other)
+        db.session.commit()
+        assert other.stored_filename == f'x{stored}'
+
+        response = uploader['client'].get(f'/download/notes/{stored}')
+        assert response.status_code == 200
+        assert 'ders.pdf' in response.headers['Content-Disposition']
+        response.close()
+
+    def test_editing_a_duplicate_legacy_row_keeps_its_name_empty(self, uploader, storage):
+        first, _ = legacy_note(uploader, storage)
+        # Migration 10 yinelenen adlarda stored_filename'i boş bırakır
+        second = Note(title='Kopya', content='c', course_id=first.course_id, uploaded_by=first.uploaded_by)
+        db.session.add(second)
+        db.session.commit()
+        db.session.execute(db.text('UPDATE note SET file_path = :p WHERE id = :id'),
+                           {'p': first.file_path, 'id': second.id})
+        db.session.commit()
+
+        response = uploader['client'].post(f'/notes/edit/{second.id}', data={
+            'title': 'Yeni başlık', 'content': 'c', 'course_id': str(first.course_id),
+        }, content_type='multipart/form-data')
+        assert response.status_code == 302
+        db.session.expire_all()
+        assert second.title == 'Yeni başlık'
+        assert second.stored_filename is None
+        assert first.stored_filename == 'eski.pdf'
+
+class TestUploadSniffing:
+    """Uploads are checked against their magic bytes before touching disk"""
+
+    @pytest.mark.parametrize('filename,data', [
+        ('notlar.pdf', b'<html><script>alert(1)</script></html>'),
+        ('resim.png', b'%PDF-1.4 not an image'),
+        ('ders.pdf', b'MZ\x90\x00' + b'\x00' * 64),
+    ])
+    def test_mismatched_upload_is_rejected_without_writing(self, uploader, storage, monkeypatch, filename, data):
+        def no_write(*args, **kwargs):
+            raise AssertionError('rejected upload reached the disk')
+        monkeypatch.setattr(storage, 'stream_to_temp', no_write)
+
+        upload_note(uploader, data=data, filename=filename)
+
+        assert Note.query.count() == 0
+        assert os.listdir(storage.temp_folder) == []
+        assert os.listdir(storage.blobs_folder) == []
+
+    def test_only_first_chunk_is_read_before_rejecting(self, storage):
+        class CountingStream(io.BytesIO):
+            reads = 0
+
+            def read(self, size=-1):
+                self.reads += 1
+                return super().read(size)
+
+        stream = CountingStream(b'\x7fELF' + b'\x00' * (3 * 1024 * 1024))
+        info, message = storage.save_file(FileStorage(stream, filename='kod.py'), 'projects', user_id=1)
+        assert info is None and 'uyuşmuyor' in message
+        assert stream.reads == 1
+
+    @pytest.mark.parametrize('filename,data', [
+        ('main.py', 'print("merhaba dünya")\n'.encode()),
+        ('devre.ino', b'void setup() {}\n'),
+        ('arsiv.zip', b'PK\x03\x04' + b'\x00' * 40),
+    ])
+    def test_matching_project_files_are_accepted(self, storage, filename, data):
+        from werkzeug.datastructures import FileStorage
+        info, message = storage.save_file(FileStorage(io.BytesIO(data), filename=filename), 'projects', user_id=1)
+        assert info is not None, message
+        assert info['file_size'] == len(data)
+
+class TestDownloadValidators:
+    """Downloads carry strong validators and honour Range requests"""
+
+    @pytest.fixture
+    def download(self, uploader):
+        upload_note(uploader, filename='ders.pdf')
+        note = Note.query.one()
+        client = uploader['client']
+
+        def get(**headers):
+            response = client.get(f'/download/notes/{note.file_url}', headers=headers)
+            body = response.get_data()
+            response.close()
+            return response, body
+        return get
+
+    def test_strong_etag_is_the_content_hash(self, download):
+        response, body = download()
+        assert response.status_code == 200
+        assert response.headers['ETag'] == f'"{hashlib.sha256(PDF_BYTES).hexdigest()}"'
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert 'no-store' not in response.headers['Cache-Control']
+
+    def test_conditional_requests_return_304(self, download):
+        first, _ = download()
+        response, body = download(**{'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 304 and body == b''
+        response, _ = download(**{'If-Modified-Since': first.headers['Last-Modified']})
+        assert response.status_code == 304
+
+    def test_single_range_resumes_download(self, download):
+        response, body = download(Range='bytes=100-')
+        assert response.status_code == 206
+        assert body == PDF_BYTES[100:]
+        assert response.headers['Content-Range'] == f'bytes 100-{len(PDF_BYTES) - 1}/{len(PDF_BYTES)}'
+
+    def test_stale_if_range_sends_whole_file(self, download):
+        response, body = download(Range='bytes=100-', **{'If-Range': '"outdated"'})
+        assert response.status_code == 200 and body == PDF_BYTES
+
+    def test_multiple_ranges_use_multipart_byteranges(self, download):
+        response, body = download(Range='bytes=0-9,-10')
+        assert response.status_code == 206
+        content_type = response.headers['Content-Type']
+        assert content_type.startswith('multipart/byteranges; boundary=')
+        boundary = content_type.split('boundary=')[1].encode()
+        assert int(response.headers['Content-Length']) == len(body)
+
+        parts = [p for p in body.split(b'--' + boundary) if p.strip(b'\r\n-')]
+        assert len(parts) == 2
+        size = len(PDF_BYTES)
+        expected = [(b'bytes 0-9/%d' % size, PDF_BYTES[:10]),
+                    (b'bytes %d-%d/%d' % (size - 10, size - 1, size), PDF_BYTES[-10:])]
+        for part, (content_range, data) in zip(parts, expected):
+            headers, payload = part.split(b'\r\n\r\n', 1)
+            assert b'Content-Range: ' + content_range in headers
+            assert payload.rstrip(b'\r\n') == data.rstrip(b'\r\n')
+
+    def test_unsatisfiable_ranges_return_416(self, download):
+        size = len(PDF_BYTES)
+        for header in (f'bytes={size + 10}-{size + 20}', f'bytes={size + 10}-{size + 20},{size + 30}-{size + 40}'):
+            response, _ = download(Range=header)
+            assert response.status_code == 416
+            assert response.headers['Content-Range'] == f'bytes */{size}'
+
+class TestDownloadOffload:
+    """With DOWNLOAD_OFFLOAD the proxy, not gunicorn, sends the bytes"""
+
+    NGINX_CONF = os.path.join(os.path.dirname(__file__), '..', '..', 'deploy', 'nginx', 'elohab.conf')
+
+    @pytest.fixture
+    def offload(self, monkeypatch):
+        def enable(mode):
+            monkeypatch.setitem(app_module.app.config, 'DOWNLOAD_OFFLOAD', mode)
+        return enable
+
+    def test_x_accel_redirect_points_into_internal_location(self, uploader, storage, offload):
+        offload('x-accel')
+        upload_note(uploader, filename='Türev.pdf')
+        note = Note.query.one()
+
+        response = uploader['client'].get(f'/download/notes/{note.file_url}')
+        assert response.status_code == 200
+        assert response.data == b''
+        sha256 = note.blob_sha256
+        assert response.headers['X-Accel-Redirect'] == f'/_protected/blobs/{sha256[:2]}/{sha256}'
+        assert response.headers['Content-Disposition'] == f'attachment; filename={note.file_name}'
+        assert response.headers['Content-Type'] == 'application/pdf'
+
+    def test_x_sendfile_uses_absolute_path(self, uploader, storage, offload):
+        offload('x-sendfile')
+        upload_note(uploader)
+        note = Note.query.one()
+        response = uploader['client'].get(f'/download/notes/{note.file_url}')
+        assert response.headers['X-Sendfile'] == os.path.realpath(storage.blob_path(note.blob_sha256))
+
+    def test_auth_check_runs_before_offload(self, uploader, offload):
+        offload('x-accel')
+        upload_note(uploader)
+        note = Note.query.one()
+        client = uploader['client']
+        with client.session_transaction() as sess:
+            sess.clear()
+        response = client.get(f'/download/notes/{note.file_url}')
+        assert response.status_code == 302
+        assert 'X-Accel-Redirect' not in response.headers
+
+    def test_nginx_config_serves_offloaded_prefix_internally(self):
+        with open(self.NGINX_CONF, encoding='utf-8') as f:
+            conf = f.read()
+        prefix = app_module.app.config['DOWNLOAD_ACCEL_PREFIX']
+        block = conf.split(f'location {prefix} {{', 1)[1].split('}', 1)[0]
+        assert 'internal;' in block
+        assert 'alias APP_ROOT/uploads/;' in block
+
+    @pytest.mark.skipif(not __import__('shutil').which('nginx'), reason='nginx not installed')
+    def test_nginx_config_is_valid(self, tmp_path):
+        import subprocess
+        root = os.path.realpath(os.path.join(os.path.dirname(self.NGINX_CONF), '..', '..'))
+        with open(self.NGINX_CONF, encoding='utf-8') as f:
+            conf = f.read().replace('APP_ROOT', root)
+        conf_path = tmp_path / 'nginx.conf'
+        conf_path.write_text(conf, encoding='utf-8')
+        result = subprocess.run(['nginx', '-t', '-p', str(tmp_path), '-c', str(conf_path)],
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+    @pytest.fixture
+    def nginx_proxy(self, tmp_path, storage, offload):
+        """Shipped nginx config in front of the app (werkzeug thread); returns the proxy port"""
+        import socket
+        import subprocess
+        import time
+        from werkzeug.serving import make_server
+        offload('x-accel')
+        server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            proxy_port = probe.getsockname()[1]
+        root = os.path.realpath(os.path.join(os.path.dirname(self.NGINX_CONF), '..', '..'))
+        with open(self.NGINX_CONF, encoding='utf-8') as f:
+            conf = (f.read()
+                    .replace('APP_ROOT/uploads/', os.path.join(storage.upload_folder, ''))
+                    .replace('APP_ROOT', root)
+                    .replace('/tmp/elohab-nginx', str(tmp_path / 'nginx'))
+                    .replace('server 127.0.0.1:8000;', f'server 127.0.0.1:{server.server_port};')
+                    .replace('listen 8080;', f'listen 127.0.0.1:{proxy_port};'))
+        conf_path = tmp_path / 'nginx.conf'
+        conf_path.write_text(conf, encoding='utf-8')
+        (tmp_path / 'logs').mkdir()
+        # tmp_path yalnızca sahibine açık; worker'lar da aynı kullanıcıyla okur
+        nginx = subprocess.Popen(['nginx', '-p', str(tmp_path), '-c', str(conf_path), '-g', 'daemon off; user root;'],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            for _ in range(50):
+                try:
+                    socket.create_connection(('127.0.0.1', proxy_port), timeout=0.1).close()
+                    break
+                except OSError:
+                    assert nginx.poll() is None, nginx.stderr.read().decode()
+                    time.sleep(0.1)
+            yield proxy_port
+        finally:
+            nginx.terminate()
+            nginx.wait(timeout=10)
+            server.shutdown()
+
+    @pytest.mark.skipif(not __import__('shutil').which('nginx'), reason='nginx not installed')
+    def test_nginx_serves_the_offloaded_download(self, uploader, nginx_proxy):
+        import http.client
+        upload_note(uploader)
+        app_module.job_queue.join(timeout=10)
+        note = Note.query.one()
+        app = app_module.app
+        cookie = app.session_interface.get_signing_serializer(app).dumps({'user_id': uploader['user'].id})
+        session_cookie = f"{app.config['SESSION_COOKIE_NAME']}={cookie}"
+
+        def get(path, **headers):
+            conn = http.client.HTTPConnection('127.0.0.1', nginx_proxy, timeout=10)
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                return response, response.read()
+            finally:
+                conn.close()
+
+        path = f'/download/notes/{note.file_url}'
+        response, body = get(path, Cookie=session_cookie)
+        assert response.status == 200 and body == PDF_BYTES
+        assert response.getheader('X-Accel-Redirect') is None
+        assert response.getheader('Content-Disposition') == f'attachment; filename={note.file_name}'
+        response, body = get(path, Cookie=session_cookie, Range='bytes=0-7')
+        assert response.status == 206 and body == PDF_BYTES[:8]
+        # Yetkisiz istek ve iç konuma doğrudan erişim dosyayı vermez
+        response, body = get(path)
+        assert response.status == 302 and body != PDF_BYTES
+        sha256 = note.blob_sha256
+        response, _ = get(f'/_protected/blobs/{sha256[:2]}/{sha256}')
+        assert response.status == 404
+
+class TestPreviews:
+    """Previews are rendered once per content and cached by the browser"""
+
+    @pytest.fixture
+    def png_bytes(self):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 800), 'blue').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_upload_generates_thumbnail_in_background(self, uploader, storage, png_bytes):
+        upload_note(uploader, data=png_bytes, filename='tahta.png')
+        assert app_module.job_queue.join(timeout=10) == 0
+        note = Note.query.one()
+        assert os.path.exists(storage.previews.path_for(note.blob_sha256, 320))
+        job = BackgroundJob.query.one()
+        assert (job.kind, job.status) == ('preview', 'done')
+
+    def test_duplicate_upload_does_not_render_again(self, uploader, png_bytes):
+        upload_note(uploader, data=png_bytes, filename='tahta.png')
+        app_module.job_queue.join(timeout=10)
+        upload_note(uploader, data=png_bytes, filename='kopya.png')
+        assert BackgroundJob.query.count() == 1
+
+    def test_preview_is_served_with_long_lived_headers(self, uploader, png_bytes):
+        upload_note(uploader, data=png_bytes, filename='tahta.png')
+        note = Note.query.one()
+        client = uploader['client']
+
+        response = client.get(f'/preview/notes/{note.file_url}?size=large')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/jpeg'
+        assert response.headers['Cache-Control'] == 'private, max-age=31536000, immutable'
+        from PIL import Image
+        with Image.open(io.BytesIO(response.data)) as image:
+            assert image.size == (1024, 512)
+
+        again = client.get(f'/preview/notes/{note.file_url}?size=large',
+                           headers={'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304
+
+    def test_previews_removed_with_blob(self, uploader, storage, png_bytes):
+        upload_note(uploader, data=png_bytes, filename='tahta.png')
+        note = Note.query.one()
+        uploader['client'].get(f'/preview/notes/{note.file_url}?size=large')
+        sha256 = note.blob_sha256
+
+        uploader['client'].post(f'/notes/delete/{note.id}')
+        assert not os.path.exists(storage.previews.path_for(sha256, 320))
+        assert not os.path.exists(storage.previews.path_for(sha256, 1024))
+
+    def test_unpreviewable_files_return_404(self, uploader):
+        upload_note(uploader, data=b'PK\x03\x04' + b'\x00' * 40, filename='odev.docx')
+        note = Note.query.one()
+        response = uploader['client'].get(f'/preview/notes/{note.file_url}')
+        assert response.status_code == 404
+        assert not response.get_json()['success']
+
+    def test_unknown_size_is_rejected(self, uploader, png_bytes):
+        upload_note(uploader, data=png_bytes, filename='tahta.png')
+        note = Note.query.one()
+        assert uploader['client'].get(f'/preview/notes/{note.file_url}?size=huge').status_code == 400
+
+def make_zip(names=('main.py', 'README.md')):
+    import zipfile
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(name, f'# {name}\n' * 10)
+    return buffer.getvalue()
+
+def upload_project(uploader, data, filename='proje.zip', title='Proje'):
+    return uploader['client'].post('/projects/add', data={
+        'title': title, 'description': 'açıklama', 'grade': '2',
+        'file': (io.BytesIO(data), filename),
+    }, content_type='multipart/form-data')
+
+class TestBackgroundJobs:
+    """Post-upload work runs in the job pool and is polled by the UI"""
+
+    def test_archive_listing_runs_after_the_request(self, uploader, monkeypatch):
+        release = threading.Event()
+        original = app_module.file_manager.list_archive_entries
+        monkeypatch.setattr(app_module.file_manager, 'list_archive_entries',
+                            lambda *args: release.wait(5) and original(*args))
+        response = upload_project(uploader, make_zip())
+        assert response.status_code == 302
+        project = Project.query.one()
+        assert project.archive_info is None
+        job = BackgroundJob.query.filter_by(kind='archive_info').one()
+        assert (job.target_type, job.target_id) == ('project', project.id)
+        assert job.status in BackgroundJob.PENDING
+
+        page = uploader['client'].get('/projects')
+        assert f'/jobs/{job.id}'.encode() in page.data
+
+        release.set()
+        assert app_module.job_queue.join(timeout=10) == 0
+        db.session.expire_all()
+        archive = json.loads(project.archive_info)
+        assert archive['files'] == ['main.py', 'README.md']
+        data = uploader['client'].get(f'/jobs/{job.id}').get_json()
+        assert data['job']['status'] == 'done'
+        assert data['job']['result'] == {'file_count': 2, 'total_size': archive['total_size']}
+        assert 'main.py' in uploader['client'].get('/projects').get_data(as_text=True)
+
+    def test_unreadable_archive_marks_job_failed(self, uploader):
+        upload_project(uploader, b'PK\x03\x04' + b'\x00' * 40)
+        app_module.job_queue.join(timeout=10)
+        job = BackgroundJob.query.filter_by(kind='archive_info').one()
+        assert job.status == 'failed' and job.error
+        assert Project.query.one().archive_info is None
+
+    def test_job_status_is_private_to_the_uploader(self, uploader):
+        upload_project(uploader, make_zip())
+        app_module.job_queue.join(timeout=10)
+        job = BackgroundJob.query.filter_by(kind='archive_info').one()
+        other = User(username='other', email='other@example.com', password_hash='hash')
+        db.session.add(other)
+        db.session.commit()
+        client = uploader['client']
+        with client.session_transaction() as sess:
+            sess['user_id'] = other.id
+        assert client.get(f'/jobs/{job.id}').status_code == 404
+        with client.session_transaction() as sess:
+            sess.clear()
+        assert client.get(f'/jobs/{job.id}').status_code == 401
+
+    def test_pending_jobs_are_resumed_once(self, uploader, monkeypatch):
+        from datetime import datetime, timedelta
+        project = Project(title='P', description='d', grade=1, uploaded_by=uploader['user'].id)
+        db.session.add(project)
+        db.session.commit()
+        payload = '{"project_id": 0, "sha256": "", "ext": "zip"}'
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        queued = BackgroundJob(kind='archive_info', payload=payload)
+        # Sahibi ölmüş: nabız kesilmiş
+        dead = BackgroundJob(kind='archive_info', status='running', started_at=long_ago, heartbeat_at=long_ago,
+                             owner='eski-host:1', payload=payload)
+        # Uzun süren fakat nabzı gelen iş yeniden çalıştırılmaz
+        alive = BackgroundJob(kind='archive_info', status='running', started_at=long_ago,
+                              heartbeat_at=datetime.utcnow(), owner='diger-host:2', payload=payload)
+        db.session.add_all([queued, dead, alive])
+        db.session.commit()
+
+        assert app_module.resume_pending_jobs() == 2
+        app_module.job_queue.join(timeout=10)
+        # Bir iş ikinci kez kuyruğa girse bile yalnızca bir kez sahiplenilir
+        app_module.run_background_job(queued.id)
+        db.session.expire_all()
+        assert [(j.status, j.attempts) for j in (queued, dead)] == [('done', 1), ('done', 1)]
+        assert dead.owner == app_module.job_owner()
+        assert alive.status == 'running'
+
+    def test_heartbeat_renews_only_this_process_jobs(self, uploader):
+        from datetime import datetime, timedelta
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        mine = BackgroundJob(kind='preview', status='running', heartbeat_at=long_ago, owner=app_module.job_owner())
+        other = BackgroundJob(kind='preview', status='running', heartbeat_at=long_ago, owner='diger-host:2')
+        db.session.add_all([mine, other])
+        db.session.commit()
+        app_module.renew_job_leases()
+        db.session.expire_all()
+        assert mine.heartbeat_at > long_ago
+        assert other.heartbeat_at == long_ago
+
+TUS = {'Tus-Resumable': '1.0.0'}
+
+def create_upload(client, length, filename='buyuk.zip', file_type='projects'):
+    import base64
+    metadata = ','.join(f'{key} {base64.b64encode(value.encode()).decode()}'
+                        for key, value in (('filename', filename), ('file_type', file_type)))
+    return client.post('/uploads', headers=dict(TUS, **{'Upload-Length': str(length), 'Upload-Metadata': metadata}))
+
+def patch_chunk(client, location, offset, data):
+    return client.patch(location, data=data, headers=dict(TUS, **{
+        'Upload-Offset': str(offset), 'Content-Type': 'application/offset+octet-stream'}))
+
+class TestResumableUploads:
+    """Large project files arrive in chunks and resume from the saved offset"""
+
+    def test_server_advertises_the_protocol(self, client):
+        response = client.options('/uploads')
+        assert response.headers['Tus-Version'] == '1.0.0'
+        assert 'creation' in response.headers['Tus-Extension']
+        assert int(response.headers['Tus-Max-Size']) == 100 * 1024 * 1024
+
+    def test_chunked_upload_becomes_a_project(self, uploader, storage):
+        client, data = uploader['client'], make_zip([f'src/file{i}.py' for i in range(50)])
+        created = create_upload(client, len(data))
+        assert created.status_code == 201
+        location = created.headers['Location']
+        upload_id = location.rsplit('/', 1)[-1]
+
+        middle = len(data) // 2
+        assert patch_chunk(client, location, 0, data[:middle]).headers['Upload-Offset'] == str(middle)
+        # Bağlantı koptu: istemci kaydedilen ofseti sorar ve oradan devam eder
+        status = client.head(location, headers=TUS)
+        assert (status.headers['Upload-Offset'], status.headers['Upload-Length']) == (str(middle), str(len(data)))
+        assert status.headers['Cache-Control'] == 'no-store'
+        assert patch_chunk(client, location, 0, data[:10]).status_code == 409
+        assert patch_chunk(client, location, middle, data[middle:]).status_code == 204
+
+        response = client.post('/projects/add', data={
+            'title': 'Büyük Proje', 'description': 'açıklama', 'grade': '3', 'upload_id': upload_id,
+        })
+        assert response.status_code == 302
+        project = Project.query.one()
+        assert (project.file_name, project.file_size, project.file_type) == ('buyuk.zip', len(data), 'ZIP')
+        assert project.blob_sha256 == hashlib.sha256(data).hexdigest()
+        assert db.session.get(app_module.UploadSession, upload_id) is None
+        assert os.listdir(storage.temp_folder) == []
+        app_module.job_queue.join(timeout=10)
+        assert ArchiveEntry.query.filter_by(blob_sha256=project.blob_sha256).count() == 51
+
+    def test_incomplete_upload_is_not_attached(self, uploader):
+        client = uploader['client']
+        location = create_upload(client, 1000).headers['Location']
+        patch_chunk(client, location, 0, make_zip()[:100])
+        client.post('/projects/add', data={'title': 'P', 'description': 'd', 'grade': '1',
+                                           'upload_id': location.rsplit('/', 1)[-1]})
+        assert Project.query.count() == 0
+        assert client.head(location, headers=TUS).headers['Upload-Offset'] == '100'
+
+    def test_content_is_checked_when_the_upload_is_used(self, uploader, storage):
+        client, data = uploader['client'], b'MZ' + b'\x00' * 5000
+        location = create_upload(client, len(data)).headers['Location']
+        patch_chunk(client, location, 0, data)
+        client.post('/projects/add', data={'title': 'P', 'description': 'd', 'grade': '1',
+                                           'upload_id': location.rsplit('/', 1)[-1]})
+        assert Project.query.count() == 0
+        assert os.listdir(storage.temp_folder) == []
+
+    def test_declared_type_and_size_are_checked_before_any_bytes(self, uploader, storage):
+        client = uploader['client']
+        assert create_upload(client, 1000, filename='virus.exe').status_code == 415
+        assert create_upload(client, 101 * 1024 * 1024).status_code == 413
+        assert client.post('/uploads', headers={'Upload-Length': '10'}).status_code == 412
+        assert os.listdir(storage.temp_folder) == []
+
+    def test_chunk_past_the_declared_length_is_refused(self, uploader):
+        client = uploader['client']
+        location = create_upload(client, 10).headers['Location']
+        assert patch_chunk(client, location, 0, b'x' * 100 * 1024).status_code == 413
+        assert client.head(location, headers=TUS).headers['Upload-Offset'] == '0'
+
+    def test_uploads_are_private_to_their_owner(self, uploader):
+        client = uploader['client']
+        location = create_upload(client, 10).headers['Location']
+        other = User(username='other', email='other@example.com', password_hash='hash')
+        db.session.add(other)
+        db.session.commit()
+        with client.session_transaction() as sess:
+            sess['user_id'] = other.id
+        assert client.head(location, headers=TUS).status_code == 404
+        assert patch_chunk(client, location, 0, b'x').status_code == 404
+        with client.session_transaction() as sess:
+            sess.clear()
+        assert client.head(location, headers=TUS).status_code == 401
+
+    def test_termination_removes_the_temp_file(self, uploader, storage):
+        client = uploader['client']
+        location = create_upload(client, 10).headers['Location']
+        patch_chunk(client, location, 0, b'12345')
+        assert client.delete(location, headers=TUS).status_code == 204
+        assert client.head(location, headers=TUS).status_code == 404
+        assert os.listdir(storage.temp_folder) == []
+
+    def test_expired_uploads_are_purged(self, uploader, storage):
+        from datetime import datetime, timedelta
+        client = uploader['client']
+        location = create_upload(client, 10).headers['Location']
+        upload = db.session.get(app_module.UploadSession, location.rsplit('/', 1)[-1])
+        upload.updated_at = datetime.utcnow() - timedelta(days=2)
+        db.session.commit()
+        assert client.head(location, headers=TUS).status_code == 410
+        assert os.listdir(storage.temp_folder) == []
+
+        stale = create_upload(client, 10).headers['Location']
+        db.session.get(app_module.UploadSession, stale.rsplit('/', 1)[-1]).updated_at = datetime.utcnow() - timedelta(days=2)
+        db.session.commit()
+        create_upload(client, 10)
+        assert app_module.UploadSession.query.count() == 1
+        assert len(os.listdir(storage.temp_folder)) == 1
+
+class TestArchiveIndex:
+    """The full central directory is indexed and single members are streamed"""
+
+    NAMES = ('README.md', 'src/main.py', 'src/lib/util.py', '../evil.txt')
+
+    @pytest.fixture
+    def archive_project(self, uploader):
+        upload_project(uploader, make_zip(self.NAMES))
+        assert app_module.job_queue.join(timeout=10) == 0
+        return Project.query.one()
+
+    def browse(self, uploader, project, **params):
+        return uploader['client'].get(f'/projects/{project.id}/archive', query_string=params)
+
+    def test_every_member_is_indexed_with_implicit_folders(self, archive_project):
+        import zipfile
+        entries = {e.path: e for e in ArchiveEntry.query.filter_by(blob_sha256=archive_project.blob_sha256)}
+        assert sorted(entries) == ['README.md', 'src/', 'src/lib/', 'src/lib/util.py', 'src/main.py']
+        assert entries['src/lib/'].is_dir and entries['src/lib/'].parent == 'src/'
+        with zipfile.ZipFile(app_module.file_manager.blob_path(archive_project.blob_sha256)) as archive:
+            info = archive.getinfo('src/main.py')
+        main = entries['src/main.py']
+        assert (main.size, main.compressed_size, main.crc) == (info.file_size, info.compress_size, info.CRC)
+        assert json.loads(archive_project.archive_info)['file_count'] == 4
+
+    def test_browse_lists_one_folder_at_a_time(self, uploader, archive_project):
+        root = self.browse(uploader, archive_project).get_json()
+        assert [(i['name'], i['is_dir']) for i in root['items']] == [('README.md', False), ('src', True)]
+        src = self.browse(uploader, archive_project, dir='src').get_json()
+        assert src['dir'] == 'src/'
+        assert [i['path'] for i in src['items']] == ['src/lib/', 'src/main.py']
+
+        first = self.browse(uploader, archive_project, dir='src/', limit=1).get_json()
+        assert first['has_more']
+        rest = self.browse(uploader, archive_project, dir='src/', cursor=first['next_cursor']).get_json()
+        assert [i['path'] for i in first['items'] + rest['items']] == ['src/lib/', 'src/main.py']
+
+        assert self.browse(uploader, archive_project, dir='missing/').status_code == 404
+
+    def test_single_member_is_streamed(self, uploader, archive_project, storage):
+        client = uploader['client']
+        url = f'/projects/{archive_project.id}/archive/file'
+        before = sorted(os.walk(storage.upload_folder))
+        response = client.get(url, query_string={'path': 'src/lib/util.py'})
+        assert response.status_code == 200
+        assert response.data == b'# src/lib/util.py\n' * 10
+        assert response.headers['Content-Length'] == str(len(response.data))
+        assert response.headers['Content-Disposition'] == 'attachment; filename=util.py'
+        # Üye diske çıkarılmaz
+        assert sorted(os.walk(storage.upload_folder)) == before
+
+        again = client.get(url, query_string={'path': 'src/lib/util.py'},
+                           headers={'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304 and again.data == b''
+
+        for path in ('src/', '../evil.txt', 'nope.txt'):
+            assert client.get(url, query_string={'path': path}).status_code == 404
+
+    def test_members_are_opened_by_their_original_name(self, uploader):
+        upload_project(uploader, make_zip(('docs\\guide.txt', '/abs.txt')))
+        assert app_module.job_queue.join(timeout=10) == 0
+        project = Project.query.one()
+        url = f'/projects/{project.id}/archive/file'
+        for path, member in (('docs/guide.txt', 'docs\\guide.txt'), ('abs.txt', '/abs.txt')):
+            response = uploader['client'].get(url, query_string={'path': path})
+            assert response.status_code == 200
+            assert response.data == f'# {member}\n'.encode() * 10
+
+    def test_member_missing_from_the_archive_is_not_found(self, uploader, archive_project):
+        entry = ArchiveEntry.query.filter_by(blob_sha256=archive_project.blob_sha256, path='README.md').one()
+        entry.member = 'gone.md'
+        db.session.commit()
+        response = uploader['client'].get(f'/projects/{archive_project.id}/archive/file',
+                                          query_string={'path': 'README.md'})
+        assert response.status_code == 404
+
+    def test_identical_archives_share_one_index(self, uploader, archive_project):
+        upload_project(uploader, make_zip(self.NAMES), title='Kopya')
+        assert app_module.job_queue.join(timeout=10) == 0
+        copy = Project.query.filter_by(title='Kopya').one()
+        assert copy.archive_info is not None
+        assert ArchiveEntry.query.count() == 5
+        assert [i['name'] for i in self.browse(uploader, copy).get_json()['items']] == ['README.md', 'src']
+
+    def test_index_removed_with_last_reference(self, uploader, archive_project):
+        uploader['client'].post(f'/projects/delete/{archive_project.id}')
+        assert ArchiveEntry.query.count() == 0
+
+    def test_browse_requires_login(self, uploader, archive_project):
+        client = uploader['client']
+        with client.session_transaction() as sess:
+            sess.clear()
+        assert self.browse(uploader, archive_project).status_code == 401
+        response = client.get(f'/projects/{archive_project.id}/archive/file', query_string={'path': 'README.md'})
+        assert response.status_code == 302
+
+def legacy_note(uploader, storage, name='eski.pdf', data=PDF_BYTES):
+    """Note from before the blob store: bytes live in uploads/notes/<name>"""
+    path = os.path.join(storage.notes_folder, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    note = Note(title='Eski', content='içerik', course_id=uploader['course'].id, uploaded_by=uploader['user'].id,
+                file_path=name, file_name=name, file_size=len(data))
+    db.session.add(note)
+    db.session.commit()
+    return note, path
+
+class TestLegacyFileCleanup:
+    """Files of records from before the blob store are removed with them"""
+
+    def test_deleting_a_note_removes_its_file(self, uploader, storage):
+        note, path = legacy_note(uploader, storage)
+        uploader['client'].post(f'/notes/delete/{note.id}')
+        assert not os.path.exists(path)
+
+    def test_replacing_the_file_removes_the_old_one(self, uploader, storage):
+        note, path = legacy_note(uploader, storage)
+        uploader['client'].post(f'/notes/edit/{note.id}', data={
+            'title': 'Yeni', 'content': 'içerik', 'course_id': str(uploader['course'].id),
+            'file': (io.BytesIO(PDF_BYTES + b'v2'), 'yeni.pdf'),
+        }, content_type='multipart/form-data')
+        db.session.expire_all()
+        assert note.blob_sha256 == hashlib.sha256(PDF_BYTES + b'v2').hexdigest()
+        assert not os.path.exists(path)
+
+    def test_file_shared_by_two_records_is_kept_for_the_other(self, uploader, storage):
+        first, path = legacy_note(uploader, storage)
+        # Migration 10 yinelenen adlarda stored_filename'i boş bırakır; file_path aynı kalır
+        second = Note(title='Kopya', content='c', course_id=uploader['course'].id, uploaded_by=uploader['user'].id)
+        db.session.add(second)
+        db.session.commit()
+        db.session.execute(db.text('UPDATE note SET file_path = :p WHERE id = :id'), {'p': first.file_path, 'id': second.id})
+        db.session.commit()
+        uploader['client'].post(f'/notes/delete/{first.id}')
+        assert os.path.exists(path)
+        uploader['client'].post(f'/notes/delete/{second.id}')
+        assert not os.path.exists(path)
+
+    def test_deleting_a_question_removes_its_file(self, uploader, storage):
+        from app import Question
+        path = os.path.join(storage.questions_folder, 'sinav.pdf')
+        with open(path, 'wb') as f:
+            f.write(PDF_BYTES)
+        question = Question(question_text='S', answer='C', year=2023, course_id=uploader['course'].id,
+                            file_path='sinav.pdf')
+        db.session.add(question)
+        db.session.commit()
+        with uploader['client'].session_transaction() as sess:
+            sess['is_admin'] = True
+        uploader['client'].post(f'/questions/delete/{question.id}')
+        assert db.session.get(Question, question.id) is None
+        assert not os.path.exists(path)
+
+    def test_deleting_a_user_removes_their_uploads(self, uploader, storage):
+        upload_note(uploader)
+        app_module.job_queue.join(timeout=10)
+        sha256 = hashlib.sha256(PDF_BYTES).hexdigest()
+        _, legacy_path = legacy_note(uploader, storage)
+        user_id = uploader['user'].id
+        with uploader['client'].session_transaction() as sess:
+            sess['admin'] = True
+        uploader['client'].post(f'/admin/delete_user/{user_id}')
+        assert db.session.get(User, user_id) is None
+        assert Note.query.count() == 0
+        assert not os.path.exists(storage.blob_path(sha256))
+        assert db.session.get(FileBlob, sha256) is None
+        assert not os.path.exists(legacy_path)
+
+def age(path, hours=2):
+    import time
+    past = time.time() - hours * 3600
+    os.utime(path, (past, past))
+
+class TestReconciler:
+    """Orphaned and missing files are found by streaming the store in batches"""
+
+    @pytest.fixture
+    def tree(self, uploader, storage):
+        """Referenced, orphaned, fresh and missing files in one upload folder"""
+        upload_note(uploader)
+        app_module.job_queue.join(timeout=10)
+        kept_sha = hashlib.sha256(PDF_BYTES).hexdigest()
+        _, kept_legacy = legacy_note(uploader, storage)
+        orphans = []
+        for i in range(5):
+            data = f'orphan {i}'.encode()
+            path, _ = storage.store_blob(storage.stream_to_temp(io.BytesIO(data), 100)[0],
+                                         hashlib.sha256(data).hexdigest())
+            orphans.append(path)
+        for folder, name in ((storage.projects_folder, 'eski.zip'), (storage.temp_folder, 'abc.part')):
+            orphans.append(os.path.join(folder, name))
+            with open(orphans[-1], 'wb') as f:
+                f.write(b'x' * 10)
+        for path in orphans:
+            age(path)
+        fresh = os.path.join(storage.temp_folder, 'uploading.part')
+        with open(fresh, 'wb') as f:
+            f.write(b'still streaming')
+        # Kaydı olan ama dosyası kaybolmuş eski not
+        lost = Note(title='Kayıp', content='c', course_id=uploader['course'].id, uploaded_by=uploader['user'].id,
+                    file_path='kayip.pdf')
+        db.session.add(lost)
+        db.session.commit()
+        return {'kept': [storage.blob_path(kept_sha), kept_legacy, fresh], 'orphans': orphans, 'sha': kept_sha}
+
+    def reconciler(self, storage, **kwargs):
+        from reconcile import FileReconciler
+        return FileReconciler(db.engine, storage, **kwargs)
+
+    def test_dry_run_reports_without_deleting(self, tree, storage):
+        report = self.reconciler(storage, batch_size=2).run()
+        assert report['orphaned'] == 7
+        assert report['orphaned_bytes'] == sum(os.path.getsize(p) for p in tree['orphans'])
+        assert report['recent'] == 1
+        assert report['missing'] == 1 and 'notes/kayip.pdf' in report['missing_sample'][0]
+        assert report['reclaimed'] == 0
+        assert all(os.path.exists(p) for p in tree['orphans'] + tree['kept'])
+
+    def test_apply_reclaims_orphans_only(self, tree, storage):
+        report = self.reconciler(storage, batch_size=2).run(dry_run=False)
+        assert report['reclaimed'] == 7
+        assert not any(os.path.exists(p) for p in tree['orphans'])
+        assert all(os.path.exists(p) for p in tree['kept'])
+        assert self.reconciler(storage).run()['orphaned'] == 0
+
+    def test_references_are_looked_up_per_batch(self, tree, storage):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        db.event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self.reconciler(storage, batch_size=100).run()
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', listener)
+        blob_lookups = [sql for sql in statements if 'blob_sha256 IN' in sql]
+        assert len(blob_lookups) == 1  # 6 blob için tek sorgu
+
+    def test_wrong_ref_counts_are_repaired(self, tree, storage):
+        db.session.get(FileBlob, tree['sha']).ref_count = 5
+        db.session.commit()
+        assert self.reconciler(storage).run()['miscounted'] == 1
+        assert self.reconciler(storage).run(dry_run=False)['miscounted'] == 1
+        db.session.expire_all()
+        assert db.session.get(FileBlob, tree['sha']).ref_count == 1
+
+    def test_cli_is_a_dry_run_by_default(self, tree, storage):
+        runner = app_module.app.test_cli_runner()
+        result = runner.invoke(args=['reconcile-files', '--batch-size', '3'])
+        assert 'Sahipsiz: 7 dosya' in result.output
+        assert all(os.path.exists(p) for p in tree['orphans'])
+        result = runner.invoke(args=['reconcile-files', '--apply'])
+        assert 'Geri kazanılan: 7 dosya' in result.output
+        assert not any(os.path.exists(p) for p in tree['orphans'])
+
+def set_quota(user, quota):
+    user.storage_quota = quota
+    db.session.commit()
+
+class TestStorageQuota:
+    """Per-user storage counter is kept incrementally and enforced before writes"""
+
+    def test_counter_follows_uploads_replacements_and_deletes(self, uploader):
+        client, user = uploader['client'], uploader['user']
+        upload_note(uploader)
+        app_module.job_queue.join(timeout=10)
+        db.session.refresh(user)
+        assert user.storage_used == len(PDF_BYTES)
+
+        note = Note.query.one()
+        smaller = b'%PDF-1.4\nkisa\n%%EOF\n'
+        client.post(f'/notes/edit/{note.id}', data={
+            'title': 'Not', 'content': 'içerik', 'course_id': str(uploader['course'].id),
+            'file': (io.BytesIO(smaller), 'yeni.pdf'),
+        }, content_type='multipart/form-data')
+        app_module.job_queue.join(timeout=10)
+        db.session.refresh(user)
+        assert user.storage_used == len(smaller)
+
+        client.post(f'/notes/delete/{note.id}')
+        db.session.refresh(user)
+        assert user.storage_used == 0
+
+    def test_upload_over_quota_writes_nothing(self, uploader, storage):
+        set_quota(uploader['user'], len(PDF_BYTES) - 1)
+        response = upload_note(uploader)
+        assert response.status_code == 302
+        assert Note.query.count() == 0
+        assert not os.path.exists(storage.blobs_folder) or not os.listdir(storage.blobs_folder)
+        assert os.listdir(storage.temp_folder) == []
+        with uploader['client'].session_transaction() as sess:
+            assert 'Depolama kotanız yetersiz' in str(sess['_flashes'])
+
+    def test_concurrent_upload_cannot_overshoot_the_quota(self, uploader, monkeypatch):
+        user = uploader['user']
+        set_quota(user, len(PDF_BYTES) + 10)
+        check = app_module.storage_remaining
+        concurrent = []
+
+        def racing_check(user_id, *args, **kwargs):
+            remaining = check(user_id, *args, **kwargs)
+            if not concurrent:
+                # Ön kontrol geçti; başka bir yükleme o arada kotayı doldurur
+                with db.engine.begin() as conn:
+                    conn.execute(db.text("UPDATE user SET storage_used = storage_used + :n WHERE id = :id"),
+                                 {'n': len(PDF_BYTES), 'id': user.id})
+                concurrent.append(remaining)
+            return remaining
+
+        monkeypatch.setattr(app_module, 'storage_remaining', racing_check)
+        response = upload_note(uploader)
+        assert response.status_code == 302
+        assert Note.query.count() == 0
+        db.session.refresh(user)
+        assert user.storage_used == len(PDF_BYTES)
+        with uploader['client'].session_transaction() as sess:
+            assert 'Depolama kotanız yetersiz' in str(sess['_flashes'])
+
+    def test_full_quota_is_refused_before_reading_the_stream(self, storage):
+        class Unreadable(io.BytesIO):
+            def read(self, *args):
+                raise AssertionError('stream must not be read')
+        from werkzeug.datastructures import FileStorage
+        file = FileStorage(Unreadable(), filename='ders.pdf')
+        file_info, message = storage.save_file(file, 'notes', 1, quota_remaining=0)
+        assert file_info is None and 'kota' in message
+
+    def test_replaced_file_is_released_from_the_quota(self, uploader):
+        upload_note(uploader)
+        app_module.job_queue.join(timeout=10)
+        set_quota(uploader['user'], len(PDF_BYTES) + 10)
+        note = Note.query.one()
+        replacement = PDF_BYTES + b' '
+        uploader['client'].post(f'/notes/edit/{note.id}', data={
+            'title': 'Not', 'content': 'içerik', 'course_id': str(uploader['course'].id),
+            'file': (io.BytesIO(replacement), 'yeni.pdf'),
+        }, content_type='multipart/form-data')
+        assert db.session.get(Note, note.id).file_size == len(replacement)
+
+    def test_chunked_uploads_reserve_their_declared_length(self, uploader, storage):
+        client = uploader['client']
+        set_quota(uploader['user'], 1000)
+        assert create_upload(client, 1001).status_code == 413
+        assert create_upload(client, 600).status_code == 201
+        # Süren yükleme kotadan düşülür; ikinci yükleme sığmaz
+        assert create_upload(client, 600).status_code == 413
+        assert len(os.listdir(storage.temp_folder)) == 1
+
+    def test_admin_dashboard_reads_the_counter_without_aggregates(self, uploader):
+        from sqlalchemy import event
+        upload_note(uploader)
+        app_module.job_queue.join(timeout=10)
+        client = uploader['client']
+        with client.session_transaction() as sess:
+            sess['admin'] = True
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.lower())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.get('/admin/dashboard')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 200
+        assert f'{len(PDF_BYTES) / 1024 / 1024:.1f} MB' in response.get_data(as_text=True)
+        assert not any('sum(' in statement for statement in statements)
+
+    def test_admin_sets_a_personal_quota(self, uploader):
+        client, user = uploader['client'], uploader['user']
+        with client.session_transaction() as sess:
+            sess['admin'] = True
+        client.post(f'/admin/user_quota/{user.id}', data={'quota_mb': '5'})
+        db.session.refresh(user)
+        assert user.storage_quota == 5 * 1024 * 1024
+        client.post(f'/admin/user_quota/{user.id}', data={'quota_mb': ''})
+        db.session.refresh(user)
+        assert user.storage_quota is None
+        assert user.storage_limit() == app_module.app.config['STORAGE_QUOTA_MB'] * 1024 * 1024
+
+def bitmap_bytes(size=(1200, 900)):
+    from PIL import Image
+    image = Image.new('RGB', size, 'white')
+    image.paste('red', (100, 100, 400, 300))
+    buffer = io.BytesIO()
+    image.save(buffer, 'BMP')
+    return buffer.getvalue()
+
+class TestImageRecompression:
+    """Note images are recompressed before they reach the blob store"""
+
+    def test_bitmap_note_is_stored_as_png(self, uploader, storage):
+        data = bitmap_bytes()
+        upload_note(uploader, data, filename='tahta.bmp')
+        app_module.job_queue.join(timeout=10)
+        note = Note.query.one()
+        assert (note.file_name, note.file_type) == ('tahta.png', 'PNG')
+        assert note.file_path.endswith('.png')
+        assert note.file_size < len(data) // 10
+        assert note.original_blob_sha256 is None
+        with open(storage.blob_path(note.blob_sha256), 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+        assert db.session.get(User, uploader['user'].id).storage_used == note.file_size
+
+    def test_original_is_kept_when_configured(self, uploader, storage):
+        from images import ImageOptimizer
+        storage.image_optimizer = ImageOptimizer(keep_original=True)
+        data = bitmap_bytes()
+        upload_note(uploader, data, filename='tahta.bmp')
+        app_module.job_queue.join(timeout=10)
+        note = Note.query.one()
+        original = hashlib.sha256(data).hexdigest()
+        assert note.original_blob_sha256 == original
+        assert db.session.get(FileBlob, original).ref_count == 1
+        with open(storage.blob_path(original), 'rb') as f:
+            assert f.read() == data
+        from datetime import timedelta
+        from reconcile import FileReconciler
+        report = FileReconciler(db.engine, storage, grace=timedelta(0)).run()
+        assert (report['orphaned'], report['missing'], report['miscounted']) == (0, 0, 0)
+
+        assert note.original_file_size == len(data)
+        user = db.session.get(User, uploader['user'].id)
+        assert user.storage_used == note.file_size + len(data)
+
+        uploader['client'].post(f'/notes/delete/{note.id}')
+        db.session.refresh(user)
+        assert user.storage_used == 0
+        assert db.session.get(FileBlob, original) is None
+        assert not os.path.exists(storage.blob_path(original))
+
+    def test_disabled_pipeline_stores_bytes_unchanged(self, uploader, storage):
+        storage.image_optimizer = None
+        data = bitmap_bytes()
+        upload_note(uploader, data, filename='tahta.bmp')
+        app_module.job_queue.join(timeout=10)
+        note = Note.query.one()
+        assert (note.file_type, note.file_size) == ('BMP', len(data))
+        assert note.blob_sha256 == hashlib.sha256(data).hexdigest()
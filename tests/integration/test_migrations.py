@@ -0,0 +1,222 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app import db
+import migrations
+
+@pytest.fixture
+def engine(tmp_path):
+    """Isolated SQLite engine for migration tests"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+class TestSchemaMigrations:
+    """Test the versioned schema migration runner"""
+
+    def test_fresh_database_is_stamped_with_latest_version(self, engine):
+        """A new database gets all tables and the latest schema version"""
+        applied = migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+        assert applied == len(migrations.MIGRATIONS)
+        assert migrations.get_schema_version(engine) == migrations.latest_version()
+
+        index_names = {ix['name'] for ix in inspect(engine).get_indexes('note')}
+        assert 'ix_note_course_id' in index_names
+
+    def test_current_schema_skips_introspection(self, engine):
+        """Second boot must not call create_all or re-run migrations"""
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        calls = []
+        applied = migrations.upgrade(engine, lambda: calls.append(True))
+        assert applied == 0
+        assert calls == []
+
+    def test_legacy_tables_get_missing_columns(self, engine):
+        """Old databases without profile/file columns are upgraded in place"""
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), "
+                "email VARCHAR(120), password_hash VARCHAR(120))"
+            ))
+            conn.execute(text(
+                "CREATE TABLE question (id INTEGER PRIMARY KEY, question_text TEXT, "
+                "answer TEXT, year INTEGER, course_id INTEGER, created_at DATETIME)"
+            ))
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        user_columns = {c['name'] for c in inspect(engine).get_columns('user')}
+        question_columns = {c['name'] for c in inspect(engine).get_columns('question')}
+        assert {'birth_date', 'school', 'department', 'interests', 'profile_bg'} <= user_columns
+        assert {'file_path', 'file_name', 'file_size', 'file_type', 'file_url'} <= question_columns
+        # Migration 5'in ham kolonlu indeksi 6'da search_key indeksiyle değiştirilir
+        assert [c['name'] for c in inspect(engine).get_columns('question_fts')] == ['search_key']
+
+    def test_apply_declared_indexes_backfills_existing_database(self, engine):
+        """The apply-indexes tool creates only the indexes that are missing"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_note_created_at"))
+            conn.execute(text("DROP INDEX ix_project_grade_created_at"))
+
+        created = migrations.apply_declared_indexes(engine, db.metadata)
+        assert sorted(created) == ['ix_note_created_at', 'ix_project_grade_created_at']
+        assert migrations.apply_declared_indexes(engine, db.metadata) == []
+
+    def test_drop_all_resets_schema_version(self, engine):
+        """Dropping the model tables also forgets the recorded version"""
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+        db.metadata.drop_all(engine)
+        db.metadata.create_all(engine)
+        assert migrations.get_schema_version(engine) == 0
+
+        calls = []
+        migrations.upgrade(engine, lambda: calls.append(True))
+        assert calls == [True]
+
+    def test_search_keys_are_backfilled(self, engine):
+        """Rows written before search keys existed get them from the migration"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO note (title, content, course_id, uploaded_by) "
+                "VALUES ('Işık ve Dalga', 'Optik', 1, 1)"
+            ))
+            conn.execute(text("UPDATE note SET search_key = NULL"))
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT search_key FROM note")).scalar() == 'isik ve dalga optik'
+            assert conn.execute(text(
+                "SELECT count(*) FROM note_fts WHERE note_fts MATCH 'isik'"
+            )).scalar() == 1
+
+    def test_site_stats_are_backfilled(self, engine):
+        """Existing rows are counted once when the stats table is introduced"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO user (username, email, password_hash) VALUES ('u', 'u@example.com', 'h')"
+            ))
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT users, notes FROM site_stats WHERE id = 1")).one()
+        assert tuple(row) == (1, 0)
+
+    def test_comment_counts_match_stored_comments(self, engine):
+        """Counts of comments that were never stored are reset to the real number"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO course_review (course_name, course_type, grade, rating, review_text, "
+                "difficulty_level, author_name, comments_count) "
+                "VALUES ('C', 'Zorunlu Ders', 1, 5, 't', 'Orta', 'a', 4)"
+            ))
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT comments_count FROM course_review")).scalar() == 0
+
+    def test_stored_filenames_are_backfilled(self, engine):
+        """Download names come from file_path; the oldest row keeps a duplicated name"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for path in ('uploads/notes/a.pdf', 'static\\notes\\b.pdf', 'other/a.pdf'):
+                conn.execute(text(
+                    "INSERT INTO note (title, content, course_id, uploaded_by, file_path) "
+                    "VALUES ('t', 'c', 1, 1, :path)"
+                ), {'path': path})
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            names = conn.execute(text("SELECT stored_filename FROM note ORDER BY id")).scalars().all()
+        assert names == ['a.pdf', 'b.pdf', None]
+        index = {ix['name']: ix for ix in inspect(engine).get_indexes('note')}['ix_note_stored_filename']
+        assert index['unique']
+
+    @pytest.mark.parametrize('table_name, step', [('background_job', 11), ('upload_session', 13)])
+    def test_table_migrations_create_their_table(self, engine, table_name, step):
+        """Table migrations do not rely on create_all having run first"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {table_name}"))
+            func = next(f for version, _, f in migrations.MIGRATIONS if version == step)
+            func(conn)
+        created = inspect(engine)
+        columns = {c['name'] for c in created.get_columns(table_name)}
+        expected = {c.name for c in db.metadata.tables[table_name].columns}
+        # Sonraki migration'ların eklediği kolonlar hariç model ile aynı
+        assert columns <= expected and expected - columns <= {'owner', 'heartbeat_at'}
+        assert created.get_foreign_keys(table_name)[0]['referred_table'] == 'user'
+
+    def test_existing_archives_are_queued_for_indexing(self, engine):
+        """Projects uploaded before the archive index get an indexing job once"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for sha in ('a' * 64, 'b' * 64):
+                conn.execute(text(
+                    "INSERT INTO project (title, description, grade, uploaded_by, blob_sha256, file_type) "
+                    "VALUES ('p', 'd', 1, 1, :sha, 'ZIP')"
+                ), {'sha': sha})
+            conn.execute(text(
+                "INSERT INTO archive_entry (blob_sha256, path, member, parent, is_dir, size, compressed_size) "
+                "VALUES (:sha, 'a.txt', 'a.txt', '', 0, 1, 1)"
+            ), {'sha': 'b' * 64})
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            jobs = conn.execute(text("SELECT kind, status, target_id, payload FROM background_job")).all()
+        assert [(kind, status, target) for kind, status, target, _ in jobs] == [('archive_info', 'queued', 1)]
+        assert '"ext": "zip"' in jobs[0].payload
+
+    def test_indexes_without_member_names_are_rebuilt(self, engine):
+        """Entries indexed before original member names were kept are dropped and queued again"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO project (title, description, grade, uploaded_by, blob_sha256, file_type) "
+                "VALUES ('p', 'd', 1, 1, :sha, 'ZIP')"
+            ), {'sha': 'a' * 64})
+            conn.execute(text(
+                "INSERT INTO archive_entry (blob_sha256, path, parent, is_dir, size, compressed_size) "
+                "VALUES (:sha, 'docs/a.txt', 'docs/', 0, 1, 1)"
+            ), {'sha': 'a' * 64})
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM archive_entry")).scalar() == 0
+            assert conn.execute(text("SELECT target_id FROM background_job")).scalars().all() == [1]
+
+    def test_storage_counters_are_backfilled(self, engine):
+        """Each user's counter starts from the sizes of their existing notes and projects"""
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for name in ('a', 'b'):
+                conn.execute(text(
+                    "INSERT INTO user (username, email, password_hash) VALUES (:n, :e, 'h')"
+                ), {'n': name, 'e': f'{name}@example.com'})
+            conn.execute(text(
+                "INSERT INTO note (title, content, course_id, uploaded_by, file_size) VALUES ('t', 'c', 1, 1, 100)"
+            ))
+            # Saklanan görsel orijinali blob kaydındaki boyutuyla sayılır
+            conn.execute(text("INSERT INTO file_blob (sha256, size, ref_count) VALUES (:sha, 30, 1)"), {'sha': 'o' * 64})
+            conn.execute(text(
+                "INSERT INTO note (title, content, course_id, uploaded_by, file_size, original_blob_sha256) "
+                "VALUES ('o', 'c', 1, 1, 0, :sha)"
+            ), {'sha': 'o' * 64})
+            conn.execute(text(
+                "INSERT INTO project (title, description, grade, uploaded_by, file_size) VALUES ('p', 'd', 1, 1, 50)"
+            ))
+
+        migrations.upgrade(engine, lambda: db.metadata.create_all(engine))
+
+        with engine.connect() as conn:
+            used = conn.execute(text("SELECT storage_used FROM user ORDER BY id")).scalars().all()
+        assert used == [180, 0]
@@ -0,0 +1,115 @@
+import re
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from app import db, User, Course, Note, Question, Project, CourseReview, ReviewComment, ArchiveEntry
+
+# Sabit boyutlu katalog tabloları; dropdown'lar bu tabloları bilerek tamamen okur.
+# sqlite_master yalnızca FTS desteği bir kez kontrol edilirken okunur.
+ALLOWED_FULL_SCANS = {'course', 'mentorship', 'sqlite_master'}
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+@pytest.fixture
+def seeded(db_session):
+    """Minimal rows so every listing route renders its query path"""
+    user = User(username='planuser', email='plan@example.com', password_hash='hash')
+    course = Course(name='Plan Course', code='PLAN101', grade=2, semester='Güz')
+    db_session.add_all([user, course])
+    db_session.commit()
+    review = CourseReview(course_name='Plan', course_type='Zorunlu Ders', grade=2, rating=4,
+                          review_text='text', difficulty_level='Orta', author_name='Tester')
+    db_session.add_all([
+        review,
+        Note(title='Plan Note', content='content', course_id=course.id, uploaded_by=user.id),
+        Question(question_text='Plan Question', answer='', year=2023, course_id=course.id),
+        Project(title='Plan Project', description='desc', grade=2, uploaded_by=user.id),
+    ])
+    db_session.commit()
+    db_session.add(ReviewComment(review_id=review.id, comment_text='Plan comment', author_name='Tester'))
+    db_session.commit()
+    return {'course': course, 'user': user, 'review': review}
+
+def _capture_selects(client, url):
+    """Return (statement, parameters) for every SELECT run while serving url"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, url
+    return captured
+
+def _full_scans(statement, parameters):
+    """Tables that the SQLite plan reads without any index"""
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    scans = []
+    for row in rows:
+        match = FULL_SCAN.match(row[-1])
+        if match and match.group(1) not in ALLOWED_FULL_SCANS:
+            scans.append(row[-1])
+    return scans
+
+class TestQueryPlans:
+    """Every listing route must be served by index lookups, not table scans"""
+
+    @pytest.mark.parametrize('url', [
+        '/',
+        '/notes',
+        '/notes?course_id={course_id}',
+        '/questions',
+        '/questions?course_id={course_id}',
+        '/projects',
+        '/projects?grade=2',
+        '/course_forum',
+        '/course_forum/{review_id}/comments',
+        '/grade/2',
+        '/search',
+        '/search?q=plan',
+        '/search?q=plan&grade=2',
+    ])
+    def test_route_queries_use_indexes(self, client, seeded, url):
+        url = url.format(course_id=seeded['course'].id, review_id=seeded['review'].id)
+        first_page = _capture_selects(client, url)
+        offenders = []
+        for statement, parameters in first_page:
+            for scan in _full_scans(statement, parameters):
+                offenders.append(f'{scan}: {statement}')
+        assert offenders == []
+
+    def test_cursor_pages_use_indexes(self, client, seeded):
+        """Deep pages filter on the sort key through the same indexes"""
+        data = client.get('/notes?format=json&limit=1').get_json()
+        assert data['items']
+        db.session.add(Note(title='Second', content='c', course_id=seeded['course'].id,
+                            uploaded_by=seeded['user'].id, created_at=datetime(2000, 1, 1)))
+        db.session.commit()
+        data = client.get('/notes?format=json&limit=1').get_json()
+        statements = _capture_selects(client, f"/notes?format=json&limit=1&cursor={data['next_cursor']}")
+        for statement, parameters in statements:
+            assert _full_scans(statement, parameters) == [], statement
+
+    @pytest.mark.parametrize('model', [Note, Question, Project])
+    def test_download_lookup_uses_index(self, seeded, model):
+        """download_file finds the record by exact stored name, not LIKE '%name'"""
+        query = model.query.filter_by(stored_filename='file.pdf').limit(1)
+        statement = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        assert _full_scans(statement, ()) == []
+
+    def test_archive_browse_uses_index(self, seeded):
+        """Folder listing filters on (blob, parent) and walks path in index order"""
+        query = ArchiveEntry.query.filter_by(blob_sha256='a' * 64, parent='src/') \
+            .filter(ArchiveEntry.path > 'src/a').order_by(ArchiveEntry.path).limit(50)
+        statement = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        with db.engine.connect() as conn:
+            plan = ' '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}'))
+        assert _full_scans(statement, ()) == []
+        assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,48 @@
+import pytest
+from file_manager import sniff_matches, looks_like_text
+
+def pe_header(offset=0x80):
+    """DOS stub whose e_lfanew points at a PE signature"""
+    head = bytearray(b'MZ\x90\x00' + b'\x00' * (offset + 4))
+    head[0x3C:0x40] = offset.to_bytes(4, 'little')
+    head[offset:offset + 4] = b'PE\x00\x00'
+    return bytes(head)
+
+class TestMagicBytes:
+    """Test content signature checks used before writing uploads"""
+    
+    @pytest.mark.parametrize('head,ext', [
+        (b'%PDF-1.7', 'pdf'),
+        (b'\x89PNG\r\n\x1a\n\x00', 'png'),
+        (b'\xff\xd8\xff\xe0', 'jpeg'),
+        (b'GIF89a', 'gif'),
+        (b'PK\x03\x04', 'docx'),
+        (b'Rar!\x1a\x07\x01\x00', 'rar'),
+        (b'#include <stdio.h>', 'cpp'),
+    ])
+    def test_matching_signatures(self, head, ext):
+        assert sniff_matches(head, ext)
+    
+    @pytest.mark.parametrize('head,ext', [
+        (b'\x89PNG\r\n\x1a\n', 'pdf'),
+        (pe_header(), 'txt'),
+        (pe_header(), 'pdf'),
+        (b'\x7fELF\x02', 'py'),
+        (b'%PDF-1.7', 'exe'),
+    ])
+    def test_mismatched_signatures(self, head, ext):
+        assert not sniff_matches(head, ext)
+    
+    @pytest.mark.parametrize('head', [
+        'Kısa'.encode()[:2],  # 'ı' iki baytlık; parça ortasından bölünmüş
+        '// Türkçe açıklama: ışık şiddeti'.encode('cp1254'),
+        b'MZ-80 emulator notes\n',
+    ])
+    def test_text_in_any_single_byte_encoding(self, head):
+        assert looks_like_text(head)
+        assert sniff_matches(head, 'txt')
+
+    def test_nul_bytes_are_not_text(self):
+        assert not looks_like_text(b'abc\x00def')
+        # MZ'li fakat PE başlığı olmayan dosya metin kuralına düşer
+        assert not sniff_matches(b'MZ\x90\x00' + b'\x00' * 64, 'txt')
@@ -0,0 +1,75 @@
+import os
+import pytest
+from PIL import Image, ImageCms
+from images import ImageOptimizer, optimizer_from_config
+
+def photo(path, size=(4000, 3000), orientation=None, **params):
+    """Noisy JPEG resembling a camera photo"""
+    image = Image.effect_noise(size, 40).convert('RGB')
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(path, 'JPEG', quality=95, exif=exif.tobytes(), **params)
+    return str(path)
+
+def drawing(path, fmt, size=(800, 600), mode='RGB'):
+    image = Image.new(mode, size, 'white')
+    image.paste('blue' if mode != 'P' else 1, (100, 100, 300, 200))
+    image.save(path, fmt)
+    return str(path)
+
+class TestImageOptimizer:
+    """Test recompression of uploaded note images"""
+
+    def test_photo_is_rotated_downscaled_and_stripped(self, tmp_path):
+        source = photo(tmp_path / 'a.jpg', orientation=6, comment=b'secret')
+        path, ext = ImageOptimizer(max_dimension=1000).optimize(source, 'jpg', str(tmp_path))
+        assert ext == 'jpg'
+        with Image.open(path) as image:
+            assert image.size == (750, 1000)  # 90 derece döndürülmüş
+            assert not image.getexif()
+            assert 'comment' not in image.info
+        assert os.path.getsize(path) < os.path.getsize(source)
+
+    def test_bitmap_becomes_lossless_png(self, tmp_path):
+        source = drawing(tmp_path / 'a.bmp', 'BMP')
+        path, ext = ImageOptimizer().optimize(source, 'bmp', str(tmp_path))
+        assert ext == 'png'
+        assert os.path.getsize(path) < os.path.getsize(source) / 10
+        with Image.open(source) as before, Image.open(path) as after:
+            assert list(before.convert('RGB').getdata()) == list(after.convert('RGB').getdata())
+
+    def test_gif_transparency_is_kept(self, tmp_path):
+        source = tmp_path / 'a.gif'
+        image = Image.new('P', (200, 200), 0)
+        image.putpalette([255, 255, 255, 0, 0, 255] + [0] * 762)
+        image.paste(1, (50, 50, 100, 100))
+        image.save(source, 'GIF', transparency=0, comment=b'tool')
+        path, ext = ImageOptimizer().optimize(str(source), 'gif', str(tmp_path))
+        with Image.open(path) as result:
+            assert result.convert('RGBA').getpixel((0, 0))[3] == 0
+            assert result.convert('RGBA').getpixel((60, 60)) == (0, 0, 255, 255)
+
+    def test_color_profile_is_kept(self, tmp_path):
+        icc = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+        source = photo(tmp_path / 'a.jpg', size=(600, 400), icc_profile=icc)
+        path, _ = ImageOptimizer().optimize(source, 'jpg', str(tmp_path))
+        with Image.open(path) as image:
+            assert image.info['icc_profile'] == icc
+
+    def test_already_small_image_is_left_alone(self, tmp_path):
+        source = tmp_path / 'a.png'
+        Image.new('L', (64, 64), 0).save(source, 'PNG', optimize=True)
+        assert ImageOptimizer().optimize(str(source), 'png', str(tmp_path)) is None
+        assert os.listdir(tmp_path) == ['a.png']
+
+    def test_animated_gif_is_left_alone(self, tmp_path):
+        source = tmp_path / 'a.gif'
+        frames = [Image.new('RGB', (50, 50), color) for color in ('red', 'blue')]
+        frames[0].save(source, 'GIF', save_all=True, append_images=frames[1:])
+        assert ImageOptimizer().optimize(str(source), 'gif', str(tmp_path)) is None
+
+    @pytest.mark.parametrize('config, enabled', [({}, True), ({'IMAGE_OPTIMIZE': False}, False)])
+    def test_optimizer_follows_config(self, config, enabled):
+        assert (optimizer_from_config(config) is not None) == enabled
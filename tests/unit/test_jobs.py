@@ -0,0 +1,62 @@
+import threading
+from jobs import JobQueue
+
+class TestJobQueue:
+    """Test the in-process background job pool"""
+    
+    def test_jobs_run_off_the_calling_thread(self):
+        threads = []
+        queue = JobQueue(lambda job_id: threads.append((job_id, threading.current_thread().name)), workers=2)
+        for job_id in (1, 2, 3):
+            queue.submit(job_id)
+        assert queue.join(timeout=5) == 0
+        assert sorted(job_id for job_id, _ in threads) == [1, 2, 3]
+        assert all(name.startswith('job') for _, name in threads)
+        queue.shutdown()
+    
+    def test_zero_workers_runs_inline(self):
+        ran = []
+        queue = JobQueue(ran.append, workers=0)
+        assert queue.submit(5) is None
+        assert ran == [5]
+        assert queue.join() == 0
+    
+    def test_join_reports_unfinished_jobs(self):
+        release = threading.Event()
+        queue = JobQueue(lambda job_id: release.wait(5), workers=1)
+        queue.submit(1)
+        assert queue.join(timeout=0.05) == 1
+        release.set()
+        assert queue.join(timeout=5) == 0
+        queue.shutdown()
+    
+    def test_crashing_job_does_not_stop_the_pool(self):
+        ran = []
+        def run(job_id):
+            if job_id == 1:
+                raise RuntimeError('boom')
+            ran.append(job_id)
+        queue = JobQueue(run, workers=1)
+        queue.submit(1)
+        queue.submit(2)
+        queue.join(timeout=5)
+        assert ran == [2]
+        queue.shutdown()
+    
+    def test_heartbeat_runs_only_while_a_job_is_running(self):
+        beats, release = [], threading.Event()
+        queue = JobQueue(lambda job_id: release.wait(5), workers=1,
+                         heartbeat=lambda: beats.append(1), heartbeat_interval=0.01)
+        queue.submit(1)
+        for _ in range(500):
+            if beats:
+                break
+            release.wait(0.01)
+        assert beats
+        release.set()
+        queue.join(timeout=5)
+        count = len(beats)
+        release.clear()
+        release.wait(0.1)
+        assert len(beats) <= count + 1  # iş bittikten sonra nabız durur
+        queue.shutdown()
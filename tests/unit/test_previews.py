@@ -0,0 +1,69 @@
+import io
+import os
+import shutil
+import pytest
+from PIL import Image
+import previews
+from previews import PreviewCache, render_image, render_pdf_first_page
+
+def make_image(path, size=(2000, 1000), mode='RGB', fmt='PNG'):
+    color = (255, 0, 0, 0) if mode == 'RGBA' else 'red'
+    Image.new(mode, size, color).save(path, fmt)
+    return str(path)
+
+class TestRendering:
+    """Test image and PDF rendering used for previews"""
+
+    def test_image_is_resized_to_width(self, tmp_path):
+        image = render_image(make_image(tmp_path / 'a.png'), 320)
+        assert image.size == (320, 160)
+        assert image.mode == 'RGB'
+
+    def test_small_image_is_not_upscaled(self, tmp_path):
+        assert render_image(make_image(tmp_path / 'a.png', (100, 50)), 320).size == (100, 50)
+
+    def test_transparent_image_gets_white_background(self, tmp_path):
+        image = render_image(make_image(tmp_path / 'a.png', mode='RGBA'), 320)
+        assert image.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_oversized_source_is_rejected(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(previews, 'MAX_SOURCE_PIXELS', 1000)
+        with pytest.raises(ValueError):
+            render_image(make_image(tmp_path / 'a.png'), 320)
+
+    def test_pdf_without_renderer_has_no_preview(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(shutil, 'which', lambda name: None)
+        assert render_pdf_first_page(str(tmp_path / 'a.pdf'), 320) is None
+
+    @pytest.mark.skipif(shutil.which('pdftoppm') is None, reason='poppler-utils not installed')
+    def test_pdf_first_page_is_rendered(self, tmp_path):
+        path = tmp_path / 'a.pdf'
+        Image.new('RGB', (600, 800), 'white').save(path, 'PDF')
+        assert render_pdf_first_page(str(path), 320).width == 320
+
+class TestPreviewCache:
+    """Test the on-disk preview cache"""
+
+    def test_preview_is_generated_once(self, tmp_path, monkeypatch):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        source = make_image(tmp_path / 'a.png')
+        path = cache.get_or_create('ab' * 32, source, 'png')
+        assert path == cache.path_for('ab' * 32, previews.PREVIEW_SIZES['thumb'])
+        with Image.open(path) as image:
+            assert image.format == 'JPEG'
+
+        monkeypatch.setattr(previews, 'render_image', lambda *args: pytest.fail('rendered twice'))
+        assert cache.get_or_create('ab' * 32, source, 'png') == path
+
+    def test_sizes_are_cached_separately(self, tmp_path):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        source = make_image(tmp_path / 'a.png')
+        thumb = cache.get_or_create('cd' * 32, source, 'png', 'thumb')
+        large = cache.get_or_create('cd' * 32, source, 'png', 'large')
+        assert thumb != large
+        assert cache.delete('cd' * 32) == 2
+        assert not os.path.exists(thumb) and not os.path.exists(large)
+
+    def test_unsupported_type_has_no_preview(self, tmp_path):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        assert cache.get_or_create('ef' * 32, str(tmp_path / 'a.zip'), 'zip') is None
@@ -0,0 +1,53 @@
+from response_cache import ResponseCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+class TestResponseCache:
+    """Test TTL expiry and LRU eviction"""
+    
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = ResponseCache(clock=clock)
+        cache.set('home', b'html', ttl=10)
+        assert cache.get('home') == b'html'
+        clock.now = 10
+        assert cache.get('home') is None
+        assert len(cache) == 0
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+    
+    def test_invalidate_clears_everything(self):
+        cache = ResponseCache()
+        cache.set('a', 1, ttl=60)
+        cache.invalidate()
+        assert cache.get('a') is None
+    
+    def test_invalidation_reaches_caches_sharing_the_stamp(self, tmp_path):
+        stamp = str(tmp_path / 'instance' / 'cache.stamp')
+        writer, other = ResponseCache(stamp_path=stamp), ResponseCache(stamp_path=stamp)
+        other.set('home', b'old', ttl=60)
+        assert other.get('home') == b'old'
+        writer.invalidate()
+        assert other.get('home') is None
+        other.set('home', b'new', ttl=60)
+        assert other.get('home') == b'new'
+    
+    def test_page_rendered_during_invalidation_is_not_kept(self, tmp_path):
+        stamp = str(tmp_path / 'cache.stamp')
+        writer, other = ResponseCache(stamp_path=stamp), ResponseCache(stamp_path=stamp)
+        generation = other.generation()  # sayfa okunmaya başladı
+        writer.invalidate()
+        other.set('home', b'stale', ttl=60, generation=generation)
+        assert other.get('home') is None
@@ -0,0 +1,75 @@
+import base64
+import io
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+from resumable import UploadError, append_chunk, parse_metadata, parse_offset
+
+def b64(text):
+    return base64.b64encode(text.encode()).decode()
+
+class DisconnectingStream:
+    """Sends ``data`` and then drops the connection"""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, size):
+        chunk = self.stream.read(size)
+        if not chunk:
+            raise ClientDisconnected()
+        return chunk
+
+class TestProtocolHeaders:
+    """Test tus header parsing"""
+
+    def test_metadata_values_are_base64(self):
+        header = f'filename {b64("proje ödev.zip")},file_type {b64("projects")}, empty '
+        assert parse_metadata(header) == {'filename': 'proje ödev.zip', 'file_type': 'projects', 'empty': ''}
+
+    def test_invalid_metadata_is_rejected(self):
+        with pytest.raises(UploadError) as error:
+            parse_metadata('filename not-base64!')
+        assert error.value.status == 400
+
+    @pytest.mark.parametrize('value', [None, '', '-1', '1.5', 'abc'])
+    def test_offsets_must_be_non_negative_integers(self, value):
+        with pytest.raises(UploadError):
+            parse_offset(value, 'Upload-Offset')
+
+class TestAppendChunk:
+    """Test writing chunks at the recorded offset"""
+
+    def test_chunks_are_appended(self, tmp_path):
+        path = tmp_path / 'upload'
+        path.write_bytes(b'')
+        assert append_chunk(str(path), 0, io.BytesIO(b'hello '), 100) == 6
+        assert append_chunk(str(path), 6, io.BytesIO(b'world'), 94) == 5
+        assert path.read_bytes() == b'hello world'
+
+    def test_bytes_past_the_recorded_offset_are_overwritten(self, tmp_path):
+        # Önceki PATCH yazdı ama ofseti kaydedemeden süreç öldü
+        path = tmp_path / 'upload'
+        path.write_bytes(b'hello wor')
+        append_chunk(str(path), 6, io.BytesIO(b'world'), 94)
+        assert path.read_bytes() == b'hello world'
+
+    def test_chunk_over_the_limit_is_rolled_back(self, tmp_path):
+        path = tmp_path / 'upload'
+        path.write_bytes(b'abc')
+        with pytest.raises(UploadError) as error:
+            append_chunk(str(path), 3, io.BytesIO(b'x' * 200 * 1024), 100 * 1024)
+        assert error.value.status == 413
+        assert path.read_bytes() == b'abc'
+
+    def test_disconnect_keeps_received_bytes(self, tmp_path):
+        path = tmp_path / 'upload'
+        path.write_bytes(b'')
+        assert append_chunk(str(path), 0, DisconnectingStream(b'partial'), 100) == 7
+        assert path.read_bytes() == b'partial'
+
+    def test_offset_beyond_file_is_a_conflict(self, tmp_path):
+        path = tmp_path / 'upload'
+        path.write_bytes(b'ab')
+        with pytest.raises(UploadError) as error:
+            append_chunk(str(path), 5, io.BytesIO(b'x'), 10)
+        assert error.value.status == 409
@@ -200,6 +200,122 @@ class TestSearchRoutes:
         response = client.get('/search?q=test%20query%20with%20spaces')
         assert response.status_code == 200
 
+class TestPaginationRoutes:
+    """Test keyset pagination on listing routes"""
+    
+    def _add_reviews(self, db_session, count):
+        from app import CourseReview
+        from datetime import datetime, timedelta
+        base = datetime(2024, 1, 1)
+        for i in range(count):
+            db_session.add(CourseReview(
+                course_name=f'Course {i}',
+                course_type='Zorunlu Ders',
+                grade=1,
+                rating=4,
+                review_text='review',
+                difficulty_level='Orta',
+                author_name='Tester',
+                # Aynı created_at değerleri id ile ayrıştırılmalı
+                created_at=base + timedelta(minutes=i // 2)
+            ))
+        db_session.commit()
+    
+    def test_course_forum_json_pages_cover_all_rows(self, client, db_session):
+        """Walking the cursors returns every row exactly once, newest first"""
+        self._add_reviews(db_session, 7)
+        seen = []
+        cursor = None
+        while True:
+            url = '/course_forum?format=json&limit=3'
+            if cursor:
+                url += f'&cursor={cursor}'
+            data = client.get(url).get_json()
+            assert len(data['items']) <= 3
+            seen.extend(item['id'] for item in data['items'])
+            cursor = data['next_cursor']
+            if not cursor:
+                assert not data['has_more']
+                break
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+        assert seen == sorted(seen, reverse=True)
+    
+    def test_invalid_cursor_falls_back_to_first_page(self, client, db_session):
+        """A malformed cursor is ignored instead of raising an error"""
+        self._add_reviews(db_session, 2)
+        response = client.get('/course_forum?format=json&cursor=not-a-cursor')
+        assert response.status_code == 200
+        assert len(response.get_json()['items']) == 2
+    
+    def test_html_listing_exposes_load_more(self, client, db_session):
+        """HTML listing links to the next page when more rows exist"""
+        self._add_reviews(db_session, 3)
+        response = client.get('/course_forum?limit=2')
+        assert response.status_code == 200
+        assert b'cursor=' in response.data
+    
+    def test_questions_json_variant(self, client, sample_course):
+        """Questions listing also offers a JSON variant"""
+        response = client.get(f'/questions?format=json&course_id={sample_course.id}')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['items'] == []
+        assert data['next_cursor'] is None
+
+class TestPageCache:
+    """Test the response cache on homepage and catalog pages"""
+    
+    @pytest.fixture
+    def cache_on(self, client):
+        from app import app, page_cache
+        app.config['RESPONSE_CACHE_TTL'] = 60
+        page_cache.invalidate()
+        yield page_cache
+        app.config['RESPONSE_CACHE_TTL'] = 0
+        page_cache.invalidate()
+    
+    def test_repeat_view_skips_database(self, client, db_session, cache_on):
+        """Second anonymous view is served from the cache without queries"""
+        from sqlalchemy import event
+        from app import db
+        assert client.get('/grade/1').headers['X-Cache'] == 'MISS'
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.get('/grade/1')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.headers['X-Cache'] == 'HIT'
+        assert statements == []
+    
+    def test_logged_in_views_are_keyed_separately(self, client, sample_user, cache_on):
+        """A logged-in user never receives the anonymous copy"""
+        client.get('/about')
+        with client.session_transaction() as sess:
+            sess['user_id'] = sample_user.id
+            sess['username'] = sample_user.username
+        response = client.get('/about')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert sample_user.username.encode() in response.data
+    
+    def test_admin_write_invalidates_cache(self, client, sample_admin_user, cache_on):
+        """Adding a course clears cached grade pages"""
+        client.post('/admin/login', data={
+            'username': sample_admin_user.username,
+            'password': 'admin123'
+        })
+        client.get('/admin/dashboard')  # bekleyen flash mesajlarını tüket
+        assert b'Cache Course' not in client.get('/grade/3').data
+        client.post('/admin/add_course', data={
+            'name': 'Cache Course', 'grade': '3', 'semester': 'Güz', 'description': 'desc'
+        })
+        client.get('/admin/dashboard')
+        response = client.get('/grade/3')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert b'Cache Course' in response.data
+
 class TestFileRoutes:
     """Test file-related routes"""
     
@@ -0,0 +1,47 @@
+import pytest
+from write_behind import CounterBuffer
+
+class TestCounterBuffer:
+    """Test coalescing and batch flushing of counter deltas"""
+    
+    def test_events_are_coalesced_per_key(self):
+        batches = []
+        buffer = CounterBuffer(batches.append, interval=3600)
+        for _ in range(5):
+            buffer.add(1, 1)
+        buffer.add(1, -1)
+        buffer.add(2, 1)
+        buffer.add(2, -1)
+        assert buffer.pending(1) == 4
+        assert buffer.flush() == 1
+        # Birbirini götüren olaylar hiç yazılmaz
+        assert batches == [{1: 4}]
+        assert buffer.pending(1) == 0
+    
+    def test_full_buffer_flushes_immediately(self):
+        batches = []
+        buffer = CounterBuffer(batches.append, interval=3600, max_pending=3)
+        for _ in range(3):
+            buffer.add('r', 1)
+        assert batches == [{'r': 3}]
+    
+    def test_failed_flush_at_max_pending_does_not_reach_the_caller(self):
+        def failing(batch):
+            raise RuntimeError('database is locked')
+        buffer = CounterBuffer(failing, interval=3600, max_pending=2)
+        buffer.add('r', 1)
+        buffer.add('r', 1)  # tampon doldu; yazma başarısız ama add hata vermez
+        assert buffer.pending('r') == 2
+        buffer.flush_func = lambda batch: None
+        assert buffer.flush() == 1
+    
+    def test_failed_flush_requeues_deltas(self):
+        def failing(batch):
+            raise RuntimeError('database is locked')
+        buffer = CounterBuffer(failing, interval=3600)
+        buffer.add(7, 2)
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        assert buffer.pending(7) == 2
+        buffer.flush_func = lambda batch: None
+        assert buffer.flush() == 1
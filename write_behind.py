@@ -0,0 +1,91 @@
+"""Sayaçlar için write-behind tamponu.
+
+Beğeni gibi sık ve küçük yazmalar her tıklamada ayrı bir transaction açmak
+yerine süreç içinde anahtar başına toplanır (+1/-1 olayları birbirini
+götürür) ve belirli aralıklarla ya da tampon dolunca tek transaction'da
+veritabanına yazılır. Okuyucular kalıcı değere ``pending()`` ekleyerek
+henüz yazılmamış değişiklikleri de görebilir.
+
+Yazılan değer olayların net farkıdır. ``flush_func`` bir alt/üst sınır
+uyguluyorsa (ör. beğeni sayısı sıfırın altına inmez) sınır olay başına
+değil net farka uygulanır: 0 beğenili yoruma gelen -1 ve +1 anında yazımda
+1, tamponla 0 sonucunu verir.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+DEFAULT_FLUSH_INTERVAL = 1.0  # saniye
+DEFAULT_MAX_PENDING = 500  # bu kadar olay birikince beklemeden yazılır
+
+
+class CounterBuffer:
+    """Anahtar başına sayaç farklarını biriktirip toplu yazan tampon.
+
+    ``flush_func`` {anahtar: fark} sözlüğü alır ve farkları tek seferde
+    kalıcı hale getirmelidir. Yazma başarısız olursa farklar tampona geri
+    eklenir ve bir sonraki turda tekrar denenir.
+    """
+
+    def __init__(self, flush_func, interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        self.flush_func = flush_func
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = defaultdict(int)
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, key, delta):
+        """Farkı tampona ekle; gerekirse zamanlayıcıyı kur ya da hemen yaz"""
+        with self._lock:
+            self._pending[key] += delta
+            self._events += 1
+            flush_now = self._events >= self.max_pending
+            if not flush_now:
+                self._schedule()
+        if flush_now:
+            # Hata çağıran isteğe taşınmaz; farklar tampona geri eklenip yeniden denenir
+            self._flush_quietly()
+
+    def _schedule(self):
+        # Kilit tutulurken çağrılır
+        if self._timer is None:
+            self._timer = threading.Timer(self.interval, self._flush_quietly)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            pass  # flush hatayı logladı ve yeniden denemeyi zamanladı
+
+    def pending(self, key):
+        """Henüz yazılmamış fark"""
+        with self._lock:
+            return self._pending.get(key, 0)
+
+    def flush(self):
+        """Biriken farkları yaz; yazılan anahtar sayısını döndür"""
+        with self._flush_lock:
+            with self._lock:
+                batch = {key: delta for key, delta in self._pending.items() if delta}
+                self._pending = defaultdict(int)
+                self._events = 0
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not batch:
+                return 0
+            try:
+                self.flush_func(batch)
+            except Exception as e:
+                logging.getLogger('error').error(f"Write-behind flush failed, {len(batch)} keys requeued: {e}")
+                with self._lock:
+                    for key, delta in batch.items():
+                        self._pending[key] += delta
+                    self._schedule()
+                raise
+            return len(batch)